@@ -1,4 +1,5 @@
 import os
+import signal
 import botpy
 from botpy.logging import DEFAULT_FILE_HANDLER
 from src.bot import MyClient
@@ -6,6 +7,11 @@ from src.bot import MyClient
 from config import DEBUG, BOT_APPID, BOT_SECRET
 
 
+def _interrupt(signum, frame):
+    # 将 SIGTERM 按 Ctrl-C 处理，使 run 返回后能正常关闭
+    raise KeyboardInterrupt
+
+
 def main():
 
     # 设置 bot 的 intents
@@ -22,8 +28,13 @@ def main():
         ext_handlers=DEFAULT_FILE_HANDLER,
     )
 
-    # Bot 启动
-    client.run(appid=BOT_APPID, secret=BOT_SECRET)
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    # Bot 启动，退出时写入缓冲的数据并释放资源
+    try:
+        client.run(appid=BOT_APPID, secret=BOT_SECRET)
+    finally:
+        client.shutdown()
 
 
 if __name__ == "__main__":
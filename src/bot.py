@@ -1,3 +1,4 @@
+import asyncio
 import os
 import importlib
 
@@ -6,6 +7,34 @@ from botpy.message import Message, GroupMessage
 
 from botpy import logger
 
+from src.libraries.common.dispatch import (
+    DROP_BUSY,
+    DROP_QUEUE_FULL,
+    command_dispatcher,
+)
+from src.libraries.common.file import upload_cache
+from src.libraries.common.http import http_client
+from src.libraries.common.game.maimai import b50_snapshots
+from src.libraries.common.images import sprite_cache, warmup_fonts
+from src.libraries.common.render import render_cache, render_executor
+from src.libraries.database import (
+    init_db,
+    score_writer,
+    shutdown_session,
+    user_cache,
+)
+
+from config import FontPaths
+
+# 未匹配指令的消息在调度统计中的名称
+DEFAULT_COMMAND = "default"
+
+# 指令请求被丢弃时的回复
+DROP_REPLIES = {
+    DROP_BUSY: "⏳ 上一条 /{command} 还在处理中，请稍候。",
+    DROP_QUEUE_FULL: "😵 当前请求过多，请稍后再试。",
+}
+
 
 class MyClient(Client):
     def __init__(self, *args, **kwargs):
@@ -14,11 +43,67 @@ class MyClient(Client):
         self.group_commands = {}  # 存储群指令
         self.default_channel_handlers = []  # 默认频道处理函数列表
         self.default_group_handlers = []  # 默认群处理函数列表
+        self.ready_handlers = []  # 插件的启动处理函数列表
+        self.close_handlers = []  # 插件的关闭处理函数列表
         self.load_plugins()
 
     async def on_ready(self):
+        await http_client.start()
+        await init_db()
+        score_writer.start()
+        warmup_fonts(
+            path for name, path in vars(FontPaths).items() if not name.startswith("_")
+        )
+        await render_executor.start()
+        for handler in self.ready_handlers:
+            await handler(self)
         logger.info("[BOT] robot 「%s」 准备好了!", self.robot.name)
 
+    async def close(self):
+        if self.is_closed():
+            return
+        try:
+            for handler in self.close_handlers:
+                await self._close_step(handler)
+            await self._close_step(command_dispatcher.close)
+            await self._close_step(render_executor.close)
+            await self._close_step(http_client.close)
+        finally:
+            # 前面的步骤失败时也要写入缓冲的分数
+            await self._close_step(score_writer.close)
+            await self._close_step(shutdown_session)
+        user_cache.log_stats()
+        b50_snapshots.log_stats()
+        sprite_cache.log_stats()
+        render_cache.log_stats()
+        upload_cache.log_stats()
+        command_dispatcher.log_stats()
+        await super().close()
+
+    @staticmethod
+    async def _close_step(step):
+        """
+        执行一个关闭步骤，出错时记录后继续执行后面的步骤
+        """
+        try:
+            await step()
+        except Exception:
+            logger.exception(f"[BOT] Error during shutdown in {step.__qualname__}")
+
+    def shutdown(self):
+        """
+        在事件循环之外关闭客户端。
+
+        botpy 的 run 捕获 KeyboardInterrupt 后直接返回，不会调用 close，
+        由启动脚本在 run 返回后调用本方法，写入缓冲的数据并释放资源。
+        """
+        self.loop.run_until_complete(self.close())
+        # 取消 botpy 留下的连接任务
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
     def load_plugins(self):
         plugins_dir = os.path.join(os.path.dirname(__file__), "plugins")
         for module_name in os.listdir(plugins_dir):
@@ -40,6 +125,12 @@ class MyClient(Client):
                             f"[BOT] Loaded commands from module '{module_name}': {', '.join(command_module.COMMANDS.keys())}."
                         )
 
+                    # 加载指令的调度选项
+                    for cmd_name, options in getattr(
+                        command_module, "COMMAND_OPTIONS", {}
+                    ).items():
+                        command_dispatcher.configure(cmd_name.lower(), **options)
+
                     # 加载未匹配指令的处理函数
                     if hasattr(command_module, "DEFAULT_HANDLER"):
                         if command_module.COMMAND_SCOPE in ["channel", "both"]:
@@ -51,6 +142,12 @@ class MyClient(Client):
                                 command_module.DEFAULT_HANDLER
                             )
 
+                    # 加载插件的启动与关闭处理函数
+                    if hasattr(command_module, "READY_HANDLER"):
+                        self.ready_handlers.append(command_module.READY_HANDLER)
+                    if hasattr(command_module, "CLOSE_HANDLER"):
+                        self.close_handlers.append(command_module.CLOSE_HANDLER)
+
                 except Exception as e:
                     # 打印跟踪报错文件具体位置
                     logger.error(
@@ -65,9 +162,16 @@ class MyClient(Client):
         if content.startswith("/"):
             command = content.split()[0][1:].lower()
             if command in self.channel_commands:
-                await self.channel_commands[command](message)
+                await self.dispatch_command(
+                    command,
+                    self.channel_commands[command],
+                    message,
+                    message.author.id,
+                )
         else:
-            await self.handle_unmatched_channel_command(message)
+            command_dispatcher.dispatch(
+                DEFAULT_COMMAND, self.handle_unmatched_channel_command, message
+            )
 
     async def on_group_at_message_create(self, message: GroupMessage):
         logger.info(
@@ -78,9 +182,28 @@ class MyClient(Client):
         if content.startswith("/"):
             command = content.split()[0][1:].lower()
             if command in self.group_commands:
-                await self.group_commands[command](message)
+                await self.dispatch_command(
+                    command,
+                    self.group_commands[command],
+                    message,
+                    message.author.member_openid,
+                )
         else:
-            await self.handle_unmatched_group_command(message)
+            command_dispatcher.dispatch(
+                DEFAULT_COMMAND, self.handle_unmatched_group_command, message
+            )
+
+    async def dispatch_command(self, command, handler, message, user_id):
+        """
+        调度指令，请求被丢弃时回复用户
+        """
+        reason = command_dispatcher.dispatch(command, handler, message, user_id=user_id)
+        if reason is None:
+            return
+        try:
+            await message.reply(content=DROP_REPLIES[reason].format(command=command))
+        except Exception as e:
+            logger.error(f"[BOT] Error replying to dropped command '{command}': {e}")
 
     async def handle_unmatched_channel_command(self, message):
         for handler in self.default_channel_handlers:
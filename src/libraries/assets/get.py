@@ -1,11 +1,32 @@
+import os
 import time
 import json
+import asyncio
+import tempfile
 from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
 from enum import Enum
 import aiohttp
 import requests
 from botpy import logger
 
+from src.libraries.common.http import http_client
+
+# JSON数据的过期时间（秒）
+JSON_EXPIRE_SECONDS = 86400
+
+# JSON数据下载失败后的重试冷却时间（秒）
+JSON_RETRY_SECONDS = 300
+
+# 预取资产时的默认并发下载数
+PREFETCH_CONCURRENCY = 8
+
+# 上游缺失资产的默认记录时间（秒），期间不再请求上游
+MISSING_ASSET_TTL = 86400 * 3
+
+# 视为上游缺失的状态码，限流、鉴权等其他 4xx 只是暂时的失败
+MISSING_ASSET_STATUSES = (404, 410)
+
 
 def common_to_lxns_songid(song_id: int) -> int:
     """
@@ -22,6 +43,35 @@ def common_to_lxns_songid(song_id: int) -> int:
     return song_id
 
 
+def write_file_atomic(save_path: str | Path, content: bytes) -> None:
+    """
+    原子地写入文件：先写入同目录下的临时文件，再重命名为目标文件。
+    读取方不会看到写了一半的文件。
+
+    Args:
+        save_path (str | Path): 目标文件路径。
+        content (bytes): 文件内容。
+    """
+    save_path = Path(save_path)
+    save_folder = save_path.parent
+    if not save_folder.exists():
+        save_folder.mkdir(parents=True, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=save_folder, prefix=f".{save_path.name}.", suffix=".part"
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, save_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
 class AssetType(Enum):
     """
     AssetType
@@ -52,6 +102,13 @@ class JSONType(Enum):
     DIVING_FISH_SONGS_INFO = "https://www.diving-fish.com/api/maimaidxprober/music_data"
     LXNS_SONGS_INFO = "https://maimai.lxns.net/api/v0/maimai/song/list?notes=true"
     ALIAS = "https://download.fanyu.site/maimai/alias.json"
+    LXNS_ALIAS = "https://maimai.lxns.net/api/v0/maimai/alias/list"
+
+
+# 资产缺失时使用的占位资产
+ASSET_PLACEHOLDERS = {
+    AssetType.COVER: "0",
+}
 
 
 class Assets:
@@ -62,24 +119,45 @@ class Assets:
     _instance = None
 
     def __new__(
-        cls, base_url: str = None, assets_folder: str = None, proxy: str = None
+        cls,
+        base_url: str = None,
+        assets_folder: str = None,
+        proxy: str = None,
+        missing_ttl: int = MISSING_ASSET_TTL,
     ):
         if cls._instance is None:
             cls._instance = super(Assets, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, base_url: str, assets_folder: str, proxy: str = None) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        assets_folder: str,
+        proxy: str = None,
+        missing_ttl: int = MISSING_ASSET_TTL,
+    ) -> None:
         if self._initialized:
             return
         self.base_url = base_url
         self.assets_folder = assets_folder
         self.proxy = proxy
+        self.missing_ttl = missing_ttl
+        # 本地路径 -> 上游缺失记录 {"url", "status", "time"}，会持久化到磁盘
+        self._missing: Dict[str, dict] = self._load_missing()
+        # JSONType -> (文件修改时间, 解析后的数据)
+        self._json_cache: Dict[JSONType, Tuple[float, dict]] = {}
+        # JSONType -> 正在进行的后台下载任务
+        self._json_refresh_tasks: Dict[JSONType, asyncio.Task] = {}
+        # 本地路径 -> 正在进行的资产下载任务
+        self._downloads: Dict[Path, asyncio.Task] = {}
+        # JSONType -> 下载失败后允许再次尝试的时间
+        self._json_retry_at: Dict[JSONType, float] = {}
         self._initialized = True
 
-    def get(self, asset_type: AssetType, param_value: str, get_args="") -> str:
+    def _resolve(self, asset_type: AssetType, param_value: str) -> Tuple[str, Path]:
         """
-        获取资产 (同步)
+        计算资产的远程参数与本地文件路径
         """
         param_value = str(param_value)
         if asset_type == AssetType.COVER:
@@ -94,16 +172,29 @@ class Assets:
 
         file_name = param_value if asset_type == AssetType.IMAGES else f"{param_value}"
         local_file_path = Path(self.assets_folder, asset_type.name.lower(), file_name)
+        return param_value, local_file_path
+
+    def get(self, asset_type: AssetType, param_value: str, get_args="") -> str:
+        """
+        获取资产 (同步)
+        """
+        param_value, local_file_path = self._resolve(asset_type, param_value)
 
         if local_file_path.exists():
             logger.debug(f"[ASSETS] 资产已存在：{local_file_path}")
             return str(local_file_path)
 
-        asset_url = f"{self.base_url}{asset_type.value}{param_value}"
-        try:
-            self.download_file(asset_url, local_file_path, self.proxy, get_args)
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"[ASSETS] 下载文件失败：{asset_url}, 错误信息：{e}")
+        if not self.is_missing(local_file_path):
+            asset_url = f"{self.base_url}{asset_type.value}{param_value}"
+            status = self.download_file(
+                asset_url, local_file_path, self.proxy, get_args
+            )
+            self._record_download(asset_type, asset_url, local_file_path, status)
+
+        if not local_file_path.exists():
+            placeholder = self._placeholder(asset_type, param_value)
+            if placeholder is not None:
+                return self.get(asset_type, placeholder)
         return str(local_file_path)
 
     async def get_async(
@@ -112,76 +203,320 @@ class Assets:
         """
         获取资产 (异步)
         """
-        param_value = str(param_value)
-        if asset_type == AssetType.COVER:
-            if param_value.endswith(".png"):
-                param_value = param_value[:-4]
-            param_value = str(common_to_lxns_songid(int(param_value)))
-
-        if asset_type == AssetType.IMAGES and not param_value.lower().endswith(
-            (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp")
-        ):
-            param_value += ".png"
-
-        file_name = param_value if asset_type == AssetType.IMAGES else f"{param_value}"
-        local_file_path = Path(self.assets_folder, asset_type.name.lower(), file_name)
+        param_value, local_file_path = self._resolve(asset_type, param_value)
 
         if local_file_path.exists():
             logger.debug(f"[ASSETS] 资产已存在：{local_file_path}")
             return str(local_file_path)
 
-        asset_url = f"{self.base_url}{asset_type.value}{param_value}"
+        if self.is_missing(local_file_path):
+            placeholder = self._placeholder(asset_type, param_value)
+            if placeholder is not None:
+                return await self.get_async(asset_type, placeholder)
+            return str(local_file_path)
+
+        # 同一个资产同时只下载一次，其余请求等待同一个下载任务
+        task = self._downloads.get(local_file_path)
+        if task is None:
+            asset_url = f"{self.base_url}{asset_type.value}{param_value}"
+            task = asyncio.create_task(
+                self._download_asset(asset_type, asset_url, local_file_path, get_args)
+            )
+            self._downloads[local_file_path] = task
+            task.add_done_callback(lambda _: self._downloads.pop(local_file_path, None))
+        else:
+            logger.debug(f"[ASSETS] 等待正在进行的下载：{local_file_path}")
+
+        # shield: 某个等待方被取消时不影响其他等待同一下载的请求
+        await asyncio.shield(task)
+
+        if not local_file_path.exists():
+            placeholder = self._placeholder(asset_type, param_value)
+            if placeholder is not None:
+                return await self.get_async(asset_type, placeholder)
+        return str(local_file_path)
+
+    async def _download_asset(
+        self,
+        asset_type: AssetType,
+        asset_url: str,
+        local_file_path: Path,
+        get_args="",
+    ) -> None:
+        """
+        下载单个资产，由 get_async 以 single-flight 的方式调用
+        """
+        status = None
         try:
-            await self.download_file_async(
+            status = await self.download_file_async(
                 asset_url, local_file_path, self.proxy, get_args
             )
-        except aiohttp.ServerTimeoutError:
-            logger.warning(f"[ASSETS] 下载文件超时：{asset_url}")
-        return str(local_file_path)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # 失败不向等待同一下载的请求抛出，由调用方使用占位资产
+            logger.warning(f"[ASSETS] 下载文件失败：{asset_url}, 错误信息：{e}")
+        self._record_download(asset_type, asset_url, local_file_path, status)
+
+    def _placeholder(self, asset_type: AssetType, param_value: str) -> str | None:
+        """
+        获取缺失资产的占位参数，没有占位资产时返回 None
+        """
+        placeholder = ASSET_PLACEHOLDERS.get(asset_type)
+        if placeholder is None or placeholder == param_value:
+            return None
+        return placeholder
+
+    def _get_missing_path(self) -> Path:
+        return Path(self.assets_folder, "missing_assets.json")
+
+    def _load_missing(self) -> Dict[str, dict]:
+        """
+        从磁盘读取上游缺失资产的记录
+        """
+        missing_path = self._get_missing_path()
+        if not missing_path.exists():
+            return {}
+        try:
+            with open(missing_path, "r") as file:
+                missing = json.load(file)
+            # 忽略按旧规则记录的暂时性失败
+            return {
+                path: record
+                for path, record in missing.items()
+                if record.get("status") in MISSING_ASSET_STATUSES
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"[ASSETS] 读取缺失资产记录失败：{missing_path}, {e}")
+            return {}
+
+    def _save_missing(self) -> None:
+        """
+        清理过期记录并写入磁盘
+        """
+        now = time.time()
+        self._missing = {
+            path: record
+            for path, record in self._missing.items()
+            if now - record["time"] < self.missing_ttl
+        }
+        write_file_atomic(
+            self._get_missing_path(),
+            json.dumps(self._missing, ensure_ascii=False, indent=2).encode(),
+        )
+
+    def _record_download(
+        self,
+        asset_type: AssetType,
+        asset_url: str,
+        local_file_path: Path,
+        status: int | None,
+    ) -> None:
+        """
+        根据下载结果更新缺失记录。
+
+        只有上游明确返回 404/410 时才记为缺失。没有占位资产的类型不记录，
+        以免缺失期间绘图时既没有资产也没有占位资产可用。
+        """
+        key = str(local_file_path)
+        if status in MISSING_ASSET_STATUSES and asset_type in ASSET_PLACEHOLDERS:
+            self._missing[key] = {
+                "url": asset_url,
+                "status": status,
+                "time": time.time(),
+            }
+            logger.warning(f"[ASSETS] 上游缺失资产，已记录：{asset_url} ({status})")
+            self._save_missing()
+        elif key in self._missing and local_file_path.exists():
+            del self._missing[key]
+            self._save_missing()
+
+    def is_missing(self, local_file_path: str | Path) -> bool:
+        """
+        判断资产是否已知在上游缺失且记录未过期
+        """
+        record = self._missing.get(str(local_file_path))
+        return record is not None and time.time() - record["time"] < self.missing_ttl
+
+    def missing_report(self) -> List[dict]:
+        """
+        获取已知缺失的资产列表
+
+        Returns:
+            List[dict]: 每项包含 path, url, status, since, expires_in (秒)。
+        """
+        now = time.time()
+        return sorted(
+            (
+                {
+                    "path": path,
+                    "url": record["url"],
+                    "status": record["status"],
+                    "since": record["time"],
+                    "expires_in": int(record["time"] + self.missing_ttl - now),
+                }
+                for path, record in self._missing.items()
+                if now - record["time"] < self.missing_ttl
+            ),
+            key=lambda item: item["since"],
+        )
+
+    async def prefetch(
+        self,
+        items: Iterable[Tuple[AssetType, str]],
+        concurrency: int = PREFETCH_CONCURRENCY,
+    ) -> None:
+        """
+        并发下载一组资产中本地缺失的部分，完成后再开始绘图
+
+        Args:
+            items (Iterable[Tuple[AssetType, str]]): (资产类型, 参数) 列表。
+            concurrency (int): 同时进行的下载数上限。
+        """
+        missing = {}
+        for asset_type, param_value in items:
+            _, local_file_path = self._resolve(asset_type, param_value)
+            if not local_file_path.exists():
+                missing[local_file_path] = (asset_type, param_value)
+
+        if not missing:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(asset_type: AssetType, param_value: str) -> None:
+            async with semaphore:
+                await self.get_async(asset_type, param_value)
+
+        start_time = time.time()
+        results = await asyncio.gather(
+            *(fetch(*item) for item in missing.values()), return_exceptions=True
+        )
+        for (asset_type, param_value), result in zip(missing.values(), results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    f"[ASSETS] 预取资产失败：{asset_type.name} {param_value}, 错误信息：{result}"
+                )
+        logger.info(
+            f"[ASSETS] 预取 {len(missing)} 个资产，耗时 {time.time() - start_time:.2f} 秒"
+        )
+
+    async def get_paths(
+        self,
+        items: Iterable[Tuple[AssetType, str]],
+        concurrency: int = PREFETCH_CONCURRENCY,
+    ) -> Dict[Tuple[AssetType, str], str]:
+        """
+        预取一组资产并解析出本地路径，供不访问网络的同步绘图使用
+
+        Args:
+            items (Iterable[Tuple[AssetType, str]]): (资产类型, 参数) 列表。
+            concurrency (int): 同时进行的下载数上限。
+
+        Returns:
+            Dict[Tuple[AssetType, str], str]: (资产类型, 参数) -> 本地路径，
+                上游缺失的资产会指向占位资产。
+        """
+        items = list(
+            dict.fromkeys((asset_type, str(value)) for asset_type, value in items)
+        )
+        await self.prefetch(items, concurrency)
+        paths = await asyncio.gather(*(self.get_async(*item) for item in items))
+        return dict(zip(items, paths))
+
+    def get_json_path(self, json_type: JSONType) -> Path:
+        """
+        获取JSON数据的本地文件路径
+        """
+        return Path(self.assets_folder, "json", f"{json_type.name.lower()}.json")
 
     async def get_json(self, json_type: JSONType) -> dict:
         """
         获取JSON数据 (异步)
+
+        解析后的数据常驻内存，只有本地文件的修改时间变化时才会重新读取。
+        数据过期后先返回旧数据，同时由一个后台任务重新下载 (stale-while-revalidate)。
         """
-        local_file_path = Path(
-            self.assets_folder, "json", f"{json_type.name.lower()}.json"
-        )
+        local_file_path = self.get_json_path(json_type)
 
-        # 检查文件是否存在以及是否过期
-        if local_file_path.exists():
-            file_mod_time = local_file_path.stat().st_mtime
-            current_time = time.time()
-            time_diff = current_time - file_mod_time
-
-            # 如果文件在一天内未过期（86400秒=1天）
-            if time_diff < 86400:
-                logger.info(f"[ASSETS] JSON数据已存在且未过期：{local_file_path}")
-                with open(local_file_path, "r") as file:
-                    return json.load(file)
-            else:
-                logger.info(f"[ASSETS] JSON数据已过期，将重新下载：{json_type.value}")
+        if not local_file_path.exists():
+            # 本地没有任何数据，只能等待下载完成
+            logger.info(f"[ASSETS] JSON数据不存在，将下载：{json_type.value}")
+            return await self._refresh_json(json_type)
+
+        file_mod_time = local_file_path.stat().st_mtime
+        cached = self._json_cache.get(json_type)
+        if cached is None or cached[0] != file_mod_time:
+            with open(local_file_path, "r") as file:
+                cached = (file_mod_time, json.load(file))
+            self._json_cache[json_type] = cached
+            logger.info(f"[ASSETS] 从本地文件加载JSON数据：{local_file_path}")
+
+        # 如果文件超过一天（86400秒=1天）未更新，在后台重新下载
+        if time.time() - file_mod_time >= JSON_EXPIRE_SECONDS:
+            self._refresh_json(json_type)
 
+        return cached[1]
+
+    def _refresh_json(self, json_type: JSONType) -> asyncio.Future:
+        """
+        启动 (或复用) 后台下载任务，同一种JSON同时只有一个下载任务
+        """
+        task = self._json_refresh_tasks.get(json_type)
+        if task is not None and not task.done():
+            return task
+
+        if time.time() < self._json_retry_at.get(json_type, 0):
+            # 上次下载失败，冷却期内不再重试
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(self._cached_json(json_type))
+            return future
+
+        logger.info(f"[ASSETS] 开始下载JSON数据：{json_type.value}")
+        task = asyncio.create_task(self._download_json(json_type))
+        self._json_refresh_tasks[json_type] = task
+        return task
+
+    async def _download_json(self, json_type: JSONType) -> dict:
+        """
+        下载JSON数据并更新内存缓存，失败时返回已有数据或空字典
+        """
+        local_file_path = self.get_json_path(json_type)
         asset_url = json_type.value
+        content = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(asset_url) as response:
-                    if response.status != 200:
-                        logger.warning(f"[ASSETS] 下载JSON数据失败：{asset_url}")
-                        return {}
+            async with http_client.get(asset_url) as response:
+                if response.status == 200:
                     content = await response.json()
-                    sava_folder = local_file_path.parent
-                    if not sava_folder.exists():
-                        sava_folder.mkdir(parents=True)
-                    # 保存到本地文件
-                    with open(local_file_path, "w") as file:
-                        json.dump(content, file)
-                    logger.info(
-                        f"[ASSETS] 从 {asset_url} 下载并保存JSON数据到 {local_file_path}"
-                    )
-                    return content
-        except aiohttp.ServerTimeoutError:
-            logger.warning(f"[ASSETS] 下载JSON数据超时：{asset_url}")
-            return {}
+                else:
+                    logger.warning(f"[ASSETS] 下载JSON数据失败：{asset_url}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"[ASSETS] 下载JSON数据失败：{asset_url}, 错误信息：{e}")
+
+        if content is None:
+            self._json_retry_at[json_type] = time.time() + JSON_RETRY_SECONDS
+            return self._cached_json(json_type)
+
+        # 保存到本地文件
+        try:
+            write_file_atomic(local_file_path, json.dumps(content).encode())
+        except OSError as e:
+            # 写入失败时只在内存中使用新数据，冷却期后再尝试保存
+            logger.error(f"[ASSETS] 保存JSON数据失败：{local_file_path}, 错误信息：{e}")
+            self._json_retry_at[json_type] = time.time() + JSON_RETRY_SECONDS
+            mod_time = (
+                local_file_path.stat().st_mtime if local_file_path.exists() else 0
+            )
+            self._json_cache[json_type] = (mod_time, content)
+            return content
+        self._json_cache[json_type] = (local_file_path.stat().st_mtime, content)
+        logger.info(f"[ASSETS] 从 {asset_url} 下载并保存JSON数据到 {local_file_path}")
+        return content
+
+    def _cached_json(self, json_type: JSONType) -> dict:
+        """
+        获取内存中已有的JSON数据，没有数据时返回该类型固定的空字典，
+        使依赖数据对象是否变化的索引不会在每次下载失败后重建
+        """
+        return self._json_cache.setdefault(json_type, (0, {}))[1]
 
     @staticmethod
     def download_file(url: str, save_path: str, proxy=None, get_args=""):
@@ -196,14 +531,13 @@ class Assets:
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             logger.warning(f"[ASSETS] 下载文件失败：{url}, 错误信息：{e}")
-            return
+            if e.response is not None:
+                return e.response.status_code
+            return None
 
-        save_folder = Path(save_path).parent
-        if not save_folder.exists():
-            save_folder.mkdir(parents=True)
-        with open(save_path, "wb") as file:
-            file.write(response.content)
+        write_file_atomic(save_path, response.content)
         logger.info(f"[ASSETS] 从 {url} 下载并保存文件到 {save_path}")
+        return response.status_code
 
     @staticmethod
     async def download_file_async(url: str, save_path: str, proxy=None, get_args=""):
@@ -211,17 +545,13 @@ class Assets:
         从URL下载文件 (异步)
         """
         logger.info(f"[ASSETS] 下载文件：{url}")
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30)
-        ) as session:
-            async with session.get(url + get_args, proxy=proxy) as response:
-                if response.status != 200:
-                    logger.warning(f"[ASSETS] 下载文件失败：{url}")
-                    return
-                save_folder = Path(save_path).parent
-                if not save_folder.exists():
-                    save_folder.mkdir(parents=True)
-                content = await response.read()
-                with open(save_path, "wb") as file:
-                    file.write(content)
-                logger.info(f"[ASSETS] 从 {url} 下载并保存文件到 {save_path}")
+        async with http_client.get(
+            url + get_args, proxy=proxy, timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if response.status != 200:
+                logger.warning(f"[ASSETS] 下载文件失败：{url}")
+                return response.status
+            content = await response.read()
+            write_file_atomic(save_path, content)
+            logger.info(f"[ASSETS] 从 {url} 下载并保存文件到 {save_path}")
+            return response.status
@@ -0,0 +1,6 @@
+from .dispatcher import (
+    DROP_BUSY,
+    DROP_QUEUE_FULL,
+    CommandDispatcher,
+    command_dispatcher,
+)
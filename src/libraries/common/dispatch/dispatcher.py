@@ -0,0 +1,194 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from botpy import logger
+
+# 关闭时等待进行中指令的最长时间（秒）
+DISPATCH_CLOSE_TIMEOUT = 10
+
+# 请求被丢弃的原因：同一用户的该指令仍在处理中
+DROP_BUSY = "busy"
+
+# 请求被丢弃的原因：排队数已达上限
+DROP_QUEUE_FULL = "queue_full"
+
+# 指令的默认选项
+DEFAULT_COMMAND_OPTIONS = {
+    # 同一指令同时执行的数量上限，None 表示不限制
+    "concurrency": None,
+    # 等待执行的数量上限，超过时丢弃新的请求，None 表示不限制
+    "max_queue": None,
+    # 同一用户同时只能有一个该指令在处理
+    "per_user": False,
+}
+
+
+class CommandDispatcher:
+    """
+    指令调度器。
+
+    每条指令作为独立的任务运行并被追踪，调度本身立即返回。
+    插件可以通过 COMMAND_OPTIONS 为指令设置并发上限、排队上限与
+    按用户去重；超过排队上限或重复的请求会被丢弃并返回原因，
+    由调用方回复用户，避免突发流量堆积无限的工作。
+    渲染的并发由 render_executor 在渲染时单独限制。
+    """
+
+    def __init__(self) -> None:
+        self._options: Dict[str, dict] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # 正在处理的 (指令, 用户ID)
+        self._active_users: Set[Tuple[str, str]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def configure(self, command: str, **options: Any) -> None:
+        """
+        设置指令的调度选项，未设置的选项使用 DEFAULT_COMMAND_OPTIONS
+
+        Args:
+            command (str): 指令名。
+        """
+        unknown = set(options) - set(DEFAULT_COMMAND_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown command options for {command}: {unknown}")
+        self._options[command] = {**DEFAULT_COMMAND_OPTIONS, **options}
+        concurrency = self._options[command]["concurrency"]
+        if concurrency:
+            self._semaphores[command] = asyncio.Semaphore(concurrency)
+        else:
+            self._semaphores.pop(command, None)
+
+    def _command_stats(self, command: str) -> Dict[str, float]:
+        if command not in self._stats:
+            self._stats[command] = {
+                "queued": 0,
+                "running": 0,
+                "completed": 0,
+                "failed": 0,
+                "dropped": 0,
+                "max_queue_depth": 0,
+                "total_wait": 0.0,
+                "max_wait": 0.0,
+            }
+        return self._stats[command]
+
+    def dispatch(
+        self,
+        command: str,
+        handler: Callable[..., Awaitable[Any]],
+        *args: Any,
+        user_id: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        以任务的形式执行指令处理函数
+
+        Args:
+            command (str): 指令名。
+            handler (Callable[..., Awaitable[Any]]): 指令处理函数。
+            *args: 处理函数的参数。
+            user_id (str, optional): 发送指令的用户ID，用于按用户去重。
+
+        Returns:
+            Optional[str]: 请求被丢弃时返回原因 (DROP_BUSY 或 DROP_QUEUE_FULL)，
+                否则返回 None。
+        """
+        options = self._options.get(command, DEFAULT_COMMAND_OPTIONS)
+        stats = self._command_stats(command)
+
+        user_key = None
+        if options["per_user"] and user_id is not None:
+            user_key = (command, user_id)
+            if user_key in self._active_users:
+                stats["dropped"] += 1
+                logger.info(f"[DISPATCH] 用户 {user_id} 的 {command} 仍在处理中，忽略")
+                return DROP_BUSY
+
+        max_queue = options["max_queue"]
+        if max_queue is not None and stats["queued"] >= max_queue:
+            stats["dropped"] += 1
+            logger.warning(f"[DISPATCH] {command} 排队数已达上限 {max_queue}，丢弃请求")
+            return DROP_QUEUE_FULL
+
+        if user_key is not None:
+            self._active_users.add(user_key)
+        stats["queued"] += 1
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], stats["queued"])
+
+        task = asyncio.create_task(
+            self._run(command, handler, args, user_key),
+            name=f"[DISPATCH] {command}",
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return None
+
+    async def _run(
+        self,
+        command: str,
+        handler: Callable[..., Awaitable[Any]],
+        args: tuple,
+        user_key: Optional[Tuple[str, str]],
+    ) -> Any:
+        stats = self._command_stats(command)
+        queued_at = time.monotonic()
+        started = False
+        try:
+            async with AsyncExitStack() as stack:
+                if command in self._semaphores:
+                    await stack.enter_async_context(self._semaphores[command])
+                wait = time.monotonic() - queued_at
+                stats["queued"] -= 1
+                stats["running"] += 1
+                stats["total_wait"] += wait
+                stats["max_wait"] = max(stats["max_wait"], wait)
+                started = True
+                try:
+                    result = await handler(*args)
+                    stats["completed"] += 1
+                    return result
+                except Exception:
+                    stats["failed"] += 1
+                    logger.exception(f"[DISPATCH] 指令 {command} 执行出错")
+                finally:
+                    stats["running"] -= 1
+        finally:
+            if not started:
+                stats["queued"] -= 1
+            if user_key is not None:
+                self._active_users.discard(user_key)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各指令的调度统计
+        """
+        result = {}
+        for command, stats in self._stats.items():
+            started = stats["completed"] + stats["failed"] + stats["running"]
+            result[command] = {
+                **stats,
+                "avg_wait": stats["total_wait"] / started if started else 0.0,
+            }
+        return result
+
+    def log_stats(self) -> None:
+        logger.info(f"[DISPATCH] 指令调度统计: {self.stats()}")
+
+    async def close(self, timeout: float = DISPATCH_CLOSE_TIMEOUT) -> None:
+        """
+        等待进行中的指令完成，超时后取消
+        """
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"[DISPATCH] 已取消 {len(pending)} 个未完成的指令")
+
+
+# 应用级共享的指令调度器
+command_dispatcher = CommandDispatcher()
@@ -1,2 +1,2 @@
 from .temp import TempFileManager
-from .upload import upload_to_image_server
+from .upload import upload_to_image_server, UploadCache, upload_cache
@@ -1,32 +1,214 @@
+import asyncio
+import hashlib
 import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
 import aiohttp
+from botpy import logger
 from config import IMAGES_SERVER_ADDRESS
 
+from src.libraries.common.http import http_client
+
+# 图片服务器 URL 的缓存时间（秒）
+UPLOAD_URL_TTL = 86400
+
+# 群富媒体对象的最长缓存时间（秒），接口返回 ttl 为 0 (长期有效) 时使用
+GROUP_MEDIA_MAX_TTL = 86400
+
+# 群富媒体对象在接口给出的有效期前提前失效的时间（秒）
+GROUP_MEDIA_TTL_MARGIN = 60
+
+# 缓存的条目数上限
+UPLOAD_CACHE_SIZE = 5000
+
+
+def image_file_info(data: bytes) -> tuple[str, str]:
+    """
+    根据图片数据的文件头判断扩展名与 MIME 类型。
+
+    Args:
+        data (bytes): 图片数据。
 
-async def upload_to_image_server(file_path):
+    Returns:
+        tuple[str, str]: (扩展名, MIME 类型)，无法识别时按 PNG 处理。
     """
-    将本地图片上传到自己的服务器，并返回图片的URL。
+    if data.startswith(b"\xff\xd8"):
+        return ".jpg", "image/jpeg"
+    if data.startswith(b"GIF8"):
+        return ".gif", "image/gif"
+    if data[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    return ".png", "image/png"
+
+
+async def upload_to_image_server(file_path: str | bytes):
+    """
+    将本地图片或内存中的图片数据上传到自己的服务器，并返回图片的URL。
     """
     upload_url = f"{IMAGES_SERVER_ADDRESS}/upload/"  # 替换为你的服务器上传接口
 
-    # 打开文件进行上传
-    async with aiohttp.ClientSession() as session:
+    if isinstance(file_path, bytes):
+        # 内存中的图片数据以内容哈希命名，不经过磁盘
+        data = file_path
+        suffix, content_type = image_file_info(data)
+        filename = f"{hashlib.md5(data).hexdigest()}{suffix}"
+    else:
         with open(file_path, "rb") as f:
-            # 创建一个 form data
-            form_data = aiohttp.FormData()
-            form_data.add_field(
-                "file",
-                f,
-                filename=os.path.basename(file_path),
-                content_type="image/png",  # 根据实际情况设置文件类型
+            data = f.read()
+        filename = os.path.basename(file_path)
+        content_type = "image/png"
+
+    # 创建一个 form data
+    form_data = aiohttp.FormData()
+    form_data.add_field(
+        "file",
+        data,
+        filename=filename,
+        content_type=content_type,  # 根据实际情况设置文件类型
+    )
+
+    # 上传文件到服务器
+    async with http_client.post(upload_url, data=form_data) as response:
+        if response.status == 200:
+            response_data = await response.json()
+            # 假设服务器返回的数据结构中有一个 'file_url' 字段
+            url = response_data.get("file_url")
+            return url
+        else:
+            raise Exception(f"Failed to upload file: {response.status}")
+
+
+class UploadCache:
+    """
+    以内容哈希为键的上传缓存。
+
+    相同的图片数据只上传一次到图片服务器；同一群内相同的 URL 在
+    富媒体对象的有效期内也只调用一次 post_group_file。同一内容的并发
+    上传会合并为一次。缓存只保存哈希，不保存图片数据。
+    """
+
+    def __init__(
+        self,
+        url_ttl: float = UPLOAD_URL_TTL,
+        max_size: int = UPLOAD_CACHE_SIZE,
+    ) -> None:
+        self.url_ttl = url_ttl
+        self.max_size = max_size
+        # 内容哈希 -> (过期时间, URL)
+        self._urls: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        # (群ID, 内容哈希) -> (过期时间, 富媒体对象)
+        self._media: OrderedDict[Tuple[str, str], Tuple[float, Any]] = OrderedDict()
+        # 进行中的上传任务
+        self._pending: Dict[Any, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _read(file_image: str | bytes) -> bytes:
+        if isinstance(file_image, bytes):
+            return file_image
+        with open(file_image, "rb") as f:
+            return f.read()
+
+    def _lookup(self, entries: OrderedDict, key) -> Optional[Any]:
+        entry = entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, entries: OrderedDict, key, ttl: float, value: Any) -> None:
+        entries[key] = (time.time() + ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    async def _once(self, key, factory):
+        """
+        合并同一个键的并发请求
+        """
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def get_url(self, file_image: str | bytes) -> str:
+        """
+        获取图片在图片服务器上的 URL，未上传过时上传
+
+        Args:
+            file_image (str | bytes): 图片文件路径或图片数据。
+        """
+        data = self._read(file_image)
+        digest = hashlib.sha256(data).hexdigest()
+        url = self._lookup(self._urls, digest)
+        if url is not None:
+            return url
+
+        async def upload() -> str:
+            url = await upload_to_image_server(data)
+            logger.info(f"[UPLOAD] Upload image to SERVER: {url}")
+            if url:
+                self._store(self._urls, digest, self.url_ttl, url)
+            return url
+
+        return await self._once(digest, upload)
+
+    async def get_group_media(self, api, group_openid: str, file_image: str | bytes):
+        """
+        获取可在群内发送的富媒体对象，有效期内重复发送相同图片时不再上传
+
+        Args:
+            api (BotAPI): 机器人 API。
+            group_openid (str): 群ID。
+            file_image (str | bytes): 图片文件路径或图片数据。
+        """
+        data = self._read(file_image)
+        key = (group_openid, hashlib.sha256(data).hexdigest())
+        media = self._lookup(self._media, key)
+        if media is not None:
+            return media
+
+        async def upload():
+            image_url = await self.get_url(data)
+            if not image_url:
+                return None
+            # 上传图片的URL到群文件管理
+            media = await api.post_group_file(
+                group_openid=group_openid,
+                file_type=1,
+                url=image_url,
+                srv_send_msg=False,
             )
+            ttl = (media or {}).get("ttl") or GROUP_MEDIA_MAX_TTL
+            ttl = min(ttl, GROUP_MEDIA_MAX_TTL) - GROUP_MEDIA_TTL_MARGIN
+            if media and ttl > 0:
+                self._store(self._media, key, ttl, media)
+            return media
+
+        return await self._once(key, upload)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "urls": len(self._urls),
+            "media": len(self._media),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"[UPLOAD] 上传缓存统计: {self.stats()}")
+
 
-            # 上传文件到服务器
-            async with session.post(upload_url, data=form_data) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    # 假设服务器返回的数据结构中有一个 'file_url' 字段
-                    url = response_data.get("file_url")
-                    return url
-                else:
-                    raise Exception(f"Failed to upload file: {response.status}")
+# 应用级共享的上传缓存
+upload_cache = UploadCache()
@@ -1,4 +1,8 @@
 from .platform import Interface, DivingFishInterface, LxnsInterface
+from .catalog import SongCatalog, song_catalog
+from .alias import AliasIndex, alias_index, normalize_alias
+from .search import SongSearch, song_search
+from .snapshot import B50SnapshotCache, b50_snapshots
 from .song import Song
 from ._types import *
 from .enums import *
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from botpy import logger
+from src.libraries.assets import assets, JSONType
+
+
+def normalize_alias(alias: str) -> str:
+    """
+    别名的标准形式：小写并去除空白
+    """
+    return "".join(alias.lower().split())
+
+
+class AliasIndex:
+    """
+    乐曲别名的倒排索引，进程内共享。
+
+    以标准化后的别名为键，映射到乐曲ID集合；同时保存排序后的别名列表，
+    用于前缀查询。与 SongCatalog 相同，只有当 Assets.get_json 返回了
+    新的数据对象时才会重建索引。
+    """
+
+    def __init__(self) -> None:
+        # 标准化别名 -> 乐曲ID集合
+        self._index: Dict[str, Set[int]] = {}
+        # 排序后的标准化别名
+        self._keys: List[str] = []
+        # 乐曲ID -> 原始别名列表
+        self._aliases: Dict[int, List[str]] = {}
+        # 构建索引所用的 JSON 数据
+        self._source: Optional[dict] = None
+        # 索引的版本号，每次重建后递增，依赖本索引的其他索引据此判断是否需要重建
+        self.version = 0
+
+    async def load(self) -> "AliasIndex":
+        """
+        确保索引可用，必要时从 JSONType.ALIAS 重建。
+
+        Returns:
+            AliasIndex: 当前实例。
+        """
+        data = await assets.get_json(JSONType.ALIAS)
+        if data is not self._source:
+            self._build(data)
+            self._source = data
+            self.version += 1
+        return self
+
+    def _build(self, data: dict) -> None:
+        """
+        根据别名数据构建索引
+
+        Args:
+            data (dict): 乐曲ID -> 别名列表。
+        """
+        index: Dict[str, Set[int]] = {}
+        aliases: Dict[int, List[str]] = {}
+        for song_id, song_aliases in data.items():
+            song_id = int(song_id)
+            aliases[song_id] = list(song_aliases)
+            for alias in song_aliases:
+                key = normalize_alias(alias)
+                if key:
+                    index.setdefault(key, set()).add(song_id)
+
+        self._index = index
+        self._keys = sorted(index)
+        self._aliases = aliases
+        logger.info(
+            f"[ALIAS] 别名索引已构建: {len(aliases)} 首乐曲, {len(index)} 个别名"
+        )
+
+    def exact(self, alias: str) -> Set[int]:
+        """
+        查询别名完全一致的乐曲
+
+        Args:
+            alias (str): 别名。
+
+        Returns:
+            Set[int]: 乐曲ID集合。
+        """
+        return set(self._index.get(normalize_alias(alias), ()))
+
+    def prefix(self, alias: str) -> Set[int]:
+        """
+        查询以该别名开头的乐曲
+        """
+        key = normalize_alias(alias)
+        result: Set[int] = set()
+        if not key:
+            return result
+        for i in range(bisect_left(self._keys, key), len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            result |= self._index[self._keys[i]]
+        return result
+
+    def substring(self, alias: str) -> Set[int]:
+        """
+        查询别名中包含该字符串的乐曲
+        """
+        key = normalize_alias(alias)
+        result: Set[int] = set()
+        if not key:
+            return result
+        for name, song_ids in self._index.items():
+            if key in name:
+                result |= song_ids
+        return result
+
+    def items(self) -> Iterator[Tuple[str, Set[int]]]:
+        """
+        遍历标准化别名及其乐曲ID集合
+        """
+        return iter(self._index.items())
+
+    def get_aliases(self, song_id: int) -> List[str]:
+        """
+        获取乐曲的全部别名
+
+        Args:
+            song_id (int): 乐曲ID。
+        """
+        return list(self._aliases.get(song_id, ()))
+
+
+# 进程内共享的别名索引
+alias_index = AliasIndex()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, Optional, Tuple
+
+from botpy import logger
+from src.libraries.assets import assets, JSONType
+
+from .enums import SongType, SongLevel
+
+
+class SongCatalog:
+    """
+    LXNS 曲目列表的索引，进程内共享。
+
+    以 (LXNS 乐曲ID, 乐曲类型, 难度索引) 为键，提供 O(1) 的定数与音符总数查询。
+    Assets.get_json 会缓存解析后的数据，只有当它返回了新的数据对象
+    (即本地 JSON 文件被刷新) 时才会重建索引。
+    """
+
+    def __init__(self) -> None:
+        # LXNS 乐曲ID -> 乐曲数据
+        self._songs: Dict[int, dict] = {}
+        # (LXNS 乐曲ID, 乐曲类型, 难度索引) -> 难度数据
+        self._difficulties: Dict[Tuple[int, str, int], dict] = {}
+        # 构建索引所用的 JSON 数据
+        self._source: Optional[dict] = None
+        # 索引的版本号，每次重建后递增，依赖本索引的其他索引据此判断是否需要重建
+        self.version = 0
+
+    async def load(self) -> "SongCatalog":
+        """
+        确保索引可用，必要时从 JSONType.LXNS_SONGS_INFO 重建。
+
+        Returns:
+            SongCatalog: 当前实例。
+        """
+        data = await assets.get_json(JSONType.LXNS_SONGS_INFO)
+        if data is not self._source:
+            self._build(data)
+            self._source = data
+            self.version += 1
+        return self
+
+    def _build(self, data: dict) -> None:
+        """
+        根据曲目列表构建索引
+
+        Args:
+            data (dict): LXNS 曲目列表 JSON 数据。
+        """
+        songs = {}
+        difficulties = {}
+        for song in data.get("songs", []):
+            songs[song["id"]] = song
+            for song_type, song_difficulties in song.get("difficulties", {}).items():
+                for index, difficulty in enumerate(song_difficulties or []):
+                    level_index = difficulty.get("difficulty", index)
+                    difficulties[(song["id"], song_type, level_index)] = difficulty
+
+        self._songs = songs
+        self._difficulties = difficulties
+        logger.info(
+            f"[CATALOG] 曲目索引已构建: {len(songs)} 首乐曲, {len(difficulties)} 个谱面"
+        )
+
+    def has_song(self, song_id: int) -> bool:
+        """
+        判断曲目列表中是否存在该乐曲
+
+        Args:
+            song_id (int): LXNS 乐曲ID。
+        """
+        return song_id in self._songs
+
+    def songs(self) -> Iterator[dict]:
+        """
+        遍历全部乐曲数据
+        """
+        return iter(self._songs.values())
+
+    def get_song(self, song_id: int) -> Optional[dict]:
+        """
+        获取乐曲数据
+
+        Args:
+            song_id (int): LXNS 乐曲ID。
+
+        Returns:
+            Optional[dict]: 乐曲数据，不存在时返回 None。
+        """
+        return self._songs.get(song_id)
+
+    def get_difficulty(
+        self, song_id: int, song_type: SongType, level_index: SongLevel | int
+    ) -> Optional[dict]:
+        """
+        获取谱面数据
+
+        Args:
+            song_id (int): LXNS 乐曲ID。
+            song_type (SongType): 乐曲类型。
+            level_index (SongLevel | int): 难度索引。
+
+        Returns:
+            Optional[dict]: 谱面数据，不存在时返回 None。
+        """
+        if isinstance(level_index, SongLevel):
+            level_index = level_index.value
+        return self._difficulties.get((song_id, song_type.value, level_index))
+
+    def get_level_value(
+        self, song_id: int, song_type: SongType, level_index: SongLevel | int
+    ) -> Optional[float]:
+        """
+        获取谱面定数
+        """
+        difficulty = self.get_difficulty(song_id, song_type, level_index)
+        return difficulty["level_value"] if difficulty else None
+
+    def get_notes_total(
+        self, song_id: int, song_type: SongType, level_index: SongLevel | int
+    ) -> Optional[int]:
+        """
+        获取谱面音符总数
+        """
+        difficulty = self.get_difficulty(song_id, song_type, level_index)
+        if not difficulty or not difficulty.get("notes"):
+            return None
+        return difficulty["notes"]["total"]
+
+
+# 进程内共享的曲目索引
+song_catalog = SongCatalog()
@@ -2,11 +2,11 @@ from __future__ import annotations
 
 from typing import Dict, List, Union, TYPE_CHECKING
 
-import aiohttp
 from botpy import logger
-from src.libraries.assets import assets, JSONType
+from src.libraries.common.http import http_client
 
 from .interface import Interface
+from ..catalog import song_catalog
 
 from ..enums import *
 from .._types import UserInfo, SongDifficulty, UserDifficultyScore
@@ -17,7 +17,6 @@ if TYPE_CHECKING:
 
 from ..maimai import MaimaiHelper
 
-
 BASE_API = "https://www.diving-fish.com/api/maimaidxprober/query"
 
 
@@ -30,21 +29,21 @@ class DivingFishInterface(Interface):
     async def fetch_single_song_score(self, id: int) -> Song:
         pass
 
-    async def fetch_best50_song_score(self) -> Dict[str, Union[UserInfo, List[Song]]]:
+    async def fetch_best50_song_score(
+        self, previous: Dict = None
+    ) -> Dict[str, Union[UserInfo, List[Song]]]:
+        # 水鱼没有数据版本信息，总是重新获取
         # 第一步 获取用户信息
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                BASE_API + "/player",
-                json={"username": self.id, "b50": True},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"[Fish] 用户信息获取成功: {self.id}")
-                else:
-                    logger.error(
-                        f"[Fish] 用户信息获取失败: {self.id} {response.status}"
-                    )
-                    return None
+        async with http_client.post(
+            BASE_API + "/player",
+            json={"username": self.id, "b50": True},
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                logger.info(f"[Fish] 用户信息获取成功: {self.id}")
+            else:
+                logger.error(f"[Fish] 用户信息获取失败: {self.id} {response.status}")
+                return None
 
         user_info = UserInfo(
             username=data["nickname"],
@@ -108,23 +107,21 @@ class DivingFishInterface(Interface):
             song_difficulty.user_score = user_score
             b35.append(song_difficulty)
 
-        total_songs_data_raw = await assets.get_json(JSONType.LXNS_SONGS_INFO)
-        total_songs_data = total_songs_data_raw["songs"]
+        catalog = await song_catalog.load()
 
         def enrich_difficulty_score(
             songs: List[SongDifficulty],
         ) -> List[SongDifficulty]:
-            for song_data in total_songs_data:
-                for song in songs:
-                    if song.id == song_data["id"]:
-                        song.dx_rating_max = (
-                            song_data["difficulties"][song.song_type.value][
-                                song.level_index
-                            ]["notes"]["total"]
-                            * 3
-                        )
-                        # 乐曲id变更
-                        song.id = MaimaiHelper.lxns_to_common_songid(song.id)
+            for song in songs:
+                if not catalog.has_song(song.id):
+                    continue
+                notes_total = catalog.get_notes_total(
+                    song.id, song.song_type, song.level_index
+                )
+                if notes_total is not None:
+                    song.dx_rating_max = notes_total * 3
+                # 乐曲id变更
+                song.id = MaimaiHelper.lxns_to_common_songid(song.id)
             return songs
 
         b15 = enrich_difficulty_score(b15)
@@ -26,5 +26,12 @@ class Interface:
     async def fetch_b50_data(self) -> Dict[str, Song]:
         pass
 
+    async def fetch_best50_song_score(self, previous: Dict = None) -> Dict:
+        """
+        Args:
+            previous (Dict): 上一次获取的 B50 数据，平台可以据此判断数据是否变化。
+        """
+        pass
+
     async def _get_total_song_data(self):
         BASE_API = ""
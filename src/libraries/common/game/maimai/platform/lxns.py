@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from typing import Dict, List, Union, TYPE_CHECKING
-import aiohttp
 
 from botpy import logger
+from src.libraries.common.http import http_client
 
 from .interface import Interface
+from ..catalog import song_catalog
 from ..enums import *
 from .._types import UserInfo, SongDifficulty, UserDifficultyScore
 
@@ -13,7 +14,6 @@ if TYPE_CHECKING:
     from ..song import Song
 
 from ..maimai import MaimaiHelper
-from src.libraries.assets import assets, JSONType
 
 BASE_API = "https://maimai.lxns.net/api/v0/maimai"
 
@@ -27,17 +27,16 @@ class LxnsInterface(Interface):
         self.lxns_api = lxns_api
 
     async def _get_friend_code(self):
-        async with aiohttp.ClientSession() as session:
-            url = f"{BASE_API}/player/qq/{self.id}"
-            async with session.get(
-                url=url,
-                headers={"Authorization": self.lxns_api},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    self.friend_code = str(data["data"]["friend_code"])
-                else:
-                    self.friend_code = None
+        url = f"{BASE_API}/player/qq/{self.id}"
+        async with http_client.get(
+            url=url,
+            headers={"Authorization": self.lxns_api},
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                self.friend_code = str(data["data"]["friend_code"])
+            else:
+                self.friend_code = None
 
     async def fetch_user_info(self) -> UserInfo:
         """获取用户信息。
@@ -45,20 +44,17 @@ class LxnsInterface(Interface):
         Returns:
             UserInfo: 用户信息。
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                BASE_API + f"/player/qq/{self.id}",
-                headers={"Authorization": self.lxns_api},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    data = data["data"]
-                    logger.info(f"[LXNS] 用户信息获取成功: {self.id}")
-                else:
-                    logger.error(
-                        f"[LXNS] 用户信息获取失败: {self.id} {response.status}"
-                    )
-                    return None
+        async with http_client.get(
+            BASE_API + f"/player/qq/{self.id}",
+            headers={"Authorization": self.lxns_api},
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                data = data["data"]
+                logger.info(f"[LXNS] 用户信息获取成功: {self.id}")
+            else:
+                logger.error(f"[LXNS] 用户信息获取失败: {self.id} {response.status}")
+                return None
         return UserInfo(
             username=data.get("name", "未知"),
             avatar=str(data.get("icon", {}).get("id", "")),
@@ -84,17 +80,16 @@ class LxnsInterface(Interface):
             song_id = song.id
             song_type = SongType.UTAGE.value
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                BASE_API + f"/player/{self.friend_code}/bests/",
-                headers={"Authorization": self.lxns_api},
-                params={"song_id": song_id, "song_type": song_type},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    data = data["data"]
-                else:
-                    return None
+        async with http_client.get(
+            BASE_API + f"/player/{self.friend_code}/bests/",
+            headers={"Authorization": self.lxns_api},
+            params={"song_id": song_id, "song_type": song_type},
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                data = data["data"]
+            else:
+                return None
 
         for score in data:
             user_difficulty_score = UserDifficultyScore(
@@ -110,25 +105,24 @@ class LxnsInterface(Interface):
 
         return song
 
-    async def fetch_best50_song_score(self) -> Dict[str, Union[UserInfo, List[Song]]]:
+    async def fetch_best50_song_score(
+        self, previous: Dict = None
+    ) -> Dict[str, Union[UserInfo, List[Song]]]:
         # if not self.friend_code:
         #     await self._get_friend_code()
         # 第一步 获取用户信息h
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                BASE_API + f"/player/qq/{self.id}",
-                headers={"Authorization": self.lxns_api},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    data = data["data"]
-                    logger.info(f"[LXNS] 用户信息获取成功: {self.id}")
-                else:
-                    logger.error(
-                        f"[LXNS] 用户信息获取失败: {self.id} {response.status}"
-                    )
-                    return None
+        async with http_client.get(
+            BASE_API + f"/player/qq/{self.id}",
+            headers={"Authorization": self.lxns_api},
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                data = data["data"]
+                logger.info(f"[LXNS] 用户信息获取成功: {self.id}")
+            else:
+                logger.error(f"[LXNS] 用户信息获取失败: {self.id} {response.status}")
+                return None
         # 结构体
         # Player
         # 玩家
@@ -148,6 +142,13 @@ class LxnsInterface(Interface):
         # upload_time	string	仅获取玩家信息返回，玩家被同步时的 UTC 时间
 
         self.friend_code = str(data["friend_code"])
+        upload_time = data.get("upload_time")
+
+        # 玩家数据自上次获取后没有同步过，沿用上一次的成绩
+        if upload_time and previous and previous.get("upload_time") == upload_time:
+            logger.info(f"[LXNS] 玩家数据未变化，沿用 B50 快照: {self.id}")
+            return previous
+
         user_info = UserInfo(
             username=data.get("name", "未知"),
             avatar=str(data.get("icon", {}).get("id", "")),
@@ -160,18 +161,17 @@ class LxnsInterface(Interface):
         )
 
         # 第二步 获取B50成绩
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                BASE_API + f"/player/{self.friend_code}/bests",
-                headers={"Authorization": self.lxns_api},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    data = data["data"]
-                    logger.info(f"[LXNS] B50 成绩获取成功: {self.id}")
-
-                else:
-                    return None
+        async with http_client.get(
+            BASE_API + f"/player/{self.friend_code}/bests",
+            headers={"Authorization": self.lxns_api},
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                data = data["data"]
+                logger.info(f"[LXNS] B50 成绩获取成功: {self.id}")
+
+            else:
+                return None
 
         b15 = []
         b35 = []
@@ -190,28 +190,24 @@ class LxnsInterface(Interface):
         # type	SongType	谱面类型
         # play_time	string	值可空，游玩的 UTC 时间，精确到分钟
         # upload_time	string	仅获取 Score 时返回，成绩被同步时的 UTC 时间
-        total_songs_data_raw = await assets.get_json(JSONType.LXNS_SONGS_INFO)
-        total_songs_data = total_songs_data_raw["songs"]
+        catalog = await song_catalog.load()
 
         def enrich_difficulty_score(
             songs: List[SongDifficulty],
         ) -> List[SongDifficulty]:
-            for song_data in total_songs_data:
-                for song in songs:
-                    if song.id == song_data["id"]:
-                        # 乐曲的定数补充
-                        song.level = song_data["difficulties"][song.song_type.value][
-                            song.level_index
-                        ]["level_value"]
-                        # 乐曲dx分补充
-                        song.dx_rating_max = (
-                            song_data["difficulties"][song.song_type.value][
-                                song.level_index
-                            ]["notes"]["total"]
-                            * 3
-                        )
-                        # 乐曲id变更
-                        song.id = MaimaiHelper.lxns_to_common_songid(song.id)
+            for song in songs:
+                if not catalog.has_song(song.id):
+                    continue
+                difficulty = catalog.get_difficulty(
+                    song.id, song.song_type, song.level_index
+                )
+                if difficulty:
+                    # 乐曲的定数补充
+                    song.level = difficulty["level_value"]
+                    # 乐曲dx分补充
+                    song.dx_rating_max = difficulty["notes"]["total"] * 3
+                # 乐曲id变更
+                song.id = MaimaiHelper.lxns_to_common_songid(song.id)
             return songs
 
         for lx_song in data["standard"]:
@@ -273,4 +269,5 @@ class LxnsInterface(Interface):
             "b35": b35,
             "b15_total": data["dx_total"],
             "b35_total": data["standard_total"],
+            "upload_time": upload_time,
         }
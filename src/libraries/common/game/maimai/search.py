@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from botpy import logger
+
+from .alias import AliasIndex, alias_index, normalize_alias
+from .catalog import SongCatalog, song_catalog
+from .maimai import MaimaiHelper
+
+# n-gram 的长度，2 对中日文与英文都比较合适
+NGRAM_SIZE = 2
+
+# 进入编辑距离重排的候选名称数
+RERANK_CANDIDATES = 20
+
+# n-gram Dice 系数低于该值的名称不进入重排
+MIN_DICE = 0.3
+
+# 低于该分数的结果不返回
+MIN_SCORE = 0.35
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> List[str]:
+    """
+    字符 n-gram，短于 n 的字符串返回自身
+    """
+    if len(text) <= n:
+        return [text] if text else []
+    return [text[i : i + n] for i in range(len(text) - n + 1)]
+
+
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    两个字符串的编辑距离
+
+    使用 Myers 的位并行算法，较短的字符串的每个字符占一个比特位，
+    每处理较长字符串的一个字符只需常数次整数运算。
+    给出 max_distance 时，一旦可以确定距离超过 max_distance 就提前返回
+    max_distance + 1。
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is None:
+        max_distance = len(a)
+    over = max_distance + 1
+    if len(a) - len(b) > max_distance:
+        return over
+    if not b:
+        return len(a)
+
+    # 字符 -> 在 b 中出现位置的位图
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(b):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << len(b)) - 1
+    high = 1 << (len(b) - 1)
+    pv, mv = mask, 0
+    distance = len(b)
+    remaining = len(a)
+    for char in a:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            distance += 1
+        elif mh & high:
+            distance -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        remaining -= 1
+        # 每多处理一个字符，距离最多减少 1
+        if distance - remaining > max_distance:
+            return over
+    return distance if distance <= max_distance else over
+
+
+class SongSearch:
+    """
+    乐曲标题与别名的模糊搜索，进程内共享。
+
+    标题来自 SongCatalog，别名来自 AliasIndex，两者之一重建后才重建索引。
+    查询时先用字符 n-gram 倒排索引按 Dice 系数召回候选名称，
+    再结合编辑距离重排，按乐曲聚合后返回得分最高的结果。
+    短于 n-gram 的查询改用单字倒排索引，召回包含该字的最短的名称。
+    """
+
+    def __init__(
+        self, catalog: SongCatalog = song_catalog, aliases: AliasIndex = alias_index
+    ) -> None:
+        self.catalog = catalog
+        self.aliases = aliases
+        # 标准化名称列表
+        self._names: List[str] = []
+        # 与 _names 对应的乐曲ID集合
+        self._song_ids: List[Tuple[int, ...]] = []
+        # 与 _names 对应的 n-gram 数
+        self._gram_counts = np.zeros(0, dtype=np.int32)
+        # n-gram -> 名称下标数组
+        self._postings: Dict[str, np.ndarray] = {}
+        # 单字 -> 名称下标列表，按名称长度排序
+        self._char_postings: Dict[str, List[int]] = {}
+        # 构建索引所用的 (曲目索引版本, 别名索引版本)
+        self._versions: Tuple[int, int] = (-1, -1)
+
+    async def load(self) -> "SongSearch":
+        """
+        确保索引可用，必要时重建。
+
+        Returns:
+            SongSearch: 当前实例。
+        """
+        await self.catalog.load()
+        await self.aliases.load()
+        versions = (self.catalog.version, self.aliases.version)
+        if versions != self._versions:
+            self._build()
+            self._versions = versions
+        return self
+
+    def _build(self) -> None:
+        """
+        根据曲目列表与别名构建索引
+        """
+        names: Dict[str, set] = {}
+        for song in self.catalog.songs():
+            song_ids = set()
+            difficulties = song.get("difficulties", {})
+            if difficulties.get("standard"):
+                song_ids.add(song["id"])
+            if difficulties.get("dx"):
+                song_ids.add(MaimaiHelper.lxns_to_common_songid(song["id"]))
+            key = normalize_alias(song["title"])
+            if key and song_ids:
+                names.setdefault(key, set()).update(song_ids)
+        for key, song_ids in self.aliases.items():
+            names.setdefault(key, set()).update(song_ids)
+
+        self._names = list(names)
+        self._song_ids = [tuple(names[name]) for name in self._names]
+        gram_counts = []
+        postings: Dict[str, List[int]] = {}
+        char_postings: Dict[str, List[int]] = {}
+        for i, name in enumerate(self._names):
+            grams = set(ngrams(name))
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+            for char in set(name):
+                char_postings.setdefault(char, []).append(i)
+        for indices in char_postings.values():
+            indices.sort(key=lambda i: len(self._names[i]))
+        self._gram_counts = np.array(gram_counts, dtype=np.int32)
+        self._postings = {
+            gram: np.array(indices, dtype=np.int32)
+            for gram, indices in postings.items()
+        }
+        self._char_postings = char_postings
+        logger.info(
+            f"[SEARCH] 模糊搜索索引已构建: {len(self._names)} 个名称, {len(postings)} 个 n-gram"
+        )
+
+    def _score(
+        self, query: str, name: str, dice: float, min_score: float = MIN_SCORE
+    ) -> float:
+        """
+        综合 n-gram 相似度与编辑距离的得分，范围 0~1。
+
+        得分低于 min_score 时不计算准确的编辑距离，返回值可能偏低。
+        """
+        if query == name:
+            return 1.0
+        length = max(len(query), len(name))
+        # 查询是名称的一部分时，多半是简称
+        floor = 0.6 + 0.3 * len(query) / len(name) if query in name else 0.0
+        # 编辑距离超过该值时综合得分低于 min_score 与简称得分，无需算出准确值
+        max_distance = int((1 + dice - 2 * max(min_score, floor)) * length)
+        if max_distance < 0:
+            return floor
+        distance = edit_distance(query, name, max_distance)
+        if distance > max_distance:
+            return floor
+        return max((dice + 1 - distance / length) / 2, floor)
+
+    def _recall(self, grams: Set[str]) -> List[Tuple[int, float]]:
+        """
+        按 n-gram Dice 系数召回候选名称
+
+        Returns:
+            List[Tuple[int, float]]: (名称下标, Dice 系数)，按系数从高到低排列，
+                最多 RERANK_CANDIDATES 个，系数不低于 MIN_DICE。
+        """
+        postings = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not postings:
+            return []
+        # 每个名称与查询共有的 n-gram 数
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._names))
+        dice = 2 * shared / (len(grams) + self._gram_counts)
+        indices = np.flatnonzero(dice >= MIN_DICE)
+        if len(indices) > RERANK_CANDIDATES:
+            top = np.argpartition(-dice[indices], RERANK_CANDIDATES - 1)
+            indices = indices[top[:RERANK_CANDIDATES]]
+        return sorted(
+            ((int(i), float(dice[i])) for i in indices),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        模糊搜索乐曲
+
+        Args:
+            query (str): 标题或别名。
+            k (int): 返回的结果数。
+
+        Returns:
+            List[Tuple[int, float]]: (乐曲ID, 得分)，按得分从高到低排列。
+        """
+        query = normalize_alias(query)
+        grams = set(ngrams(query))
+        if not grams:
+            return []
+
+        if len(query) < NGRAM_SIZE:
+            # 单字查询无法用 n-gram 召回，取包含该字的最短的名称
+            candidates = [
+                (i, 0.0) for i in self._char_postings.get(query, [])[:RERANK_CANDIDATES]
+            ]
+        else:
+            candidates = self._recall(grams)
+
+        results: Dict[int, float] = {}
+        # 已有 k 首乐曲时，得分低于第 k 名的名称不会改变结果
+        min_score = MIN_SCORE
+        for i, dice in candidates:
+            score = self._score(query, self._names[i], dice, min_score)
+            if score < min_score:
+                continue
+            for song_id in self._song_ids[i]:
+                if score > results.get(song_id, 0.0):
+                    results[song_id] = score
+            if len(results) >= k:
+                min_score = max(min_score, heapq.nlargest(k, results.values())[-1])
+
+        return sorted(results.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+# 进程内共享的模糊搜索索引
+song_search = SongSearch()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from botpy import logger
+
+# B50 快照在该时间内（秒）直接使用，不访问查分器
+B50_SNAPSHOT_TTL = 120
+
+# 缓存的玩家数上限
+B50_SNAPSHOT_SIZE = 2000
+
+SnapshotKey = Tuple[int, str]
+
+
+class B50SnapshotCache:
+    """
+    玩家 B50 数据的快照缓存，键为 (查分平台, 用户名)。
+
+    快照在 ttl 秒内视为新鲜，可以直接使用；过期的快照仍会保留，
+    供支持版本比对的平台 (LXNS 的 upload_time) 判断数据是否变化。
+    取出的数据是深拷贝，调用方可以自由修改。
+    """
+
+    def __init__(
+        self, ttl: float = B50_SNAPSHOT_TTL, max_size: int = B50_SNAPSHOT_SIZE
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        # 键 -> (写入时间, B50 数据)
+        self._entries: OrderedDict[SnapshotKey, Tuple[float, Dict[str, Any]]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: SnapshotKey) -> Optional[Dict[str, Any]]:
+        """
+        获取新鲜的快照，不存在或已过期时返回 None
+        """
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def peek(self, key: SnapshotKey) -> Optional[Dict[str, Any]]:
+        """
+        获取快照，不论是否过期
+        """
+        entry = self._entries.get(key)
+        return copy.deepcopy(entry[1]) if entry else None
+
+    def put(self, key: SnapshotKey, data: Dict[str, Any]) -> None:
+        """
+        写入快照
+        """
+        self._entries[key] = (time.monotonic(), copy.deepcopy(data))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: SnapshotKey) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"[B50] 快照缓存统计: {self.stats()}")
+
+
+# 进程内共享的 B50 快照缓存
+b50_snapshots = B50SnapshotCache()
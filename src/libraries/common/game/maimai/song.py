@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import List, TYPE_CHECKING
-import aiohttp
+from typing import List, Optional, TYPE_CHECKING
 from botpy import logger
+from src.libraries.common.http import http_client
 
 from .maimai import MaimaiHelper
+from .catalog import song_catalog
 from .enums import *
 from ._types import *
 
@@ -66,16 +67,41 @@ class Song:
     async def enrich(self):
         """
         丰富歌曲信息
+
+        优先从本地曲目索引读取，索引中不存在时才请求 LXNS 接口。
         """
         lxns_id = MaimaiHelper.common_to_lxns_songid(self.id)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://maimai.lxns.net/api/v0/maimai/song/{lxns_id}"
-            ) as response:
-                if response.status == 200:
-                    song = await response.json()
-                else:
-                    return False
+        catalog = await song_catalog.load()
+        song = catalog.get_song(lxns_id)
+        if song is None:
+            song = await self._fetch_song(lxns_id)
+            if song is None:
+                return False
+        self._fill(song)
+        return True
+
+    @staticmethod
+    async def _fetch_song(lxns_id: int) -> Optional[dict]:
+        """
+        从 LXNS 接口获取单首乐曲数据
+
+        Args:
+            lxns_id (int): LXNS 乐曲ID。
+        """
+        async with http_client.get(
+            f"https://maimai.lxns.net/api/v0/maimai/song/{lxns_id}"
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+        return None
+
+    def _fill(self, song: dict):
+        """
+        根据乐曲数据填充歌曲信息
+
+        Args:
+            song (dict): LXNS 乐曲数据，可能是曲目索引中的共享对象，不能修改。
+        """
         self.title = song["title"]
         self.artist = song["artist"]
         self.bpm = song["bpm"]
@@ -113,7 +139,6 @@ class Song:
             )
 
             self._append_difficulty(difficulty)
-        return True
 
     def add_user_score(self, user_score: UserDifficultyScore):
         """
@@ -2,9 +2,12 @@ from __future__ import annotations
 
 from typing import Dict, List, Union, TYPE_CHECKING
 
+from botpy import logger
+
 from .platform import DivingFishInterface, LxnsInterface
 
 from ._types import MaimaiUserPlatform
+from .snapshot import b50_snapshots
 
 if TYPE_CHECKING:
     from ._types import UserInfo
@@ -80,13 +83,29 @@ class MaimaiUser:
         """
         return await self.interface.append_user_score(song)
 
-    async def fetch_best50_song_score(self) -> Dict[str, Union[UserInfo, List[Song]]]:
-        """获取B50成绩。
+    async def fetch_best50_song_score(
+        self, force_refresh: bool = False
+    ) -> Dict[str, Union[UserInfo, List[Song]]]:
+        """获取B50成绩，短时间内的重复查询直接使用快照。
+
+        Args:
+            force_refresh (bool): 是否忽略快照，重新从查分器获取。
 
         Returns:
             tuple[List[Song], List[Song]]: B50成绩列表。
         """
-        return await self.interface.fetch_best50_song_score()
+        key = (self.user_platform, str(self.id))
+        if not force_refresh:
+            data = b50_snapshots.get(key)
+            if data is not None:
+                logger.info(f"[B50] 使用 B50 快照: {self.id}")
+                return data
+
+        previous = None if force_refresh else b50_snapshots.peek(key)
+        data = await self.interface.fetch_best50_song_score(previous)
+        if data is not None:
+            b50_snapshots.put(key, data)
+        return data
 
     async def fetch_user_info(self) -> UserInfo:
         """获取用户信息。
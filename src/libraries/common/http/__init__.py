@@ -0,0 +1 @@
+from .client import HttpClient, http_client
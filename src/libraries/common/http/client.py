@@ -0,0 +1,146 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import aiohttp
+from botpy import logger
+from yarl import URL
+
+
+class HttpClient:
+    """
+    应用级共享的 HTTP 客户端。
+
+    所有对外请求复用同一个 aiohttp.ClientSession，连接池按主机限制并发，
+    保持长连接并缓存 DNS 解析结果，避免每次请求都重新握手。
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: int = 300,
+        timeout: float = 60,
+    ) -> None:
+        """
+        Args:
+            limit (int): 连接池的总连接数上限。
+            limit_per_host (int): 单个主机的连接数上限。
+            keepalive_timeout (float): 空闲长连接的保持时间（秒）。
+            dns_cache_ttl (int): DNS 缓存时间（秒）。
+            timeout (float): 默认的请求总超时时间（秒）。
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 主机名 -> 请求计数与耗时
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        获取共享会话，尚未创建时会在当前事件循环中创建。
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def start(self) -> None:
+        """
+        创建共享会话，可重复调用。
+        """
+        if self._session is None or self._session.closed:
+            _ = self.session
+            logger.info(
+                f"[HTTP] 共享会话已创建 (limit={self.limit}, limit_per_host={self.limit_per_host})"
+            )
+
+    async def close(self) -> None:
+        """
+        关闭共享会话并输出请求统计。
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info(f"[HTTP] 共享会话已关闭, 请求统计: {self.stats()}")
+        self._session = None
+
+    @asynccontextmanager
+    async def request(
+        self, method: str, url: str, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        发起请求，用法与 aiohttp.ClientSession.request 相同，并记录耗时。
+
+        Args:
+            method (str): 请求方法。
+            url (str): 请求地址。
+            **kwargs: 传递给 aiohttp 的其他参数。
+        """
+        host = URL(url).host or ""
+        start_time = time.perf_counter()
+        failed = False
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                yield response
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(host, time.perf_counter() - start_time, failed)
+
+    def get(self, url: str, **kwargs):
+        """
+        发起 GET 请求
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """
+        发起 POST 请求
+        """
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host: str, elapsed: float, failed: bool) -> None:
+        stats = self._stats.setdefault(
+            host, {"count": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0}
+        )
+        stats["count"] += 1
+        stats["total_time"] += elapsed
+        stats["max_time"] = max(stats["max_time"], elapsed)
+        if failed:
+            stats["errors"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取按主机统计的请求次数、失败次数与耗时（秒）。
+
+        Returns:
+            Dict[str, Dict[str, float]]: 主机名 -> 统计数据。
+        """
+        return {
+            host: {
+                **stats,
+                "avg_time": (
+                    stats["total_time"] / stats["count"] if stats["count"] else 0
+                ),
+            }
+            for host, stats in self._stats.items()
+        }
+
+
+# 应用级共享实例，在 MyClient.on_ready 中启动，关闭时释放
+http_client = HttpClient()
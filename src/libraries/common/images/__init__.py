@@ -1,2 +1,5 @@
 from .text import draw_truncated_text, draw_centered_truncated_text, draw_centered_text
 from .resize import resize_image
+from .encode import encode_image
+from .font import get_font, warmup_fonts
+from .sprite import SpriteCache, sprite_cache
@@ -1,24 +1,53 @@
-from typing import List, Dict, Any, Union, TYPE_CHECKING
+from typing import List, Dict, Any, Tuple, Union, TYPE_CHECKING
 import random
+import asyncio
 from io import BytesIO
+
 import aiohttp
+from botpy import logger
 
 from src.libraries.common.game.maimai import UserInfo
-from src.libraries.assets import assets, AssetType
-from PIL import Image, ImageDraw, ImageFont
+from src.libraries.common.http import http_client
+from src.libraries.assets import AssetType
+from PIL import Image, ImageDraw
 from ..alpha import add_rounded_corners_to_image, adjust_image_alpha
+from ..font import get_font
 from ..text import draw_truncated_text, draw_centered_text
 
 from config import FontPaths
 
 
-async def _get_avatar_image(avatar: str, default_avatar: str) -> Image.Image:
+async def fetch_avatar_data(userinfo: UserInfo) -> bytes | None:
+    """
+    下载网络头像，绘图前在事件循环中调用。
+
+    Args:
+        userinfo (UserInfo): 用户信息。
+
+    Returns:
+        bytes | None: 头像图片数据，头像不是网络地址或下载失败时返回 None。
+    """
+    if not userinfo.avatar or not userinfo.avatar.startswith("http"):
+        return None
+    try:
+        async with http_client.get(userinfo.avatar) as resp:
+            if resp.status == 200:
+                return await resp.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"[USERINFO] 下载头像失败：{userinfo.avatar}, 错误信息：{e}")
+    return None
+
+
+def _get_avatar_image(
+    avatar: str,
+    default_avatar: str,
+    paths: Dict[Tuple[AssetType, str], str],
+    avatar_data: bytes = None,
+) -> Image.Image:
     if avatar.isdigit():
-        return Image.open(await assets.get_async(AssetType.AVATAR, avatar))
-    elif avatar.startswith("http"):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(avatar) as resp:
-                return Image.open(BytesIO(await resp.read()))
+        return Image.open(paths[AssetType.AVATAR, avatar])
+    elif avatar_data:
+        return Image.open(BytesIO(avatar_data))
 
     return Image.open(default_avatar)
 
@@ -32,16 +61,63 @@ def _get_rating_image_name(rating: int) -> str:
     return f"UI_CMN_DXRating_{num}.png"
 
 
-async def draw_user_info(
+def user_info_assets(userinfo: UserInfo) -> List[Tuple[AssetType, str]]:
+    """
+    列出绘制用户信息板子需要的资产，用于绘制前的预取。
+
+    Args:
+        userinfo (UserInfo): 用户信息。
+
+    Returns:
+        List[Tuple[AssetType, str]]: (资产类型, 参数) 列表。
+    """
+    items = [
+        (AssetType.PRISM, "avatar_border.png"),
+        (AssetType.IMAGES, _get_rating_image_name(userinfo.rating)),
+        (AssetType.IMAGES, "Name.png"),
+        (AssetType.IMAGES, "UI_CMN_Shougou_Rainbow.png"),
+    ]
+    items += [
+        (AssetType.IMAGES, f"UI_NUM_Drating_{i}.png")
+        for i in set(f"{userinfo.rating:05d}")
+    ]
+    if userinfo.nameplate_id:
+        items.append((AssetType.PLATE, str(userinfo.nameplate_id)))
+    if userinfo.avatar and userinfo.avatar.isdigit():
+        items.append((AssetType.AVATAR, userinfo.avatar))
+    if userinfo.class_rank:
+        items.append((AssetType.CLASS_RANK, str(userinfo.class_rank)))
+    if userinfo.course_rank:
+        items.append((AssetType.COURSE_RANK, str(userinfo.course_rank)))
+    return items
+
+
+def draw_user_info(
     userinfo: UserInfo,
     addictional_text: str,
     default_name_plate: str,
     default_avatar: str,
+    paths: Dict[Tuple[AssetType, str], str],
+    avatar_data: bytes = None,
 ) -> Image.Image:
+    """
+    绘制用户信息板子，不访问网络。
+
+    Args:
+        userinfo (UserInfo): 用户信息。
+        addictional_text (str): 彩虹条上的文字。
+        default_name_plate (str): 默认姓名框的本地路径。
+        default_avatar (str): 默认头像的本地路径。
+        paths (Dict[Tuple[AssetType, str], str]): 由 user_info_assets 解析出的本地路径。
+        avatar_data (bytes): 由 fetch_avatar_data 下载的网络头像。
+
+    Returns:
+        Image.Image: 用户信息板子。
+    """
 
     # 获取姓名框 nameplate
     if userinfo.nameplate_id:
-        name_plate_path = await assets.get_async(AssetType.PLATE, userinfo.nameplate_id)
+        name_plate_path = paths[AssetType.PLATE, str(userinfo.nameplate_id)]
     elif default_name_plate:
         name_plate_path = default_name_plate
     else:
@@ -58,11 +134,11 @@ async def draw_user_info(
     avatar_border_size = (214, 214)
     avatar_offset = (4, 4)
     # 获取头像
-    avatar_img = await _get_avatar_image(userinfo.avatar, default_avatar)
+    avatar_img = _get_avatar_image(userinfo.avatar, default_avatar, paths, avatar_data)
     avatar_img = avatar_img.convert("RGBA").resize(avatar_size)
     avatar_img = add_rounded_corners_to_image(avatar_img, 15)
     avatar_border_img = (
-        Image.open(assets.get(AssetType.PRISM, "avatar_border.png"))
+        Image.open(paths[AssetType.PRISM, "avatar_border.png"])
         .resize(avatar_border_size)
         .convert("RGBA")
     )
@@ -74,9 +150,7 @@ async def draw_user_info(
     dx_rating_base_offset = (230, 22)
 
     dx_rating_image = (
-        Image.open(
-            assets.get(AssetType.IMAGES, _get_rating_image_name(userinfo.rating))
-        )
+        Image.open(paths[AssetType.IMAGES, _get_rating_image_name(userinfo.rating)])
         .resize((300, 59))
         .convert("RGBA")
     )
@@ -84,9 +158,7 @@ async def draw_user_info(
     rating = f"{userinfo.rating:05d}"
     for n, i in enumerate(rating):
         dx_rating_image.alpha_composite(
-            Image.open(
-                await assets.get_async(AssetType.IMAGES, f"UI_NUM_Drating_{i}.png")
-            )
+            Image.open(paths[AssetType.IMAGES, f"UI_NUM_Drating_{i}.png"])
             .resize((28, 34))
             .convert("RGBA"),
             (140 + 23 * n, 15),
@@ -98,9 +170,7 @@ async def draw_user_info(
     class_rank_base_offset = (530, 8)
     if userinfo.class_rank:
         class_level_img = (
-            Image.open(
-                await assets.get_async(AssetType.CLASS_RANK, userinfo.class_rank)
-            )
+            Image.open(paths[AssetType.CLASS_RANK, str(userinfo.class_rank)])
             .resize((144, 87))
             .convert("RGBA")
         )
@@ -109,9 +179,7 @@ async def draw_user_info(
     # 4.绘制姓名框和段位(course_rank), 做透明处理
     name_base_offset = (230, 100)
 
-    name_image = Image.open(
-        await assets.get_async(AssetType.IMAGES, "Name.png")
-    ).convert("RGBA")
+    name_image = Image.open(paths[AssetType.IMAGES, "Name.png"]).convert("RGBA")
 
     # 有自己的姓名框，就不做透明处理
     if not userinfo.nameplate_id:
@@ -122,9 +190,7 @@ async def draw_user_info(
     if userinfo.course_rank:
         max_width = 310
         class_level_img = (
-            Image.open(
-                await assets.get_async(AssetType.COURSE_RANK, userinfo.course_rank)
-            )
+            Image.open(paths[AssetType.COURSE_RANK, str(userinfo.course_rank)])
             .resize((134, 55))
             .convert("RGBA")
         )
@@ -137,7 +203,7 @@ async def draw_user_info(
         name_draw,
         (12, 3),
         userinfo.username,
-        ImageFont.truetype(FontPaths.SIYUAN, 40),
+        get_font(FontPaths.SIYUAN, 40),
         max_width,
         (0, 0, 0, 255),
     )
@@ -146,9 +212,7 @@ async def draw_user_info(
     # 5.绘制彩虹条
     rainbow_base_offset = (234, 175)
     rainbow_image = (
-        Image.open(
-            await assets.get_async(AssetType.IMAGES, "UI_CMN_Shougou_Rainbow.png")
-        )
+        Image.open(paths[AssetType.IMAGES, "UI_CMN_Shougou_Rainbow.png"])
         .resize((454, 50))
         .convert("RGBA")
     )
@@ -157,7 +221,7 @@ async def draw_user_info(
         (227, 21),
         addictional_text,
         (0, 0, 0, 255),
-        ImageFont.truetype(FontPaths.SIYUAN, 28),
+        get_font(FontPaths.SIYUAN, 28),
         anchor="mm",
         stroke_fill=(255, 255, 255, 255),
         stroke_width=3,
@@ -0,0 +1,26 @@
+from io import BytesIO
+
+from PIL import Image
+
+
+def encode_image(image: Image.Image, format: str = "JPEG", quality: int = 80) -> bytes:
+    """
+    将图片编码为字节数据。
+
+    Args:
+        image (Image.Image): 需要编码的图片对象。
+        format (str): 图片格式，如 "JPEG"、"PNG"。
+        quality (int): JPEG 的压缩质量。
+
+    Returns:
+        bytes: 编码后的图片数据。
+    """
+    output_buffer = BytesIO()
+    if format.upper() in ("JPEG", "JPG"):
+        # OSError: cannot write mode RGBA as JPEG
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(output_buffer, "JPEG", quality=quality)
+    else:
+        image.save(output_buffer, format)
+    return output_buffer.getvalue()
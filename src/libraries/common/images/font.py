@@ -0,0 +1,74 @@
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+
+from botpy import logger
+from PIL import ImageFont
+
+# 启动时预加载的字号
+FONT_WARMUP_SIZES = (20, 22, 24, 25, 28, 30, 32, 35, 36, 40, 45, 50, 56, 60)
+
+_fonts: Dict[Tuple[str, int, Optional[str]], ImageFont.FreeTypeFont] = {}
+_lock = Lock()
+
+
+def get_font(
+    path: str | Path, size: int, variation: str = None
+) -> ImageFont.FreeTypeFont:
+    """
+    获取字体对象，同一 (路径, 字号, 变体) 在进程内只解析一次。
+
+    返回的字体对象会被共享，不要对其调用 set_variation_by_name 等修改方法，
+    需要变体时请传入 variation。
+
+    Args:
+        path (str | Path): 字体文件路径。
+        size (int): 字号。
+        variation (str): 可变字体的变体名称，如 "Bold"。
+
+    Returns:
+        ImageFont.FreeTypeFont: 字体对象。
+    """
+    key = (str(path), size, variation)
+    font = _fonts.get(key)
+    if font is not None:
+        return font
+
+    with _lock:
+        font = _fonts.get(key)
+        if font is None:
+            font = ImageFont.truetype(key[0], size)
+            if variation is not None:
+                font.set_variation_by_name(variation)
+            _fonts[key] = font
+    return font
+
+
+def warmup_fonts(
+    paths: Iterable[str | Path], sizes: Iterable[int] = FONT_WARMUP_SIZES
+) -> None:
+    """
+    预加载常用字体并记录耗时
+
+    Args:
+        paths (Iterable[str | Path]): 字体文件路径列表。
+        sizes (Iterable[int]): 需要预加载的字号。
+    """
+    start_time = time.time()
+    count = 0
+    for path in dict.fromkeys(str(path) for path in paths):
+        path_start_time = time.time()
+        try:
+            for size in sizes:
+                get_font(path, size)
+                count += 1
+        except OSError as e:
+            logger.warning(f"[FONT] 加载字体失败：{path}, 错误信息：{e}")
+            continue
+        logger.debug(
+            f"[FONT] 已加载字体 {path}，耗时 {time.time() - path_start_time:.3f} 秒"
+        )
+    logger.info(
+        f"[FONT] 预加载 {count} 个字体对象，耗时 {time.time() - start_time:.3f} 秒"
+    )
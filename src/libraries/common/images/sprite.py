@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from botpy import logger
+from PIL import Image
+
+from .alpha import adjust_image_alpha, deepen_image_color
+
+# 精灵图缓存的默认内存预算（字节）
+# 主进程使用完整预算，渲染进程平分同样大小的预算，总占用约为两倍
+SPRITE_CACHE_BYTES = 256 * 1024 * 1024
+
+# 可用的图像处理步骤，transform 中以 (名称, 参数) 的形式引用
+SPRITE_TRANSFORMS = {
+    "deepen": deepen_image_color,
+    "alpha": adjust_image_alpha,
+}
+
+SpriteSize = Tuple[Optional[int], Optional[int]]
+SpriteTransform = Tuple[Tuple[str, float], ...]
+
+
+def _image_bytes(image: Image.Image) -> int:
+    """
+    估算解码后图片占用的内存
+    """
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+class SpriteCache:
+    """
+    解码后精灵图的进程内 LRU 缓存。
+
+    以 (文件路径, 尺寸, 处理步骤) 为键，缓存已经转换为 RGBA、缩放并处理过的图片，
+    超出内存预算时淘汰最久未使用的条目。
+
+    返回的图片在多次调用之间共享，需要在其上绘制时请传入 copy=True。
+    """
+
+    def __init__(self, max_bytes: int = SPRITE_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._images: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self._sizes: Dict[tuple, int] = {}
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        path: str | Path,
+        size: SpriteSize = None,
+        transform: SpriteTransform = (),
+        copy: bool = False,
+    ) -> Image.Image:
+        """
+        获取处理后的精灵图
+
+        Args:
+            path (str | Path): 图片文件路径。
+            size (Tuple[Optional[int], Optional[int]]): 缩放后的 (宽, 高)，
+                其中一项为 None 时按原比例计算，为 None 时不缩放。
+            transform (Tuple[Tuple[str, float], ...]): 依次执行的处理步骤，
+                如 (("deepen", 1.5), ("alpha", 0.6))，见 SPRITE_TRANSFORMS。
+            copy (bool): 是否返回副本。
+
+        Returns:
+            Image.Image: RGBA 模式的图片。
+        """
+        key = (str(path), size, transform)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image.copy() if copy else image
+            self.misses += 1
+
+        image = self._load(path, size, transform)
+
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._sizes[key] = _image_bytes(image)
+                self._bytes += self._sizes[key]
+                self._evict()
+        return image.copy() if copy else image
+
+    @staticmethod
+    def _load(
+        path: str | Path, size: SpriteSize, transform: SpriteTransform
+    ) -> Image.Image:
+        with Image.open(path) as file:
+            image = file.convert("RGBA")
+
+        if size is not None:
+            width, height = size
+            if width is None:
+                width = int(image.width * height / image.height)
+            if height is None:
+                height = int(image.height * width / image.width)
+            image = image.resize((width, height))
+
+        for name, arg in transform:
+            image = SPRITE_TRANSFORMS[name](image, arg)
+        return image
+
+    def _evict(self) -> None:
+        # 至少保留最近放入的一张图片
+        while self._bytes > self.max_bytes and len(self._images) > 1:
+            key, _ = self._images.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._images.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        获取缓存统计信息
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._images),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"[SPRITE] 精灵图缓存统计: {self.stats()}")
+
+
+# 进程内共享的精灵图缓存
+sprite_cache = SpriteCache()
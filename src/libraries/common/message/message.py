@@ -1,7 +1,6 @@
 from botpy.message import Message, GroupMessage
 from botpy.types.message import Reference
-from botpy import logger
-from src.libraries.common.file.upload import upload_to_image_server
+from src.libraries.common.file.upload import upload_cache
 from config import DEFAULT_AVATAR_URL, DEBUG
 
 
@@ -35,13 +34,17 @@ class MixMessage:
             self.message_seq_id = 100
 
     async def reply(
-        self, content: str = "", file_image: str = "", use_reference: bool = False
+        self,
+        content: str = "",
+        file_image: str | bytes = "",
+        use_reference: bool = False,
     ) -> None:
         """回复消息，可以选择性地附带图片或使用消息引用。
 
         Args:
             content (str, optional): 回复的文本内容。默认为空字符串。
-            file_image (str, optional): 要发送的图片文件路径。默认为空字符串。
+            file_image (str | bytes, optional): 要发送的图片，可以是文件路径或
+                编码后的图片数据，后者不经过磁盘。默认为空字符串。
             use_reference (bool, optional): 是否使用消息引用进行回复。默认为 False。
         """
         if self.message_type == "guild":
@@ -59,14 +62,11 @@ class MixMessage:
                     await self.guild_message.reply(content=content)
         elif self.message_type == "group":
             if file_image:
-                image_url = await upload_to_image_server(file_image)
-                logger.info(f"[MixMSG]Upload image to SERVER: {image_url}")
-                # 上传图片的URL到群文件管理
-                upload_media = await self.group_message._api.post_group_file(
-                    group_openid=self.group_message.group_openid,
-                    file_type=1,
-                    url=image_url,
-                    srv_send_msg=False,
+                # 相同的图片在有效期内复用已上传的富媒体对象
+                upload_media = await upload_cache.get_group_media(
+                    self.group_message._api,
+                    self.group_message.group_openid,
+                    file_image,
                 )
 
                 # 发送富媒体消息
@@ -0,0 +1,2 @@
+from .executor import RenderExecutor, render_executor
+from .cache import RenderCache, render_cache
@@ -0,0 +1,110 @@
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from botpy import logger
+
+from src.libraries.assets.get import write_file_atomic
+
+from config import TEMP_FOLDER
+
+# 渲染结果缓存的磁盘占用上限（字节）
+RENDER_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class RenderCache:
+    """
+    渲染结果的磁盘缓存。
+
+    以渲染输入的哈希为键保存编码后的图片数据，磁盘占用超过上限时
+    按最近使用时间淘汰。启动时从目录中恢复索引，重启后缓存仍然有效。
+    """
+
+    def __init__(self, folder: str | Path, max_bytes: int = RENDER_CACHE_BYTES):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        # 键 -> 文件大小，按最近使用排序
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{key}.bin"
+
+    def _load_index(self) -> None:
+        if not self.folder.exists():
+            return
+        files = sorted(
+            (entry for entry in os.scandir(self.folder) if entry.name.endswith(".bin")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in files:
+            size = entry.stat().st_size
+            self._index[entry.name[: -len(".bin")]] = size
+            self._bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        获取缓存的图片数据，不存在时返回 None
+        """
+        if key not in self._index:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self._bytes -= self._index.pop(key)
+            self.misses += 1
+            return None
+        # 更新修改时间，重启后按最近使用恢复顺序
+        now = time.time()
+        os.utime(path, (now, now))
+        self._index.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        写入图片数据
+        """
+        try:
+            write_file_atomic(self._path(key), data)
+        except OSError as e:
+            logger.warning(f"[RENDER] 写入渲染缓存失败：{key}, {e}")
+            return
+        self._bytes += len(data) - self._index.pop(key, 0)
+        self._index[key] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"[RENDER] 渲染缓存统计: {self.stats()}")
+
+
+# 应用级共享的渲染结果缓存
+render_cache = RenderCache(Path(TEMP_FOLDER, "render_cache"))
@@ -0,0 +1,197 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+from botpy import logger
+from PIL import Image
+
+from src.libraries.common.images import encode_image, sprite_cache, warmup_fonts
+from src.libraries.common.images.sprite import SPRITE_CACHE_BYTES
+
+from config import FontPaths
+
+
+def _init_worker(warmups: List[Callable[[], None]], max_workers: int) -> None:
+    """
+    渲染进程的初始化函数，预加载字体与各插件注册的精灵图
+
+    所有渲染进程平分精灵图缓存的内存预算，进程数不影响总内存占用。
+    """
+    sprite_cache.max_bytes = SPRITE_CACHE_BYTES // max_workers
+    warmup_fonts(
+        path for name, path in vars(FontPaths).items() if not name.startswith("_")
+    )
+    for warmup in warmups:
+        try:
+            warmup()
+        except Exception as e:
+            logger.warning(f"[RENDER] 预热失败：{warmup.__qualname__}, {e}")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render(
+    func: Callable[..., Image.Image], args: tuple, image_format: str, quality: int
+) -> bytes:
+    """
+    在渲染进程中执行绘图函数并编码结果
+    """
+    return encode_image(func(*args), image_format, quality)
+
+
+class RenderExecutor:
+    """
+    渲染进程池。
+
+    绘图与编码都是 CPU 密集的同步操作，放到独立进程中执行以免阻塞事件循环，
+    多个渲染也可以同时利用多个核心。
+
+    提交的绘图函数必须是模块级的同步函数，参数只包含可序列化的数据
+    (布局数据与本地资产路径)，不能访问网络。
+    """
+
+    def __init__(self, max_workers: int = None) -> None:
+        """
+        Args:
+            max_workers (int): 渲染进程数，默认为 CPU 核心数。
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # 同时进行的渲染数不超过进程数
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._warmups: List[Callable[[], None]] = []
+        self._stats = {
+            "jobs": 0,
+            "errors": 0,
+            "restarts": 0,
+            "total_time": 0.0,
+            "max_time": 0.0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    def add_warmup(self, warmup: Callable[[], None]) -> None:
+        """
+        注册渲染进程启动时执行的预热函数，需在 start 之前调用。
+
+        Args:
+            warmup (Callable[[], None]): 模块级的无参函数。
+        """
+        if warmup not in self._warmups:
+            self._warmups.append(warmup)
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(list(self._warmups), self.max_workers),
+            )
+        return self._pool
+
+    async def start(self) -> None:
+        """
+        启动进程池并等待所有渲染进程完成预热
+        """
+        start_time = time.time()
+        pool = self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(
+            *(loop.run_in_executor(pool, _ping) for _ in range(self.max_workers))
+        )
+        logger.info(
+            f"[RENDER] 渲染进程池已启动: {len(set(pids))} 个进程, "
+            f"耗时 {time.time() - start_time:.2f} 秒"
+        )
+
+    async def render(
+        self,
+        func: Callable[..., Image.Image],
+        *args,
+        image_format: str = "JPEG",
+        quality: int = 80,
+    ) -> bytes:
+        """
+        在渲染进程中绘图并编码
+
+        同时进行的渲染数不超过进程数，多出的渲染在事件循环中排队等待名额，
+        名额只在渲染期间占用，不受指令中网络请求等其他步骤的影响。
+        渲染进程意外退出 (内存不足、PIL 崩溃等) 后进程池不可再用，
+        此时重建进程池并重试一次。
+
+        Args:
+            func (Callable[..., Image.Image]): 模块级的同步绘图函数。
+            *args: 传给绘图函数的参数。
+            image_format (str): 图片格式。
+            quality (int): JPEG 的压缩质量。
+
+        Returns:
+            bytes: 编码后的图片数据。
+        """
+        loop = asyncio.get_running_loop()
+        queued_at = time.time()
+        # 只在渲染期间占用名额，等待名额的渲染不会堆积在进程池的队列中
+        async with self._slots:
+            start_time = time.time()
+            wait = start_time - queued_at
+            self._stats["total_wait"] += wait
+            self._stats["max_wait"] = max(self._stats["max_wait"], wait)
+            try:
+                try:
+                    pool = self._ensure_pool()
+                    return await loop.run_in_executor(
+                        pool, _render, func, args, image_format, quality
+                    )
+                except BrokenProcessPool:
+                    logger.warning("[RENDER] 渲染进程意外退出，重建进程池后重试")
+                    self._discard_pool(pool)
+                    return await loop.run_in_executor(
+                        self._ensure_pool(), _render, func, args, image_format, quality
+                    )
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                elapsed = time.time() - start_time
+                self._stats["jobs"] += 1
+                self._stats["total_time"] += elapsed
+                self._stats["max_time"] = max(self._stats["max_time"], elapsed)
+                logger.debug(f"[RENDER] {func.__qualname__} 耗时 {elapsed:.2f} 秒")
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """
+        丢弃已损坏的进程池，并发的渲染只会重建一次
+        """
+        if self._pool is pool:
+            self._pool = None
+            self._stats["restarts"] += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def close(self) -> None:
+        """
+        关闭进程池，未开始的渲染任务会被取消
+        """
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+            logger.info(f"[RENDER] 渲染进程池已关闭, 渲染统计: {self.stats()}")
+
+    def stats(self) -> dict:
+        """
+        获取渲染统计信息
+        """
+        stats = dict(self._stats)
+        stats["avg_time"] = stats["total_time"] / stats["jobs"] if stats["jobs"] else 0
+        stats["avg_wait"] = stats["total_wait"] / stats["jobs"] if stats["jobs"] else 0
+        return stats
+
+
+# 应用级共享的渲染进程池
+render_executor = RenderExecutor()
@@ -3,7 +3,14 @@
 from .crud import (
     get_user_by_id,
     update_user_score,
+    update_user_scores,
     delete_user,
     add_or_update_user,
     update_user_favorite,
+    get_translations,
+    save_translations,
+    init_db,
+    shutdown_session,
 )
+from .cache import UserCache, user_cache
+from .writer import ScoreWriter, score_writer
@@ -0,0 +1,140 @@
+import itertools
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from botpy import logger
+
+# 缓存的用户数上限
+USER_CACHE_SIZE = 10000
+
+# 缓存条目的有效期（秒）
+USER_CACHE_TTL = 600
+
+UserRow = Tuple[str, int, int, int]
+
+
+class UserCache:
+    """
+    已绑定用户的进程内缓存，键为 user_id，值为 get_user_by_id 的返回值。
+
+    条目在 ttl 秒后过期，超过容量时淘汰最久未使用的条目。
+    写操作需要通过 put 或 invalidate 同步更新缓存。
+
+    每个用户有一个版本号，put 与 invalidate 时更新。从数据库读取的一方
+    在查询前记下版本号，写入缓存时带上它；期间有其他写入时放弃写入，
+    避免较早读到的旧数据覆盖新的数据。
+
+    ScoreWriter 提交但尚未写入数据库的分数记录在缓存中，写入缓存的数据
+    总是使用这个分数，避免从数据库读到的旧分数进入缓存。
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # user_id -> (写入时间, 用户数据)
+        self._entries: OrderedDict[str, Tuple[float, UserRow]] = OrderedDict()
+        # user_id -> 版本号，不随条目淘汰，保证读取期间的写入总能被发现
+        self._generations: Dict[str, int] = {}
+        self._counter = itertools.count(1)
+        # user_id -> 已提交但尚未写入数据库的分数
+        self._pending_scores: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[UserRow]:
+        """
+        获取缓存的用户数据，不存在或已过期时返回 None
+        """
+        entry = self._entries.get(user_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def generation(self, user_id: str) -> int:
+        """
+        获取用户当前的版本号，在从数据库读取前调用
+        """
+        return self._generations.get(user_id, 0)
+
+    def set_pending_score(self, user_id: str, score: int) -> None:
+        """
+        记录已提交但尚未写入数据库的分数
+        """
+        self._pending_scores[user_id] = score
+
+    def clear_pending_score(self, user_id: str) -> None:
+        """
+        分数写入数据库后移除记录
+        """
+        self._pending_scores.pop(user_id, None)
+
+    def with_pending_score(self, user_id: str, row: UserRow) -> UserRow:
+        """
+        用尚未写入数据库的分数替换用户数据中的分数
+        """
+        score = self._pending_scores.get(user_id)
+        if score is None:
+            return row
+        name, platform_id, _, favorite_id = row
+        return name, platform_id, score, favorite_id
+
+    def put(self, user_id: str, row: UserRow, generation: Optional[int] = None) -> bool:
+        """
+        写入用户数据
+
+        Args:
+            user_id (str): 用户 ID。
+            row (UserRow): 用户数据。
+            generation (int, optional): 读取数据前记下的版本号，版本号已变化时不写入。
+
+        Returns:
+            bool: 是否写入。
+        """
+        if generation is not None and generation != self.generation(user_id):
+            return False
+        row = self.with_pending_score(user_id, row)
+        self._generations[user_id] = next(self._counter)
+        self._entries[user_id] = (time.monotonic(), row)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        移除用户数据
+        """
+        self._generations[user_id] = next(self._counter)
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        获取缓存统计信息
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"[Database] User cache stats: {self.stats()}")
+
+
+# 进程内共享的用户缓存
+user_cache = UserCache()
@@ -1,67 +1,116 @@
-from typing import Tuple, Optional
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session, Session
+from typing import Dict, List, Tuple, Optional
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from botpy import logger
 
-
 # Assume these modules exist in your project
-from .models import User
+from .models import Base, Translation, User
 from .exceptions import UserNotFoundError, DatabaseOperationError
+from .cache import user_cache
 
 from config import DATABASE_PATH
 
 # Database configuration
 
-# Create the engine and configure session factory
-engine = create_engine(f"sqlite:///{DATABASE_PATH}")
+# SQLite 等待写锁的最长时间（毫秒）
+BUSY_TIMEOUT_MS = 5000
 
-# Create a thread-safe scoped session
-SessionLocal = scoped_session(
-    sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create the async engine with a small connection pool
+engine = create_async_engine(
+    f"sqlite+aiosqlite:///{DATABASE_PATH}",
+    pool_size=5,
+    max_overflow=5,
+    pool_pre_ping=True,
 )
 
-# Global session object
-session: Session = SessionLocal()
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:
+    # WAL 模式下读写互不阻塞，busy_timeout 让写锁冲突时等待而不是立即失败
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+# Every call opens its own short-lived session, so a failed transaction
+# never affects other callers
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+_initialized = False
+
+
+async def init_db() -> None:
+    """
+    创建数据表。可以重复调用，启动时调用一次即可。
+    """
+    global _initialized
+    if _initialized:
+        return
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    _initialized = True
+    logger.info(f"[Database] Database initialized: {DATABASE_PATH}")
+
+
+def _session() -> AsyncSession:
+    return SessionLocal()
+
+
+async def _get_user(session: AsyncSession, user_id: str) -> Optional[User]:
+    result = await session.execute(select(User).where(User.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+def _user_row(user: User) -> Tuple[str, int, int, int]:
+    return user.name, user.platform_id, user.score, user.favorite_id
 
 
-def add_or_update_user(user_id: str, name: str, platform_id: int) -> None:
+async def add_or_update_user(user_id: str, name: str, platform_id: int) -> None:
     """
     添加或更新用户信息。如果用户已存在，则更新用户的名字和平台 ID，否则创建新用户。
     """
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user:
-            user.name = name
-            user.platform_id = platform_id
-        else:
-            new_user = User(user_id=user_id, name=name, platform_id=platform_id)
-            session.add(new_user)
-        session.commit()
+        async with _session() as session, session.begin():
+            user = await _get_user(session, user_id)
+            if user:
+                user.name = name
+                user.platform_id = platform_id
+            else:
+                new_user = User(user_id=user_id, name=name, platform_id=platform_id)
+                session.add(new_user)
+        user_cache.invalidate(user_id)
     except Exception as e:
-        session.rollback()
         logger.error(f"[Database] Error adding or updating user with ID {user_id}: {e}")
         raise DatabaseOperationError(
             f"Error adding or updating user with ID {user_id}: {e}"
         )
 
 
-def update_user_favorite(user_id: str, favorite_id: int) -> None:
+async def update_user_favorite(user_id: str, favorite_id: int) -> None:
     """
     更新用户的收藏夹 ID。
     """
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user:
-            user.favorite_id = favorite_id
-            session.commit()
-            logger.info(
-                f"[Database] User with ID {user_id} favorite updated to {favorite_id}."
-            )
-        else:
-            logger.warning(f"[Database] User with ID {user_id} not found.")
-            raise UserNotFoundError(f"User with ID {user_id} not found.")
+        async with _session() as session, session.begin():
+            user = await _get_user(session, user_id)
+            if user:
+                user.favorite_id = favorite_id
+            else:
+                logger.warning(f"[Database] User with ID {user_id} not found.")
+                raise UserNotFoundError(f"User with ID {user_id} not found.")
+        user_cache.invalidate(user_id)
+        logger.info(
+            f"[Database] User with ID {user_id} favorite updated to {favorite_id}."
+        )
     except Exception as e:
-        session.rollback()
         logger.error(
             f"[Database] Error updating favorite for user with ID {user_id}: {e}"
         )
@@ -70,14 +119,25 @@ def update_user_favorite(user_id: str, favorite_id: int) -> None:
         )
 
 
-def get_user_by_id(user_id: str) -> Tuple[str, int, int, int]:
+async def get_user_by_id(user_id: str) -> Tuple[str, int, int, int]:
     """
-    根据用户 ID 获取用户信息。
+    根据用户 ID 获取用户信息，优先从缓存读取。
     """
+    row = user_cache.get(user_id)
+    if row is not None:
+        return row
+
+    # 读取期间缓存被更新或失效时，不用读到的数据覆盖缓存
+    generation = user_cache.generation(user_id)
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        async with _session() as session:
+            user = await _get_user(session, user_id)
         if user:
-            return user.name, user.platform_id, user.score, user.favorite_id
+            # 数据库中的分数可能比 score_writer 中待写入的分数旧
+            row = user_cache.with_pending_score(user_id, _user_row(user))
+            user_cache.put(user_id, row, generation)
+            return row
         else:
             logger.warning(f"[Database] User with ID {user_id} not found.")
             raise UserNotFoundError(f"User with ID {user_id} not found.")
@@ -86,76 +146,107 @@ def get_user_by_id(user_id: str) -> Tuple[str, int, int, int]:
         raise DatabaseOperationError(f"Error retrieving user with ID {user_id}: {e}")
 
 
-def update_user_score(user_id: str, new_score: int) -> None:
+async def update_user_score(user_id: str, new_score: int) -> None:
     """
     更新用户的分数，并增加 score_update_count。
     """
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user:
-            user.score = new_score
-            user.score_update_count += 1
-            session.commit()
-            logger.info(
-                f"[Database] User with ID {user_id} score updated to {new_score}, score_update_count incremented to {user.score_update_count}."
-            )
-        else:
-            logger.warning(f"[Database] User with ID {user_id} not found.")
-            raise UserNotFoundError(f"User with ID {user_id} not found.")
+        async with _session() as session, session.begin():
+            user = await _get_user(session, user_id)
+            if user:
+                user.score = new_score
+                user.score_update_count += 1
+            else:
+                logger.warning(f"[Database] User with ID {user_id} not found.")
+                raise UserNotFoundError(f"User with ID {user_id} not found.")
+        user_cache.invalidate(user_id)
+        logger.info(
+            f"[Database] User with ID {user_id} score updated to {new_score}, score_update_count incremented to {user.score_update_count}."
+        )
     except Exception as e:
-        session.rollback()
         logger.error(f"[Database] Error updating score for user with ID {user_id}: {e}")
         raise DatabaseOperationError(
             f"Error updating score for user with ID {user_id}: {e}"
         )
 
 
-def update_user_data(user_id: str, data: str) -> None:
+async def update_user_scores(scores: Dict[str, Tuple[int, int]]) -> None:
+    """
+    在一个事务中批量更新用户分数。
+
+    Args:
+        scores (Dict[str, Tuple[int, int]]): user_id -> (最新分数, score_update_count 的增量)。
+    """
+    await init_db()
+    try:
+        async with _session() as session, session.begin():
+            for user_id, (new_score, count) in scores.items():
+                await session.execute(
+                    update(User)
+                    .where(User.user_id == user_id)
+                    .values(
+                        score=new_score,
+                        score_update_count=User.score_update_count + count,
+                    )
+                )
+        logger.info(f"[Database] Score updated for {len(scores)} users.")
+    except Exception as e:
+        logger.error(f"[Database] Error updating scores for {len(scores)} users: {e}")
+        raise DatabaseOperationError(
+            f"Error updating scores for {len(scores)} users: {e}"
+        )
+
+
+async def update_user_data(user_id: str, data: str) -> None:
     """
     更新用户的自定义数据。
     """
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user:
-            user.data = data
-            session.commit()
-            logger.info(f"[Database] User with ID {user_id} data updated to {data}.")
-        else:
-            logger.warning(f"[Database] User with ID {user_id} not found.")
-            raise UserNotFoundError(f"User with ID {user_id} not found.")
+        async with _session() as session, session.begin():
+            user = await _get_user(session, user_id)
+            if user:
+                user.data = data
+            else:
+                logger.warning(f"[Database] User with ID {user_id} not found.")
+                raise UserNotFoundError(f"User with ID {user_id} not found.")
+        logger.info(f"[Database] User with ID {user_id} data updated to {data}.")
     except Exception as e:
-        session.rollback()
         logger.error(f"[Database] Error updating data for user with ID {user_id}: {e}")
         raise DatabaseOperationError(
             f"Error updating data for user with ID {user_id}: {e}"
         )
 
 
-def delete_user(user_id: str) -> None:
+async def delete_user(user_id: str) -> None:
     """
     删除用户。
     """
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user:
-            session.delete(user)
-            session.commit()
-            logger.info(f"[Database] User with ID {user_id} deleted.")
-        else:
-            logger.warning(f"[Database] User with ID {user_id} not found.")
-            raise UserNotFoundError(f"User with ID {user_id} not found.")
+        async with _session() as session, session.begin():
+            user = await _get_user(session, user_id)
+            if user:
+                await session.delete(user)
+            else:
+                logger.warning(f"[Database] User with ID {user_id} not found.")
+                raise UserNotFoundError(f"User with ID {user_id} not found.")
+        user_cache.invalidate(user_id)
+        logger.info(f"[Database] User with ID {user_id} deleted.")
     except Exception as e:
-        session.rollback()
         logger.error(f"[Database] Error deleting user with ID {user_id}: {e}")
         raise DatabaseOperationError(f"Error deleting user with ID {user_id}: {e}")
 
 
-def get_user_data(user_id: str) -> Optional[str]:
+async def get_user_data(user_id: str) -> Optional[str]:
     """
     获取用户的自定义数据。
     """
+    await init_db()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        async with _session() as session:
+            user = await _get_user(session, user_id)
         if user:
             return user.data
         else:
@@ -170,6 +261,53 @@ def get_user_data(user_id: str) -> Optional[str]:
         )
 
 
+async def get_translations(text: str, source_languages: List[str]) -> Dict[str, str]:
+    """
+    获取缓存的翻译。
+
+    Returns:
+        Dict[str, str]: 源语言 -> 译文，只包含已缓存的语言。
+    """
+    await init_db()
+    try:
+        async with _session() as session:
+            result = await session.execute(
+                select(Translation).where(
+                    Translation.text == text,
+                    Translation.source_language.in_(source_languages),
+                )
+            )
+            return {row.source_language: row.translation for row in result.scalars()}
+    except Exception as e:
+        logger.error(f"[Database] Error retrieving translations for {text}: {e}")
+        raise DatabaseOperationError(f"Error retrieving translations for {text}: {e}")
+
+
+async def save_translations(text: str, translations: Dict[str, str]) -> None:
+    """
+    保存翻译，已存在时覆盖。
+
+    Args:
+        text (str): 原文。
+        translations (Dict[str, str]): 源语言 -> 译文。
+    """
+    await init_db()
+    try:
+        async with _session() as session, session.begin():
+            for source_language, translation in translations.items():
+                await session.merge(
+                    Translation(
+                        text=text,
+                        source_language=source_language,
+                        translation=translation,
+                    )
+                )
+    except Exception as e:
+        logger.error(f"[Database] Error saving translations for {text}: {e}")
+        raise DatabaseOperationError(f"Error saving translations for {text}: {e}")
+
+
 # Call this function when your application is shutting down
-def shutdown_session():
-    SessionLocal.remove()
+async def shutdown_session() -> None:
+    await engine.dispose()
+    logger.info("[Database] Connection pool disposed.")
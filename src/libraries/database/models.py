@@ -1,11 +1,9 @@
 # my_database_lib/models.py
 
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, SmallInteger
+from sqlalchemy import Column, String, Integer, DateTime, SmallInteger
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
-from config import DATABASE_PATH
-
 Base = declarative_base()
 
 
@@ -27,13 +25,13 @@ class User(Base):
     )
 
 
-# 创建SQLite数据库引擎
-# engine = create_engine("", echo=True)
-engine = create_engine(f"sqlite:///{DATABASE_PATH}")
+class Translation(Base):
+    __tablename__ = "translations"
+
+    text = Column(String(255), primary_key=True)
+    source_language = Column(String(8), primary_key=True)
+    translation = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now())
 
-# 创建表格
-Base.metadata.create_all(engine)
 
-# 创建Session类
-# Session = sessionmaker(bind=engine)
-# session = Session()
+# 数据表由 crud.init_db 在异步引擎上创建
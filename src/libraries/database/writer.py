@@ -0,0 +1,125 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from botpy import logger
+
+from .cache import user_cache
+from .crud import update_user_scores
+
+# 两次写入之间的最长间隔（秒）
+SCORE_FLUSH_INTERVAL = 2.0
+
+# 待写入的用户数达到该值时立即写入
+SCORE_FLUSH_SIZE = 100
+
+
+class ScoreWriter:
+    """
+    用户分数的延迟批量写入。
+
+    同一用户在一次写入前的多次更新会合并为一条：分数取最新值，
+    score_update_count 按更新次数累加。每隔 flush_interval 秒或待写入
+    达到 flush_size 个用户时，在一个事务中写入数据库。
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = SCORE_FLUSH_INTERVAL,
+        flush_size: int = SCORE_FLUSH_SIZE,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        # user_id -> (最新分数, 合并的更新次数)
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+
+    def submit(self, user_id: str, new_score: int) -> None:
+        """
+        提交一次分数更新，不等待写入数据库
+
+        Args:
+            user_id (str): 用户 ID。
+            new_score (int): 最新分数。
+        """
+        if not self._closing:
+            self.start()
+
+        _, count = self._pending.get(user_id, (0, 0))
+        self._pending[user_id] = (new_score, count + 1)
+        user_cache.set_pending_score(user_id, new_score)
+
+        # 缓存立即反映最新分数，未缓存时使正在进行的读取作废
+        row = user_cache.get(user_id)
+        if row is not None:
+            name, platform_id, _, favorite_id = row
+            user_cache.put(user_id, (name, platform_id, new_score, favorite_id))
+        else:
+            user_cache.invalidate(user_id)
+
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """
+        启动后台写入任务
+        """
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        将待写入的分数在一个事务中写入数据库，失败时保留到下一次写入
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await update_user_scores(batch)
+                # 写入前从数据库读到的旧分数可能已进入缓存
+                for user_id in batch:
+                    user_cache.invalidate(user_id)
+                    # 写入期间又提交了新分数时保留记录
+                    if user_id not in self._pending:
+                        user_cache.clear_pending_score(user_id)
+            except Exception as e:
+                logger.error(f"[Database] Score flush failed, will retry: {e}")
+                # 合并写入期间提交的新更新
+                for user_id, (new_score, count) in batch.items():
+                    if user_id in self._pending:
+                        new_score, newer_count = self._pending[user_id]
+                        count += newer_count
+                    self._pending[user_id] = (new_score, count)
+
+    async def close(self) -> None:
+        """
+        停止后台任务并写入剩余的分数
+        """
+        # 不取消任务，避免打断正在进行的写入
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error(
+                f"[Database] {len(self._pending)} score updates were not written."
+            )
+
+
+# 应用级共享的分数写入器
+score_writer = ScoreWriter()
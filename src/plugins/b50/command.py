@@ -8,14 +8,14 @@ from config import LXNS_API_SECRET
 from src.libraries.database import (
     add_or_update_user,
     get_user_by_id,
-    update_user_score,
     update_user_favorite,
+    score_writer,
 )
 from src.libraries.database.exceptions import DatabaseOperationError
 
 from src.libraries.common.message.message import MixMessage
 
-from src.libraries.common.file import TempFileManager
+from src.libraries.common.render import render_cache, render_executor
 
 from src.libraries.assets import assets, AssetType
 
@@ -23,7 +23,7 @@ from src.libraries.common.game.maimai import *
 
 from .tools import is_fish_else_lxns
 from .player import B50Player
-from .draw import DrawBest
+from .draw import best_render_key, prepare_best, render_best
 
 from botpy import logger
 
@@ -33,6 +33,9 @@ LXNS = 1
 NONE = -1
 PLATFORM_STR = ["水鱼查分器", "落雪咖啡屋"]
 
+# 强制刷新 B50 数据的参数
+REFRESH_ARGS = {"refresh", "刷新"}
+
 
 # 处理 /bind 指令的异步函数
 async def handle_bind(message: Message | GroupMessage):
@@ -112,7 +115,7 @@ async def handle_bind(message: Message | GroupMessage):
             if girl_number.is_integer() and 0 <= int(girl_number) <= 17:
                 girl_number = int(girl_number)
                 try:
-                    update_user_favorite(user_id, girl_number)
+                    await update_user_favorite(user_id, girl_number)
                     await mix_message.reply(
                         content=f"🎉 已成功绑定音击小女孩 {girl_number}!",
                         use_reference=True,
@@ -142,7 +145,7 @@ async def handle_bind(message: Message | GroupMessage):
 
     # 尝试绑定用户到数据库
     try:
-        add_or_update_user(user_id, user_name, platform_id)
+        await add_or_update_user(user_id, user_name, platform_id)
     except DatabaseOperationError as e:
         logger.error(f"绑定用户时出错: {e}")
         await mix_message.reply(
@@ -188,11 +191,14 @@ async def handle_b50(message: Message):
     mix_message = MixMessage(message)
     user_id = mix_message.user_id
 
+    # `/b50 refresh` 或 `/b50 刷新` 跳过快照，重新从查分器获取
+    force_refresh = mix_message.get_args("/b50").lower() in REFRESH_ARGS
+
     start_time = time.time()
 
     # 尝试从数据库获取用户信息
     try:
-        username, platform_id, score, favorite_id = get_user_by_id(user_id)
+        username, platform_id, score, favorite_id = await get_user_by_id(user_id)
     except Exception:
         await mix_message.reply(
             content=(
@@ -215,7 +221,7 @@ async def handle_b50(message: Message):
     try:
         # 初始化玩家对象
         maimai_player = MaimaiUser(id=username, user_platform=platform_id)
-        await player.enrich(maimai_player)
+        await player.enrich(maimai_player, force_refresh)
     except Exception as e:
         logger.error(f"获取查分器数据时出错: {e}")
         await mix_message.reply(
@@ -233,14 +239,17 @@ async def handle_b50(message: Message):
         return
     # 绘制和压缩图片
     try:
-        drawBest = DrawBest(player)
-        draw = await drawBest.draw()
-
-        temp_manager = TempFileManager()
-        if mix_message.message_type == "group":
-            temp_file, _ = temp_manager.create_temp_image_file(draw, ".jpg", quality=70)
-        else:
-            temp_file, _ = temp_manager.create_temp_image_file(draw, ".jpg", quality=90)
+        quality = 70 if mix_message.message_type == "group" else 90
+        job = await prepare_best(player)
+
+        # B50 数据没有变化时直接使用上一次的渲染结果
+        render_key = best_render_key(job, quality)
+        image_data = render_cache.get(render_key)
+        if image_data is None:
+            image_data = await render_executor.render(
+                render_best, *job, quality=quality
+            )
+            render_cache.put(render_key, image_data)
 
     except Exception as e:
 
@@ -254,18 +263,14 @@ async def handle_b50(message: Message):
         )
         return
 
-    # 更新用户分数到数据库
-    try:
-        update_user_score(user_id, player.user_info.rating)
-    except DatabaseOperationError as e:
-        logger.error(f"更新用户时出错: {e}")
-        return
+    # 更新用户分数，由 score_writer 合并后批量写入数据库
+    score_writer.submit(user_id, player.user_info.rating)
 
     # 计算生成时间
     generation_time = time.time() - start_time
 
     # 回复压缩后的图片
-    await mix_message.reply(file_image=temp_file)
+    await mix_message.reply(file_image=image_data)
 
     # 回复生成成功信息
     if generation_time <= 3:
@@ -307,6 +312,12 @@ COMMANDS = {
     "b50o": do_nothing,
 }
 
+# 指令的调度选项，见 CommandDispatcher
+COMMAND_OPTIONS = {
+    "bind": {"per_user": True},
+    "b50": {"concurrency": 4, "max_queue": 20, "per_user": True},
+}
+
 # 默认大写的插件名
 COMMAND_NAME = "B50"
 # 指令范围
@@ -1,19 +1,25 @@
+import hashlib
+import json
 import random
+from typing import Dict, List, Tuple
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from src.libraries.assets import assets, AssetType
-from src.libraries.common.images.alpha import (
-    adjust_image_alpha,
-    add_rounded_corners_to_image,
-    deepen_image_color,
-)
+from src.libraries.common.images.alpha import add_rounded_corners_to_image
+from src.libraries.common.images.font import get_font
+from src.libraries.common.images.sprite import sprite_cache
 from src.libraries.common.images.text import (
     draw_centered_text,
     draw_centered_truncated_text,
     draw_truncated_text,
 )
 
-from src.libraries.common.images.components.user_info import draw_user_info
+from src.libraries.common.images.components.user_info import (
+    draw_user_info,
+    fetch_avatar_data,
+    user_info_assets,
+)
+from src.libraries.common.render import render_executor
 
 from src.libraries.common.game.maimai import SongRateType
 from .image import DrawText
@@ -21,58 +27,140 @@ from .basic import *
 from config import FontPaths, VERSION, DEFAULT_AVATAR_URL
 from .player import B50Player, SongDifficulty
 
+# 使用 prism 样式的评级
+PRISM_RATES = {
+    SongRateType.S,
+    SongRateType.S_PLUS,
+    SongRateType.SS,
+    SongRateType.SS_PLUS,
+    SongRateType.SSS,
+    SongRateType.SSS_PLUS,
+}
+
+# 模板版本，修改绘图布局时递增，使旧的渲染缓存失效
+B50_TEMPLATE_VERSION = 1
+
+DEFAULT_PLATES = [f"p{i}-min.png" for i in range(1, 4)]
+DEFAULT_AVATARS = [f"logo{i}.png" for i in range(1, 6)]
+BACKGROUNDS = ["b50_bg1-min.png", "b50_bg2-min.png", "b50_bg3-min.png"]
+BACKGROUND_WEIGHTS = [80, 10, 10]
+# 玩家没有设置徽章时随机选择的角色
+FAVORITE_IDS = range(1, 18)
+
+# 与具体玩家无关的静态资产
+STATIC_ASSETS = [
+    (AssetType.IMAGES, "title2"),
+    (AssetType.IMAGES, "design"),
+    *[
+        (AssetType.IMAGES, f"b50_score_{name}")
+        for name in ["basic", "advanced", "expert", "master", "remaster"]
+    ],
+]
+
+
+def _version_asset(info: SongDifficulty) -> Tuple[AssetType, str]:
+    return AssetType.IMAGES, f"{info.song_type.value}.png"
+
+
+def _rate_asset(info: SongDifficulty) -> Tuple[AssetType, str]:
+    if info.user_score.rate in PRISM_RATES:
+        return AssetType.PRISM, f"{info.user_score.rate.value}.png"
+    return (
+        AssetType.IMAGES,
+        f"UI_TTR_Rank_{score_Rank_l[info.user_score.rate.value]}.png",
+    )
+
+
+def _fc_asset(info: SongDifficulty) -> Tuple[AssetType, str]:
+    return AssetType.IMAGES, f"UI_MSS_MBase_Icon_{fcl[info.user_score.fc.value]}.png"
+
+
+def _fs_asset(info: SongDifficulty) -> Tuple[AssetType, str]:
+    return AssetType.IMAGES, f"UI_MSS_MBase_Icon_{fsl[info.user_score.fs.value]}.png"
+
+
+def _dx_score_asset(dxnum: int) -> Tuple[AssetType, str]:
+    return AssetType.IMAGES, f"UI_GAM_Gauge_DXScoreIcon_0{dxnum}.png"
+
+
+def _uses_default_avatar(b50player: B50Player, avatar_data: bytes = None) -> bool:
+    avatar = b50player.user_info.avatar
+    return not (avatar and avatar.isdigit()) and not avatar_data
+
+
+def b50_assets(
+    b50player: B50Player, avatar_data: bytes = None
+) -> List[Tuple[AssetType, str]]:
+    """
+    列出绘制一张 B50 需要的全部资产，用于绘制前的并发预取。
+
+    随机元素只列出实际会绘制的候选，例如玩家有自己的姓名框时不列出默认姓名框。
+
+    Args:
+        b50player (B50Player): 玩家数据。
+        avatar_data (bytes): 网络头像数据。
+
+    Returns:
+        List[Tuple[AssetType, str]]: (资产类型, 参数) 列表。
+    """
+    items = list(STATIC_ASSETS)
+    items += [(AssetType.PRISM, name) for name in BACKGROUNDS]
+    if not b50player.user_info.nameplate_id:
+        items += [(AssetType.PRISM, name) for name in DEFAULT_PLATES]
+    if _uses_default_avatar(b50player, avatar_data):
+        items += [(AssetType.PRISM, name) for name in DEFAULT_AVATARS]
+    items += user_info_assets(b50player.user_info)
+    if b50player.favorite_id:
+        items.append((AssetType.ONGEKI, f"ongeki{b50player.favorite_id}.png"))
+    else:
+        items += [(AssetType.ONGEKI, f"ongeki{i}.png") for i in FAVORITE_IDS]
+
+    for info in b50player.song_data_b35 + b50player.song_data_b15:
+        items.append((AssetType.COVER, str(info.id)))
+        items.append(_version_asset(info))
+        items.append(_rate_asset(info))
+        if info.user_score.fc.value:
+            items.append(_fc_asset(info))
+        if info.user_score.fs.value:
+            items.append(_fs_asset(info))
+        dxnum = info.get_dx_score_num()
+        if dxnum:
+            items.append(_dx_score_asset(dxnum))
+    return items
+
+
+def _load_static_sprites(
+    paths: Dict[Tuple[AssetType, str], str],
+) -> Tuple[Image.Image, Image.Image, List[Image.Image]]:
+    title_bg = sprite_cache.get(paths[AssetType.IMAGES, "title2"], size=(600, 120))
+    design_bg = sprite_cache.get(paths[AssetType.IMAGES, "design"], size=(1320, 120))
+
+    # 各难度的成绩底板，加深颜色并调整透明度
+    diff = [
+        sprite_cache.get(
+            paths[AssetType.IMAGES, f"b50_score_{name}"],
+            transform=(("deepen", 1.5), ("alpha", 0.6)),
+        )
+        for name in ["basic", "advanced", "expert", "master", "remaster"]
+    ]
+    return title_bg, design_bg, diff
+
 
 class Draw:
 
-    def __init__(self, image: Image.Image = None) -> None:
+    def __init__(
+        self, image: Image.Image, paths: Dict[Tuple[AssetType, str], str]
+    ) -> None:
         self._im = image
+        self._paths = paths
         dr = ImageDraw.Draw(self._im)
         self._mr = DrawText(dr, FontPaths.MEIRYO)
         self._sy = DrawText(dr, FontPaths.SIYUAN)
         self._tb = DrawText(dr, FontPaths.TORUS_BOLD)
 
-        self.basic = Image.open(
-            assets.get(AssetType.IMAGES, "b50_score_basic")
-        ).convert("RGBA")
-        self.advanced = Image.open(
-            assets.get(AssetType.IMAGES, "b50_score_advanced")
-        ).convert("RGBA")
-        self.expert = Image.open(
-            assets.get(AssetType.IMAGES, "b50_score_expert")
-        ).convert("RGBA")
-        self.master = Image.open(
-            assets.get(AssetType.IMAGES, "b50_score_master")
-        ).convert("RGBA")
-        self.remaster = Image.open(
-            assets.get(AssetType.IMAGES, "b50_score_remaster")
-        ).convert("RGBA")
-
-        self.title_bg = (
-            Image.open(assets.get(AssetType.IMAGES, "title2"))
-            .convert("RGBA")
-            .resize((600, 120))
-        )
-        self.design_bg = (
-            Image.open(assets.get(AssetType.IMAGES, "design"))
-            .convert("RGBA")
-            .resize((1320, 120))
-        )
-
-        self._diff = [
-            self.basic,
-            self.advanced,
-            self.expert,
-            self.master,
-            self.remaster,
-        ]
-
-        alpha = 0.6
-
-        for i in range(5):
-            img = deepen_image_color(self._diff[i], 1.5)
-            self._diff[i] = adjust_image_alpha(img, alpha)
+        self.title_bg, self.design_bg, self._diff = _load_static_sprites(paths)
 
-    async def whiledraw(
+    def whiledraw(
         self,
         data: List[SongDifficulty],
         best: bool,
@@ -97,81 +185,32 @@ class Draw:
             else:
                 x += 416
 
-            cover_path = await assets.get_async(AssetType.COVER, info.id)
-            if not cover_path:
-                cover_path = await assets.get_async(AssetType.COVER, 0)
-            cover = Image.open(cover_path).resize((135, 135)).convert("RGBA")
-            version = (
-                Image.open(
-                    await assets.get_async(
-                        AssetType.IMAGES, f"{info.song_type.value}.png"
-                    )
-                )
-                .resize((55, 19))
-                .convert("RGBA")
+            cover = sprite_cache.get(
+                self._paths[AssetType.COVER, str(info.id)], size=(135, 135)
             )
+            version = sprite_cache.get(self._paths[_version_asset(info)], size=(55, 19))
 
             # rate s sp ss ssp sss和sss+的使用prism样式
             if info.user_score.rate:
-                if (
-                    info.user_score.rate == SongRateType.S
-                    or info.user_score.rate == SongRateType.S_PLUS
-                    or info.user_score.rate == SongRateType.SS
-                    or info.user_score.rate == SongRateType.SS_PLUS
-                    or info.user_score.rate == SongRateType.SSS
-                    or info.user_score.rate == SongRateType.SSS_PLUS
-                ):
-                    rate = (
-                        Image.open(
-                            await assets.get_async(
-                                AssetType.PRISM, f"{info.user_score.rate.value}.png"
-                            )
-                        )
-                        .resize((95, 44))
-                        .convert("RGBA")
+                rate_asset = _rate_asset(info)
+                if rate_asset[0] == AssetType.PRISM:
+                    rate = sprite_cache.get(
+                        self._paths[rate_asset],
+                        size=(95, 44),
+                        transform=(("deepen", 2),),
                     )
-
-                    rate = deepen_image_color(rate, 2)
-
                 else:
-                    rate = (
-                        Image.open(
-                            await assets.get_async(
-                                AssetType.IMAGES,
-                                f"UI_TTR_Rank_{score_Rank_l[info.user_score.rate.value]}.png",
-                            )
-                        )
-                        .resize((110, 44))
-                        .convert("RGBA")
-                    )
+                    rate = sprite_cache.get(self._paths[rate_asset], size=(110, 44))
             self._im.alpha_composite(self._diff[info.level_index], (x, y))
             self._im.alpha_composite(cover, (x + 5, y + 5))
             self._im.alpha_composite(version, (x + 80, y + 141))
             self._im.alpha_composite(rate, (x + 150, y + 98))
             if info.user_score.fc.value:
-                fc = (
-                    Image.open(
-                        await assets.get_async(
-                            AssetType.IMAGES,
-                            f"UI_MSS_MBase_Icon_{fcl[info.user_score.fc.value]}.png",
-                        )
-                    )
-                    .resize((45, 45))
-                    .convert("RGBA")
-                )
+                fc = sprite_cache.get(self._paths[_fc_asset(info)], size=(45, 45))
 
                 self._im.alpha_composite(fc, (x + 246, y + 99))
             if info.user_score.fs.value:
-                fs = (
-                    Image.open(
-                        await assets.get_async(
-                            AssetType.IMAGES,
-                            f"UI_MSS_MBase_Icon_{fsl[info.user_score.fs.value]}.png",
-                        )
-                    )
-                    .resize((45, 45))
-                    .convert("RGBA")
-                )
+                fs = sprite_cache.get(self._paths[_fs_asset(info)], size=(45, 45))
 
                 self._im.alpha_composite(fs, (x + 291, y + 99))
 
@@ -179,12 +218,7 @@ class Draw:
 
             if dxnum:
                 self._im.alpha_composite(
-                    Image.open(
-                        await assets.get_async(
-                            AssetType.IMAGES,
-                            f"UI_GAM_Gauge_DXScoreIcon_0{dxnum}.png",
-                        )
-                    ).convert("RGBA"),
+                    sprite_cache.get(self._paths[_dx_score_asset(dxnum)]),
                     (x + 335, y + 102),
                 )
 
@@ -236,53 +270,56 @@ class Draw:
 
 class DrawBest(Draw):
 
-    def __init__(self, b50player: B50Player) -> None:
-
-        background_image = random.choices(
-            ["b50_bg1-min.png", "b50_bg2-min.png", "b50_bg3-min.png"],
-            weights=[80, 10, 10],
-            k=1,
-        )[0]
-
+    def __init__(
+        self,
+        b50player: B50Player,
+        paths: Dict[Tuple[AssetType, str], str],
+        background: str,
+        plate: str | None,
+        avatar: str | None,
+        favorite_id: int,
+        avatar_data: bytes = None,
+    ) -> None:
+        """
+        Args:
+            b50player (B50Player): 玩家数据。
+            paths (Dict[Tuple[AssetType, str], str]): 由 b50_assets 解析出的本地路径。
+            background (str): 背景图片名称。
+            plate (str | None): 默认姓名框名称，玩家有自己的姓名框时为 None。
+            avatar (str | None): 默认头像名称，不使用默认头像时为 None。
+            favorite_id (int): 徽章角色的编号。
+            avatar_data (bytes): 网络头像数据。
+        """
         super().__init__(
-            Image.open(assets.get(AssetType.PRISM, background_image)).convert("RGBA")
+            sprite_cache.get(paths[AssetType.PRISM, background], copy=True), paths
         )
         self.b50player = b50player
+        self.plate = plate
+        self.avatar = avatar
+        self.favorite_id = favorite_id
+        self.avatar_data = avatar_data
 
-    async def draw(self) -> Image.Image:
+    def draw(self) -> Image.Image:
 
         # 绘制用户信息板子
-        default_plate_list = [
-            await assets.get_async(AssetType.PRISM, f"p{i}-min.png")
-            for i in range(1, 4)
-        ]
-
-        default_avatar_list = [
-            await assets.get_async(AssetType.PRISM, f"logo{i}.png") for i in range(1, 6)
-        ]
-
         sdrating, dxrating = sum(
             [_.user_score.rating for _ in self.b50player.song_data_b35]
         ), sum([_.user_score.rating for _ in self.b50player.song_data_b15])
 
-        user_info_image = await draw_user_info(
+        user_info_image = draw_user_info(
             self.b50player.user_info,
             f"B35: {sdrating} + B15: {dxrating} = {self.b50player.user_info.rating}",
-            random.choice(default_plate_list),
-            random.choice(default_avatar_list),
+            self._paths[AssetType.PRISM, self.plate] if self.plate else None,
+            self._paths[AssetType.PRISM, self.avatar] if self.avatar else None,
+            self._paths,
+            self.avatar_data,
         )
 
         self._im.alpha_composite(user_info_image, (500, 100))
         # 绘制徽章
-        if self.b50player.favorite_id == 0:
-            self.b50player.favorite_id = random.randint(1, 17)
-
-        logo = (
-            Image.open(
-                assets.get(AssetType.ONGEKI, f"ongeki{self.b50player.favorite_id}.png")
-            )
-            .resize((int(220 * 1.2), int(290 * 1.2)))
-            .convert("RGBA")
+        logo = sprite_cache.get(
+            self._paths[AssetType.ONGEKI, f"ongeki{self.favorite_id}.png"],
+            size=(int(220 * 1.2), int(290 * 1.2)),
         )
         self._im.alpha_composite(logo, (130, 25))
 
@@ -298,7 +335,7 @@ class DrawBest(Draw):
             "mm",
             3,
             (255, 255, 255, 255),
-            font=ImageFont.truetype(FontPaths.ZHIZI, 35),
+            font=get_font(FontPaths.ZHIZI, 35),
         )
 
         self._mr.draw(
@@ -310,16 +347,128 @@ class DrawBest(Draw):
             "mm",
             3,
             (255, 255, 255, 255),
-            font=ImageFont.truetype(FontPaths.ZHIZI, 35),
+            font=get_font(FontPaths.ZHIZI, 35),
         )
 
-        await self.whiledraw(self.b50player.song_data_b35, True)
-        await self.whiledraw(self.b50player.song_data_b15, False)
+        self.whiledraw(self.b50player.song_data_b35, True)
+        self.whiledraw(self.b50player.song_data_b15, False)
 
         self._im = add_rounded_corners_to_image(self._im, 35)
         return self._im
 
 
+def _player_digest(b50player: B50Player) -> str:
+    """
+    计算影响绘图结果的玩家数据的哈希
+    """
+    user_info = b50player.user_info
+    songs = [
+        [
+            [
+                info.id,
+                info.title,
+                info.song_type,
+                info.level,
+                info.level_index,
+                info.dx_rating_max,
+                info.user_score.achievements,
+                info.user_score.rate,
+                info.user_score.rating,
+                info.user_score.fc,
+                info.user_score.fs,
+                info.user_score.dx_score,
+            ]
+            for info in song_data
+        ]
+        for song_data in (b50player.song_data_b35, b50player.song_data_b15)
+    ]
+    data = {
+        "user_info": vars(user_info),
+        "favorite_id": b50player.favorite_id,
+        "songs": songs,
+    }
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+
+
+def best_render_key(job: tuple, quality: int) -> str:
+    """
+    计算渲染结果缓存的键。
+
+    键不包含随机元素，随机元素在渲染时才选定，玩家数据不变时重复请求
+    直接使用缓存中的那一张图片。
+
+    Args:
+        job (tuple): prepare_best 的返回值。
+        quality (int): JPEG 的压缩质量。
+    """
+    b50player, paths, avatar_data = job
+    data = {
+        "template": B50_TEMPLATE_VERSION,
+        "version": VERSION,
+        "player": _player_digest(b50player),
+        # 占位资产被真实资产替换后路径会变化
+        "paths": sorted(
+            f"{asset}:{param}:{path}" for (asset, param), path in paths.items()
+        ),
+        "avatar_data": hashlib.sha256(avatar_data or b"").hexdigest(),
+        "quality": quality,
+    }
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+
+
+async def prepare_best(b50player: B50Player) -> tuple:
+    """
+    在事件循环中准备绘制 B50 所需的数据：下载网络头像与资产。
+
+    Args:
+        b50player (B50Player): 玩家数据。
+
+    Returns:
+        tuple: render_best 的参数。
+    """
+    avatar_data = await fetch_avatar_data(b50player.user_info)
+    # 先并发下载所有缺失的资产，再开始绘图
+    paths = await assets.get_paths(b50_assets(b50player, avatar_data))
+    return b50player, paths, avatar_data
+
+
+def render_best(
+    b50player: B50Player,
+    paths: Dict[Tuple[AssetType, str], str],
+    avatar_data: bytes = None,
+) -> Image.Image:
+    """
+    绘制 B50，参数由 prepare_best 生成。不访问网络，可以在渲染进程中执行。
+
+    背景、默认姓名框、默认头像和未设置时的徽章角色在这里随机选定。
+    """
+    favorite_id = b50player.favorite_id or random.choice(FAVORITE_IDS)
+    background = random.choices(BACKGROUNDS, weights=BACKGROUND_WEIGHTS, k=1)[0]
+    plate = None if b50player.user_info.nameplate_id else random.choice(DEFAULT_PLATES)
+    avatar = (
+        random.choice(DEFAULT_AVATARS)
+        if _uses_default_avatar(b50player, avatar_data)
+        else None
+    )
+    return DrawBest(
+        b50player, paths, background, plate, avatar, favorite_id, avatar_data
+    ).draw()
+
+
+def warmup() -> None:
+    """
+    渲染进程启动时预加载 B50 的静态精灵图
+    """
+    _load_static_sprites({asset: assets.get(*asset) for asset in STATIC_ASSETS})
+
+
+render_executor.add_warmup(warmup)
+
+
 def getCharWidth(o) -> int:
     widths = [
         (126, 1),
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Tuple, Union
 
 from PIL import Image, ImageDraw, ImageFont
+from src.libraries.common.images.font import get_font
 
 from config import FontPaths
 
@@ -15,7 +16,7 @@ class DrawText:
         self._font = str(font)
 
     def get_box(self, text: str, size: int):
-        return ImageFont.truetype(self._font, size).getbbox(text)
+        return get_font(self._font, size).getbbox(text)
 
     def draw(
         self,
@@ -31,7 +32,7 @@ class DrawText:
         font: ImageFont.FreeTypeFont = None,
     ):
         if font is None:
-            font = ImageFont.truetype(self._font, size)
+            font = get_font(self._font, size)
         if multiline:
             self._img.multiline_text(
                 (pos_x, pos_y),
@@ -55,7 +56,7 @@ class DrawText:
 
 
 def text_to_image(text: str) -> Image.Image:
-    font = ImageFont.truetype(str(FontPaths.SIYUAN), 24)
+    font = get_font(FontPaths.SIYUAN, 24)
     padding = 10
     margin = 4
     lines = text.strip().split("\n")
@@ -20,8 +20,8 @@ class B50Player:
         # 喜欢的音击小女孩 ID
         self.favorite_id = favorite_id
 
-    async def enrich(self, user: MaimaiUser):
-        data = await user.fetch_best50_song_score()
+    async def enrich(self, user: MaimaiUser, force_refresh: bool = False):
+        data = await user.fetch_best50_song_score(force_refresh)
         self.song_data_b15 = data["b15"]
         self.song_data_b35 = data["b35"]
         self.user_info: UserInfo = data["user_info"]
@@ -1,21 +1,24 @@
-import os
 import asyncio
+import json
 import random
-import tempfile
-from collections import Counter
-
-import aiohttp
 import time
+from pathlib import Path
+from typing import Optional
 
-from PIL import Image
 from botpy.message import GroupMessage
 from src.libraries.assets import assets, AssetType
-
+from src.libraries.assets.get import write_file_atomic
+from src.libraries.common.game.maimai import song_catalog
+from src.libraries.common.file import upload_cache
+from src.libraries.common.images import encode_image, sprite_cache
+
+from .crops import crop_index
+from .matcher import AnswerMatcher
+from .pool import song_pool
+from .scheduler import hint_scheduler
 from .tools import (
-    get_alias_by_id,
     get_version_name,
-    upload_to_image_server,
-    translate_to_chinese,
+    translate_title,
 )
 
 from botpy import logger
@@ -23,6 +26,16 @@ from botpy import logger
 # 用于存储每个群的游戏状态
 group_game_state = {}
 
+# 进行中的游戏的保存位置，重启后恢复
+GAMES_STATE_PATH = Path(assets.assets_folder, "guess_games.json")
+
+# 被动回复的 msg_id 有效期（秒），消息超过该时间的游戏不再恢复
+GAME_RESTORE_MAX_AGE = 300
+
+# 后台写入任务，写入期间的状态变化合并到下一次写入
+_save_task: Optional[asyncio.Task] = None
+_save_dirty = False
+
 
 class GuessSongHandler:
     """
@@ -32,12 +45,14 @@ class GuessSongHandler:
     def __init__(self, message: GroupMessage):
         self.message_seq_id = 1
         self.message = message
+        # 收到 self.message 的时间，用于判断被动回复是否仍然有效
+        self.message_time = time.time()
         self.group_id = message.group_openid  # 使用 group_openid 作为唯一标识
-        self.temp_files = []
         self.current_song = None
         self.alias = []
         self.game_active = False
         self.possible_answers = []
+        self.answer_matcher = AnswerMatcher([])
 
     async def start_game(self, args, additional_message=""):
         """
@@ -47,38 +62,44 @@ class GuessSongHandler:
             if (
                 self.group_id in group_game_state
                 and group_game_state[self.group_id].game_active
-            ):
+            ) or hint_scheduler.pending(self.group_id) is not None:
                 await self.send_message(
                     "😅 已有一个游戏正在进行中！请等待当前游戏结束。"
                 )
                 return
-            if additional_message:
-                await self.send_message(additional_message)
 
+            # 在第一次 await 之前登记，同一群并发的开局会被上面的检查拒绝
             self.game_active = True
             group_game_state[self.group_id] = self  # 将实例保存到全局状态字典中
 
-            while len(self.alias) < 3:
-                self.current_song = await self.choice_song(args)
-                if not self.current_song:
-                    await self.send_message("❌ 无法获取歌曲列表，请稍后再试。")
-                    self.game_active = False
+            if additional_message:
+                await self.send_message(additional_message)
+
+            # 曲目池中的乐曲都有足够的别名，抽选一次即可
+            picked = await self.choice_song(args)
+            if not picked:
+                await self.send_message("❌ 无法获取歌曲列表，请稍后再试。")
+                self.game_active = False
+                if group_game_state.get(self.group_id) is self:
                     del group_game_state[self.group_id]
-                    return
-                self.alias = await get_alias_by_id(self.current_song["id"])
-                cover_path = await self.get_cover()
-                logger.info(f"Chosen song: {self.current_song['title']}")
+                return
+            self.current_song, self.alias = picked
+            cover_path = await self.get_cover()
+            logger.info(f"Chosen song: {self.current_song['title']}")
 
             title = self.current_song["title"].replace(" ", "").lower()
 
-            chinese = await translate_to_chinese(self.current_song["title"], "en")
-            chinese2 = await translate_to_chinese(self.current_song["title"], "ja")
+            chinese, chinese2 = await translate_title(self.current_song["title"])
 
             self.possible_answers = [title, chinese, chinese2] + self.alias
             logger.info(f"Possible answers: {self.possible_answers}")
+            self.answer_matcher = AnswerMatcher(self.possible_answers)
 
             await self.send_message("🎵 开始猜歌吧！这是什么乐曲呢？", image=cover_path)
-            await self.wait_for_guess()
+            if self.game_active:
+                # 提示与超时由调度器统一触发，开局后立即返回
+                hint_scheduler.schedule(self.group_id, self.on_hint)
+                save_games()
         except Exception as e:
             logger.error(f"Error starting game: {str(e)}")
             await self.end_game("❌ 游戏出现了一个错误，已结束。")
@@ -89,22 +110,15 @@ class GuessSongHandler:
         """
         try:
             if image:
-                # 上传图片到 ImageKit 并获取URL
-                image_url = await upload_to_image_server(image)
-                # image_url = image
-                if not image_url:
+                # 上传图片并获取富媒体对象，相同的图片在有效期内不再上传
+                upload_media = await upload_cache.get_group_media(
+                    self.message._api, self.group_id, image
+                )
+                if not upload_media:
                     await self.message.reply(content="图片上传失败，请稍后再试。")
-                    self.end_game()
+                    await self.end_game(is_message=False)
                     return
 
-                # 上传图片的URL到群文件管理
-                upload_media = await self.message._api.post_group_file(
-                    group_openid=self.group_id,
-                    file_type=1,
-                    url=image_url,
-                    srv_send_msg=False,
-                )
-
                 # 发送富媒体消息
                 await self.message._api.post_group_message(
                     group_openid=self.group_id,
@@ -133,10 +147,12 @@ class GuessSongHandler:
         处理用户的猜歌尝试。
         """
 
-        if not self.game_active:
+        # 开局时游戏已登记，答案准备好之前的消息不作为猜测
+        if not self.game_active or not self.possible_answers:
             return
         # 转移消息对象
         self.message = message
+        self.message_time = time.time()
 
         try:
             if await self.judge_guess(message.content):
@@ -151,76 +167,53 @@ class GuessSongHandler:
     async def judge_guess(self, msg):
         """
         判断用户的猜测是否正确。
-        用户猜测需要与歌曲的标题或别名有至少 20% 的连续字符匹配才被认为是正确的，空格不计入字符中。
+        用户猜测需要与歌曲的标题或别名有至少 30% 的连续字符匹配才被认为是正确的，空格不计入字符中。
         """
         if not msg:
             return False
 
-        guess_lower = msg.replace(" ", "").lower()
-        for answer in self.possible_answers:
-            if not answer:
-                if not self.current_song["title"].replace(" ", ""):
-                    return True
-            if self.get_max_match_length(guess_lower, answer) / len(answer) >= 0.3:
-                return True
-        return False
+        # 标题为空白的乐曲无法匹配，任何猜测都算猜中
+        if not self.current_song["title"].replace(" ", ""):
+            return True
+        return self.answer_matcher.match(msg)
 
-    def get_max_match_length(self, guess, answer):
-        """
-        获取 guess 在 answer 中的最长连续匹配长度。
-        """
-        max_length = 0
-        for i in range(len(answer)):
-            for j in range(i + 1, len(answer) + 1):
-                if guess.find(answer[i:j]) != -1:
-                    max_length = max(max_length, j - i)
-        return max_length
-
-    async def wait_for_guess(self):
+    async def on_hint(self, hint_type):
         """
-        等待玩家猜测，或直到时间结束。
-        提供不同的提示信息。
+        由提示调度器在各阶段调用，hint_type 为 None 时表示时间到。
         """
         try:
-            await asyncio.sleep(10)  # 等待 10 秒
-            if self.game_active:
-                await self.provide_hint("genre or version or artist")
-                await asyncio.sleep(15)  # 再等待 10 秒
-            else:
+            if not self.game_active:
                 return
-
-            if self.game_active:
-                await self.provide_hint("difficulty level")
-                await asyncio.sleep(15)  # 再等待 10 秒
-            else:
-                return
-
-            if self.game_active:
-                await self.provide_hint("title")
-                await asyncio.sleep(15)
-            else:
-                return
-
-            if self.game_active:
-                await self.provide_hint("cover image")
-                await asyncio.sleep(20)  # 再等待 10 秒
-            else:
-                return
-
-            if self.game_active:
-                await self.provide_hint("alias")
-                await asyncio.sleep(25)
-            else:
-                return
-
-            if self.game_active:
+            if hint_type is None:
                 await self.end_game(be_guessed=False)
             else:
-                return
-
+                await self.provide_hint(hint_type)
         except Exception as e:
             logger.error(f"Error during waiting for guess: {str(e)}")
             await self.end_game("❌ 游戏出现错误，已结束。")
+        finally:
+            save_games()
+
+    def to_state(self) -> dict:
+        """
+        导出可持久化的游戏状态
+        """
+        stage, deadline = hint_scheduler.pending(self.group_id)
+        return {
+            "message": {
+                "id": self.message.id,
+                "group_openid": self.group_id,
+                "author": {"member_openid": self.message.author.member_openid},
+                "content": self.message.content,
+            },
+            "message_time": self.message_time,
+            "message_seq_id": self.message_seq_id,
+            "song_id": self.current_song["id"],
+            "alias": self.alias,
+            "possible_answers": self.possible_answers,
+            "stage": stage,
+            "deadline": deadline,
+        }
 
     async def provide_hint(self, hint_type):
         """
@@ -290,15 +283,11 @@ class GuessSongHandler:
         结束游戏，并公布正确答案。
         """
         self.game_active = False
+        # 只取消本局的提示，不影响同一群中正在进行的其他游戏
+        if group_game_state.get(self.group_id) is self:
+            hint_scheduler.cancel(self.group_id)
 
         try:
-            # 清理临时文件
-            for temp_file in self.temp_files:
-                try:
-                    os.remove(temp_file)
-                except OSError:
-                    pass
-            self.temp_files.clear()
             if is_message:
                 cover = await assets.get_async(AssetType.COVER, self.current_song["id"])
                 if be_guessed:
@@ -316,87 +305,41 @@ class GuessSongHandler:
             logger.error(f"Error ending game: {str(e)}")
         finally:
             # 移除群组的游戏状态
-            if self.group_id in group_game_state:
+            if group_game_state.get(self.group_id) is self:
                 del group_game_state[self.group_id]
+            save_games()
 
     @staticmethod
     async def choice_song(categories=[]):
         """
-        从曲目列表随机选择一首歌，根据提供的分类。
-        """
-        genre_dict = {
-            "0": "maimai",
-            "1": "POPSアニメ",
-            "2": "niconicoボーカロイド",
-            "3": "ゲームバラエティ",
-            "4": "オンゲキCHUNITHM",
-            "5": "東方Project",
-        }
+        从曲目池随机选择一首歌，根据提供的分类。
 
+        Returns:
+            (乐曲数据, 别名列表)，没有可选的乐曲时返回 None。
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://maimai.lxns.net/api/v0/maimai/song/list"
-                ) as resp:
-                    if resp.status != 200:
-                        logger.error(f"Error fetching song list: {resp.status}")
-                        return None
-
-                    data = await resp.json()
-                    songs = data.get("songs", [])
-
-                    if not categories:
-                        # 如果 categories 是空的，随机选择所有歌曲
-                        return random.choice(songs) if songs else None
-
-                    # 根据 categories 筛选歌曲
-                    genre_filter = set(
-                        genre_dict.get(cat) for cat in categories if cat in genre_dict
-                    )
-
-                    song_list = [
-                        song for song in songs if song["genre"] in genre_filter
-                    ]
-
-                    return random.choice(song_list) if song_list else None
-
+            pool = await song_pool.load()
+            # 首次开局时在后台为曲目池中的曲绘建立裁剪索引
+            crop_index.start_scan(pool.song_ids())
+            return pool.pick(categories)
         except Exception as e:
             logger.error(f"Error choosing song: {str(e)}")
             return None
 
     async def get_cover(self, length=70, width=70):
         """
-        获取歌曲封面的一部分。如果95%的像素都是同一种颜色，则重新生成。
+        获取歌曲封面的一部分，避开颜色单一的区域。
+
+        Returns:
+            bytes: PNG 格式的图片数据。
         """
         try:
             cover = await assets.get_async(AssetType.COVER, self.current_song["id"])
+            bitmap = await crop_index.get_bitmap(cover)
 
-            with Image.open(cover) as img:
-                for _ in range(5):
-                    x = random.randint(0, img.width - length)
-                    y = random.randint(0, img.height - width)
-                    crop_area = (x, y, x + length, y + width)
-                    cropped_img = img.crop(crop_area)
-
-                    color_counts = Counter(cropped_img.getdata())
-                    most_common_color_count = color_counts.most_common(1)[0][1]
-
-                    # 检查裁剪区域是否颜色单一
-                    if most_common_color_count / (length * width) < 0.95:
-                        with tempfile.NamedTemporaryFile(
-                            suffix=f"_{int(time.time())}_crop.png", delete=False
-                        ) as temp_file:
-                            cropped_img.save(temp_file.name)
-                            self.temp_files.append(temp_file.name)
-                            return temp_file.name
-
-                # 如果所有尝试都不成功，返回最后一次裁剪结果
-                with tempfile.NamedTemporaryFile(
-                    suffix=f"_{int(time.time())}_crop.png", delete=False
-                ) as temp_file:
-                    cropped_img.save(temp_file.name)
-                    self.temp_files.append(temp_file.name)
-                    return temp_file.name
+            img = sprite_cache.get(cover)
+            crop_area = crop_index.pick(bitmap, img.size, length, width)
+            return encode_image(img.crop(crop_area), format="PNG")
 
         except Exception as e:
             logger.error(
@@ -406,6 +349,80 @@ class GuessSongHandler:
             return None
 
 
+def _games_state() -> dict:
+    return {
+        group_id: handler.to_state()
+        for group_id, handler in group_game_state.items()
+        if handler.game_active and hint_scheduler.pending(group_id)
+    }
+
+
+def _write_games(games: dict) -> None:
+    try:
+        write_file_atomic(
+            GAMES_STATE_PATH, json.dumps(games, ensure_ascii=False).encode()
+        )
+    except OSError as e:
+        logger.error(f"Error saving guess games: {str(e)}")
+
+
+def save_games() -> None:
+    """
+    在后台保存所有进行中的游戏，连续的多次请求合并为一次写入
+    """
+    global _save_task, _save_dirty
+    _save_dirty = True
+    if _save_task is None or _save_task.done():
+        _save_task = asyncio.create_task(_save_loop())
+
+
+async def _save_loop() -> None:
+    global _save_dirty
+    while _save_dirty:
+        _save_dirty = False
+        # 在事件循环中取快照，在线程中序列化并写入
+        await asyncio.to_thread(_write_games, _games_state())
+
+
+async def restore_games(client) -> None:
+    """
+    恢复重启前进行中的游戏，并重新登记提示
+    """
+    if not GAMES_STATE_PATH.exists():
+        return
+    try:
+        games = json.loads(GAMES_STATE_PATH.read_text())
+        catalog = await song_catalog.load()
+    except Exception as e:
+        logger.error(f"Error loading guess games: {str(e)}")
+        return
+
+    now = time.time()
+    for group_id, state in games.items():
+        # 断线重连时 on_ready 会再次触发，已在进行的游戏不重复恢复
+        if group_id in group_game_state:
+            continue
+        song = catalog.get_song(state["song_id"])
+        # 消息的 msg_id 过期后无法再回复，恢复后第一条消息就会失败
+        message_time = state.get("message_time", 0)
+        if not song or now - message_time > GAME_RESTORE_MAX_AGE:
+            continue
+        handler = GuessSongHandler(GroupMessage(client.api, None, state["message"]))
+        handler.message_time = message_time
+        handler.message_seq_id = state["message_seq_id"]
+        handler.current_song = song
+        handler.alias = state["alias"]
+        handler.possible_answers = state["possible_answers"]
+        handler.answer_matcher = AnswerMatcher(handler.possible_answers)
+        handler.game_active = True
+        group_game_state[group_id] = handler
+        hint_scheduler.schedule(
+            group_id, handler.on_hint, state["stage"], max(state["deadline"], now)
+        )
+        logger.info(f"Restored guess game in group {group_id}: {song['title']}")
+    save_games()
+
+
 async def guess(message: GroupMessage):
     logger.info(f"Received guess command from {message.author.member_openid}")
     msg = message.content.strip().lower()
@@ -484,8 +501,27 @@ COMMANDS = {
     "曲绘猜歌": guess,
 }
 
+# 指令的调度选项，见 CommandDispatcher
+COMMAND_OPTIONS = {
+    "guess": {"max_queue": 10},
+    "曲绘猜歌": {"max_queue": 10},
+}
+
 # 指令范围
 COMMAND_SCOPE = "group"
 
 # 设置默认处理函数
 DEFAULT_HANDLER = handle_unknown_command
+
+# 启动时恢复进行中的游戏
+READY_HANDLER = restore_games
+
+
+async def close_games() -> None:
+    # 停止提示调度，等待最后一次保存完成，重启后恢复进行中的游戏
+    await hint_scheduler.close()
+    if _save_task is not None:
+        await _save_task
+
+
+CLOSE_HANDLER = close_games
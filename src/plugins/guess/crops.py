@@ -0,0 +1,237 @@
+"""
+猜歌曲绘裁剪
+"""
+
+import asyncio
+import base64
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+from botpy import logger
+
+from src.libraries.assets import assets, AssetType
+from src.libraries.assets.get import write_file_atomic
+
+# 统计颜色变化的方块边长（像素）
+CROP_TILE = 10
+
+# 方块内 RGB 任一通道的标准差超过该值，视为有内容
+TILE_MIN_STD = 6.0
+
+# 裁剪区域内有内容的方块至少占的比例
+CROP_MIN_BUSY = 0.6
+
+# 后台扫描曲绘时的并发数
+CROP_SCAN_CONCURRENCY = 4
+
+# (行数, 列数, 曲绘修改时间, 方块位图)
+CropEntry = Tuple[int, int, float, np.ndarray]
+
+
+def tile_bitmap(image: Image.Image, tile: int = CROP_TILE) -> np.ndarray:
+    """
+    计算曲绘的方块位图，有颜色变化的方块为 True
+
+    Args:
+        image (Image.Image): 曲绘。
+        tile (int): 方块边长。
+
+    Returns:
+        np.ndarray: 形状为 (行数, 列数) 的布尔数组。
+    """
+    pixels = np.asarray(image.convert("RGB"), dtype=np.float32)
+    rows, cols = pixels.shape[0] // tile, pixels.shape[1] // tile
+    tiles = pixels[: rows * tile, : cols * tile].reshape(rows, tile, cols, tile, 3)
+    return tiles.std(axis=(1, 3)).max(axis=-1) > TILE_MIN_STD
+
+
+class CropIndex:
+    """
+    曲绘裁剪位置的索引。
+
+    每张曲绘只在首次使用或后台扫描时计算一次方块位图，以曲绘文件名为键
+    压缩后保存到磁盘；曲绘文件更新后会重新计算。选择裁剪区域时只需在
+    位图上求和，不再逐像素统计颜色。
+    """
+
+    def __init__(self, path: str | Path, tile: int = CROP_TILE) -> None:
+        self.path = Path(path)
+        self.tile = tile
+        self._entries: Dict[str, CropEntry] = {}
+        self._scan_task: Optional[asyncio.Task] = None
+        # 后台写入任务，写入期间的新位图合并到下一次写入
+        self._save_task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"[GUESS] 读取曲绘裁剪索引失败：{e}")
+            return
+        if data.get("tile") != self.tile:
+            return
+        for name, (rows, cols, mtime, bits) in data.get("covers", {}).items():
+            bitmap = np.unpackbits(
+                np.frombuffer(base64.b64decode(bits), dtype=np.uint8),
+                count=rows * cols,
+            )
+            self._entries[name] = (rows, cols, mtime, bitmap.reshape(rows, cols))
+
+    def save(self, entries: Optional[Dict[str, CropEntry]] = None) -> None:
+        """
+        将索引写入磁盘
+
+        Args:
+            entries (Dict[str, CropEntry], optional): 要写入的索引快照，默认为当前索引。
+        """
+        if entries is None:
+            entries = dict(self._entries)
+        covers = {
+            name: [
+                rows,
+                cols,
+                mtime,
+                base64.b64encode(np.packbits(bitmap).tobytes()).decode(),
+            ]
+            for name, (rows, cols, mtime, bitmap) in entries.items()
+        }
+        try:
+            write_file_atomic(
+                self.path, json.dumps({"tile": self.tile, "covers": covers}).encode()
+            )
+        except OSError as e:
+            logger.warning(f"[GUESS] 写入曲绘裁剪索引失败：{e}")
+
+    async def save_async(self) -> None:
+        """
+        在线程中将索引写入磁盘
+        """
+        await asyncio.to_thread(self.save, dict(self._entries))
+
+    def _schedule_save(self) -> None:
+        """
+        在后台写入索引，连续的多次请求合并为一次写入
+        """
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_loop())
+
+    async def _save_loop(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            await self.save_async()
+
+    def _compute(self, cover_path: str) -> CropEntry:
+        mtime = Path(cover_path).stat().st_mtime
+        with Image.open(cover_path) as img:
+            bitmap = tile_bitmap(img, self.tile)
+        return bitmap.shape[0], bitmap.shape[1], mtime, bitmap
+
+    async def get_bitmap(self, cover_path: str, save: bool = True) -> np.ndarray:
+        """
+        获取曲绘的方块位图，没有索引或曲绘已更新时在线程中计算
+
+        Args:
+            cover_path (str): 曲绘路径。
+            save (bool): 新计算位图后是否在后台写入磁盘。
+        """
+        name = Path(cover_path).name
+        entry = self._entries.get(name)
+        if entry is None or entry[2] != Path(cover_path).stat().st_mtime:
+            entry = await asyncio.to_thread(self._compute, cover_path)
+            self._entries[name] = entry
+            if save:
+                self._schedule_save()
+        return entry[3]
+
+    def pick(
+        self,
+        bitmap: np.ndarray,
+        size: Tuple[int, int],
+        length: int,
+        width: int,
+    ) -> Tuple[int, int, int, int]:
+        """
+        随机选择一个内容足够丰富的裁剪区域
+
+        Args:
+            bitmap (np.ndarray): 曲绘的方块位图。
+            size (Tuple[int, int]): 曲绘尺寸。
+            length (int): 裁剪宽度。
+            width (int): 裁剪高度。
+
+        Returns:
+            Tuple[int, int, int, int]: 裁剪区域 (左, 上, 右, 下)。
+        """
+        # 裁剪区域覆盖的方块数
+        tiles_x = -(-length // self.tile)
+        tiles_y = -(-width // self.tile)
+        max_col = min(bitmap.shape[1] - tiles_x, (size[0] - length) // self.tile)
+        max_row = min(bitmap.shape[0] - tiles_y, (size[1] - width) // self.tile)
+        if max_col < 0 or max_row < 0:
+            x = random.randint(0, max(size[0] - length, 0))
+            y = random.randint(0, max(size[1] - width, 0))
+            return x, y, x + length, y + width
+
+        # 积分图求每个窗口内有内容的方块数
+        integral = np.zeros((bitmap.shape[0] + 1, bitmap.shape[1] + 1), dtype=np.int32)
+        integral[1:, 1:] = bitmap.cumsum(axis=0).cumsum(axis=1)
+        busy = (
+            integral[tiles_y : tiles_y + max_row + 1, tiles_x : tiles_x + max_col + 1]
+            - integral[: max_row + 1, tiles_x : tiles_x + max_col + 1]
+            - integral[tiles_y : tiles_y + max_row + 1, : max_col + 1]
+            + integral[: max_row + 1, : max_col + 1]
+        ) / (tiles_x * tiles_y)
+
+        candidates = np.argwhere(busy >= CROP_MIN_BUSY)
+        if not len(candidates):
+            # 没有足够丰富的区域时退而求其次
+            candidates = np.argwhere(busy == busy.max())
+        row, col = candidates[random.randrange(len(candidates))]
+        x, y = int(col) * self.tile, int(row) * self.tile
+        return x, y, x + length, y + width
+
+    async def scan(self, song_ids: Iterable[int]) -> int:
+        """
+        预先计算一批乐曲曲绘的位图并保存
+
+        Returns:
+            int: 新计算的曲绘数。
+        """
+        semaphore = asyncio.Semaphore(CROP_SCAN_CONCURRENCY)
+        before = len(self._entries)
+
+        async def scan_one(song_id: int) -> None:
+            async with semaphore:
+                try:
+                    cover = await assets.get_async(AssetType.COVER, song_id)
+                    await self.get_bitmap(cover, save=False)
+                except Exception as e:
+                    logger.warning(f"[GUESS] 扫描曲绘失败：{song_id}, {e}")
+
+        await asyncio.gather(*(scan_one(song_id) for song_id in song_ids))
+        await self.save_async()
+        count = len(self._entries) - before
+        logger.info(f"[GUESS] 曲绘裁剪索引扫描完成，新增 {count} 张曲绘")
+        return count
+
+    def start_scan(self, song_ids: List[int]) -> None:
+        """
+        在后台扫描曲绘，每个进程只扫描一次。
+
+        之后新增的乐曲不会被扫描，它们的位图在首次使用时由 get_bitmap 计算。
+        """
+        if self._scan_task is None:
+            self._scan_task = asyncio.create_task(self.scan(song_ids))
+
+
+# 进程内共享的曲绘裁剪索引
+crop_index = CropIndex(Path(assets.assets_folder, "crop_index.json"))
@@ -0,0 +1,114 @@
+"""
+猜歌答案匹配
+"""
+
+from typing import Dict, Iterable, List
+
+from src.libraries.common.game.maimai import normalize_alias
+
+# 最长公共子串占答案长度的比例达到该值即视为猜中
+MATCH_THRESHOLD = 0.3
+
+
+class SuffixAutomaton:
+    """
+    字符串的后缀自动机。
+
+    构建与查询的时间都与字符串长度成线性关系，用于求另一个字符串
+    与该字符串的最长公共子串长度。
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        # 每个状态的转移、后缀链接与最长长度
+        self._next: List[Dict[str, int]] = [{}]
+        self._link: List[int] = [-1]
+        self._length: List[int] = [0]
+        last = 0
+        for char in text:
+            last = self._extend(last, char)
+
+    def _extend(self, last: int, char: str) -> int:
+        current = len(self._length)
+        self._next.append({})
+        self._link.append(0)
+        self._length.append(self._length[last] + 1)
+
+        state = last
+        while state != -1 and char not in self._next[state]:
+            self._next[state][char] = current
+            state = self._link[state]
+        if state == -1:
+            return current
+
+        target = self._next[state][char]
+        if self._length[state] + 1 == self._length[target]:
+            self._link[current] = target
+            return current
+
+        clone = len(self._length)
+        self._next.append(dict(self._next[target]))
+        self._link.append(self._link[target])
+        self._length.append(self._length[state] + 1)
+        while state != -1 and self._next[state].get(char) == target:
+            self._next[state][char] = clone
+            state = self._link[state]
+        self._link[target] = clone
+        self._link[current] = clone
+        return current
+
+    def longest_common_substring(self, other: str) -> int:
+        """
+        获取 other 与该字符串的最长公共子串长度
+        """
+        state = 0
+        length = 0
+        best = 0
+        for char in other:
+            while state and char not in self._next[state]:
+                state = self._link[state]
+                length = self._length[state]
+            if char in self._next[state]:
+                state = self._next[state][char]
+                length += 1
+            best = max(best, length)
+        return best
+
+
+class AnswerMatcher:
+    """
+    一局猜歌的答案匹配器。
+
+    开局时为每个答案构建后缀自动机，之后每次判断只需扫描一遍猜测。
+    答案与猜测都会标准化 (小写并去除空白)，空答案会被忽略。
+    """
+
+    def __init__(self, answers: Iterable[str], threshold: float = MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.answers: List[str] = []
+        for answer in answers:
+            answer = normalize_alias(answer or "")
+            if answer and answer not in self.answers:
+                self.answers.append(answer)
+        self._automata = [SuffixAutomaton(answer) for answer in self.answers]
+
+    def best_ratio(self, guess: str) -> float:
+        """
+        获取猜测与各答案的最长公共子串占答案长度的最大比例
+        """
+        guess = normalize_alias(guess)
+        if not guess:
+            return 0.0
+        return max(
+            (
+                automaton.longest_common_substring(guess) / len(automaton.text)
+                for automaton in self._automata
+            ),
+            default=0.0,
+        )
+
+    def match(self, guess: str) -> bool:
+        """
+        判断猜测是否命中任一答案
+        """
+        return self.best_ratio(guess) >= self.threshold
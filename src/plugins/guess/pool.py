@@ -0,0 +1,136 @@
+"""
+猜歌曲池
+"""
+
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from botpy import logger
+
+from src.libraries.assets import assets, JSONType
+from src.libraries.common.game.maimai import MaimaiHelper, alias_index, song_catalog
+
+# 参与猜歌的乐曲至少需要的别名数
+MIN_ALIASES = 3
+
+# 猜歌分类参数 -> 乐曲分类
+GENRES = {
+    "0": "maimai",
+    "1": "POPSアニメ",
+    "2": "niconicoボーカロイド",
+    "3": "ゲームバラエティ",
+    "4": "オンゲキCHUNITHM",
+    "5": "東方Project",
+}
+
+
+class SongPool:
+    """
+    猜歌的曲目池，进程内共享。
+
+    由本地缓存的 LXNS 曲目列表、LXNS 别名列表与 fanyu 别名数据构建，
+    按分类保存别名不少于 MIN_ALIASES 个的乐曲。数据由 Assets.get_json
+    在后台刷新，只有数据对象变化时才重建，开局时的抽选不访问网络。
+    """
+
+    def __init__(self, min_aliases: int = MIN_ALIASES) -> None:
+        self.min_aliases = min_aliases
+        # 分类 -> [(乐曲数据, 别名列表)]
+        self._genres: Dict[str, List[Tuple[dict, List[str]]]] = {}
+        # LXNS 乐曲ID -> 别名列表
+        self._aliases: Dict[int, List[str]] = {}
+        # 构建曲目池所用的 (曲目索引版本, 别名索引版本, LXNS 别名数据)
+        self._sources: Tuple = (None, None, None)
+
+    async def load(self) -> "SongPool":
+        """
+        确保曲目池可用，必要时重建。
+
+        Returns:
+            SongPool: 当前实例。
+        """
+        catalog = await song_catalog.load()
+        index = await alias_index.load()
+        lxns_aliases = await assets.get_json(JSONType.LXNS_ALIAS)
+        sources = (catalog.version, index.version, lxns_aliases)
+        if sources[:2] != self._sources[:2] or lxns_aliases is not self._sources[2]:
+            self._build(lxns_aliases or {})
+            self._sources = sources
+        return self
+
+    def _build(self, lxns_aliases: dict) -> None:
+        """
+        构建曲目池
+
+        Args:
+            lxns_aliases (dict): LXNS 别名列表 JSON 数据。
+        """
+        aliases: Dict[int, List[str]] = {}
+        for entry in lxns_aliases.get("aliases", []):
+            song_aliases = entry.get("aliases") or entry.get("alias") or []
+            aliases.setdefault(entry.get("song_id"), []).extend(song_aliases)
+
+        genres: Dict[str, List[Tuple[dict, List[str]]]] = {}
+        for song in song_catalog.songs():
+            # fanyu 的别名数据以 DX 乐曲ID为键
+            song_aliases = aliases.get(song["id"], []) + alias_index.get_aliases(
+                MaimaiHelper.lxns_to_common_songid(song["id"])
+            )
+            aliases[song["id"]] = song_aliases
+            if len(song_aliases) >= self.min_aliases:
+                genres.setdefault(song["genre"], []).append((song, song_aliases))
+
+        self._genres = genres
+        self._aliases = aliases
+        logger.info(
+            "[GUESS] 曲目池已构建: "
+            + ", ".join(f"{genre} {len(songs)} 首" for genre, songs in genres.items())
+        )
+
+    def song_ids(self) -> List[int]:
+        """
+        获取曲目池中全部乐曲的 LXNS 乐曲ID
+        """
+        return [song["id"] for songs in self._genres.values() for song, _ in songs]
+
+    def get_aliases(self, song_id: int) -> List[str]:
+        """
+        获取乐曲的全部别名
+
+        Args:
+            song_id (int): LXNS 乐曲ID。
+        """
+        return list(self._aliases.get(song_id, ()))
+
+    def pick(self, categories: Iterable[str] = ()) -> Optional[Tuple[dict, List[str]]]:
+        """
+        随机抽选一首乐曲
+
+        Args:
+            categories (Iterable[str]): 分类参数，为空时从全部乐曲中抽选。
+
+        Returns:
+            Optional[Tuple[dict, List[str]]]: (乐曲数据, 别名列表)，没有可选的乐曲时返回 None。
+        """
+        categories = list(categories)
+        if categories:
+            genres = {GENRES[cat] for cat in categories if cat in GENRES}
+        else:
+            genres = set(self._genres)
+        pools = [self._genres[genre] for genre in genres if genre in self._genres]
+
+        # 按曲目数加权选择分类，等价于在合并后的列表中均匀抽选
+        total = sum(len(pool) for pool in pools)
+        if not total:
+            return None
+        index = random.randrange(total)
+        for pool in pools:
+            if index < len(pool):
+                song, song_aliases = pool[index]
+                return song, list(song_aliases)
+            index -= len(pool)
+        return None
+
+
+# 进程内共享的猜歌曲目池
+song_pool = SongPool()
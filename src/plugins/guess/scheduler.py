@@ -0,0 +1,143 @@
+"""
+猜歌提示调度
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from botpy import logger
+
+# 各阶段距上一阶段的间隔（秒）与提示类型，None 表示时间到、游戏结束
+HINT_STAGES: Tuple[Tuple[float, Optional[str]], ...] = (
+    (10, "genre or version or artist"),
+    (15, "difficulty level"),
+    (15, "title"),
+    (15, "cover image"),
+    (20, "alias"),
+    (25, None),
+)
+
+HintCallback = Callable[[Optional[str]], Awaitable[None]]
+
+
+class HintScheduler:
+    """
+    所有猜歌游戏共享的提示调度器。
+
+    各群下一次提示的截止时间保存在一个最小堆中，由单个后台任务按时间顺序
+    触发，不再为每局游戏保留一个休眠的协程。取消游戏时只需移除登记，
+    堆中失效的条目在出堆时跳过。
+    """
+
+    def __init__(self, stages=HINT_STAGES) -> None:
+        self.stages = stages
+        # (截止时间, 序号, 群ID, 阶段)
+        self._heap: List[Tuple[float, int, str, int]] = []
+        # 群ID -> (阶段, 截止时间)，与堆中有效的条目对应
+        self._pending: Dict[str, Tuple[int, float]] = {}
+        self._callbacks: Dict[str, HintCallback] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(
+        self,
+        group_id: str,
+        callback: HintCallback,
+        stage: int = 0,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        登记一局游戏的提示，覆盖该群已有的登记
+
+        Args:
+            group_id (str): 群ID。
+            callback (HintCallback): 到达各阶段时调用，参数为提示类型。
+            stage (int): 从哪个阶段开始。
+            deadline (float, optional): 该阶段的截止时间 (time.time())，默认按阶段间隔计算。
+        """
+        if deadline is None:
+            deadline = time.time() + self.stages[stage][0]
+        self._callbacks[group_id] = callback
+        self._push(group_id, stage, deadline)
+        self._ensure_running()
+
+    def _push(self, group_id: str, stage: int, deadline: float) -> None:
+        self._pending[group_id] = (stage, deadline)
+        heapq.heappush(self._heap, (deadline, next(self._counter), group_id, stage))
+        self._wakeup.set()
+
+    def cancel(self, group_id: str) -> None:
+        """
+        取消一局游戏的全部提示
+        """
+        self._pending.pop(group_id, None)
+        self._callbacks.pop(group_id, None)
+
+    def pending(self, group_id: str) -> Optional[Tuple[int, float]]:
+        """
+        获取一局游戏下一次提示的 (阶段, 截止时间)
+        """
+        return self._pending.get(group_id)
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            # 跳过已取消或已被覆盖的条目
+            while self._heap:
+                deadline, _, group_id, stage = self._heap[0]
+                if self._pending.get(group_id) == (stage, deadline):
+                    break
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            deadline, _, group_id, stage = heapq.heappop(self._heap)
+            callback = self._callbacks[group_id]
+            if stage + 1 < len(self.stages):
+                self._push(group_id, stage + 1, deadline + self.stages[stage + 1][0])
+            else:
+                self.cancel(group_id)
+            asyncio.create_task(self._fire(group_id, callback, self.stages[stage][1]))
+
+    @staticmethod
+    async def _fire(
+        group_id: str, callback: HintCallback, hint_type: Optional[str]
+    ) -> None:
+        try:
+            await callback(hint_type)
+        except Exception as e:
+            logger.error(f"[GUESS] 群 {group_id} 的提示出错：{e}")
+
+    async def close(self) -> None:
+        """
+        停止后台任务，登记的提示保留在内存中
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 进程内共享的提示调度器
+hint_scheduler = HintScheduler()
@@ -2,40 +2,29 @@
 alias
 """
 
-import os
-import aiohttp
-from config import IMAGES_SERVER_ADDRESS
+import asyncio
+from typing import Iterable, List, Tuple
 
 from botpy import logger
+from src.libraries.common.http import http_client
+from src.libraries.common.game.maimai import song_catalog
+from src.libraries.database import (
+    get_translations,
+    save_translations,
+    shutdown_session,
+)
+from src.libraries.database.exceptions import DatabaseOperationError
 
+from .pool import song_pool
 
-async def upload_to_image_server(file_path):
-    """
-    将本地图片上传到自己的服务器，并返回图片的URL。
-    """
-    upload_url = f"{IMAGES_SERVER_ADDRESS}/upload/"  # 替换为你的服务器上传接口
-
-    # 打开文件进行上传
-    async with aiohttp.ClientSession() as session:
-        with open(file_path, "rb") as f:
-            # 创建一个 form data
-            form_data = aiohttp.FormData()
-            form_data.add_field(
-                "file",
-                f,
-                filename=os.path.basename(file_path),
-                content_type="image/jpeg",  # 根据实际情况设置文件类型
-            )
-
-            # 上传文件到服务器
-            async with session.post(upload_url, data=form_data) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    # 假设服务器返回的数据结构中有一个 'file_url' 字段
-                    url = response_data.get("file_url")
-                    return url
-                else:
-                    raise Exception(f"Failed to upload file: {response.status}")
+# 标题翻译的源语言
+TRANSLATE_LANGUAGES = ("en", "ja")
+
+# 开局时等待翻译 API 的最长时间（秒）
+TRANSLATE_TIMEOUT = 3
+
+# 预热翻译时的并发请求数
+PREWARM_CONCURRENCY = 2
 
 
 async def get_alias_by_id(song_id: int) -> str:
@@ -48,34 +37,8 @@ async def get_alias_by_id(song_id: int) -> str:
     Returns:
         str: alias
     """
-    total_aliases = []
-    url = "https://maimai.lxns.net/api/v0/maimai/alias/list"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-
-            if resp.status != 200:
-                return
-            data = await resp.json()
-
-            aliases = data.get("aliases")
-            if aliases:
-                for i in aliases:
-                    if i.get("song_id") == song_id:
-                        if i.get("alias"):
-                            total_aliases += i.get("alias")
-
-    url2 = "https://download.fanyu.site/maimai/alias.json"
-    if song_id > 999 and song_id < 10000:
-        song_id = song_id + 10000
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url2) as resp:
-
-            if resp.status != 200:
-                return
-            data = await resp.json()
-            if data.get(str(song_id)):
-                total_aliases += data.get(str(song_id))
-    return total_aliases
+    pool = await song_pool.load()
+    return pool.get_aliases(song_id)
 
 
 versions = [
@@ -133,16 +96,100 @@ async def translate_to_chinese(text, source_language="en"):
         "langpair": f"{source_language}|zh-CN",  # Translate from the specified source language to Simplified Chinese
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(endpoint, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                if "responseData" in data:
-                    translated_text = data["responseData"]["translatedText"]
-                    return translated_text
-                else:
-                    logger.error(f"Translation error: {data}")
-                    return ""
+    async with http_client.get(endpoint, params=params) as response:
+        if response.status == 200:
+            data = await response.json()
+            # 超出免费额度等错误也会在 responseData 中返回提示文本
+            if str(data.get("responseStatus", 200)) != "200":
+                logger.error(f"Translation error: {data}")
+                return ""
+            if "responseData" in data:
+                translated_text = data["responseData"]["translatedText"]
+                return translated_text
             else:
-                logger.error(f"Translation failed with status: {response.status}")
+                logger.error(f"Translation error: {data}")
                 return ""
+        else:
+            logger.error(f"Translation failed with status: {response.status}")
+            return ""
+
+
+async def translate_title(
+    text: str,
+    source_languages: Tuple[str, ...] = TRANSLATE_LANGUAGES,
+    timeout: float = TRANSLATE_TIMEOUT,
+) -> List[str]:
+    """
+    将乐曲标题翻译成中文，优先使用数据库中缓存的翻译。
+
+    未缓存的语言并发请求翻译 API，超时或失败时返回空字符串，且不写入缓存。
+
+    Returns:
+        List[str]: 与 source_languages 顺序对应的译文。
+    """
+    if not text:
+        return ["" for _ in source_languages]
+
+    try:
+        translations = await get_translations(text, list(source_languages))
+    except DatabaseOperationError:
+        translations = {}
+
+    missing = [lang for lang in source_languages if lang not in translations]
+    if missing:
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(translate_to_chinese(text, lang), timeout)
+                for lang in missing
+            ),
+            return_exceptions=True,
+        )
+        fetched = {
+            lang: result
+            for lang, result in zip(missing, results)
+            if isinstance(result, str) and result
+        }
+        if fetched:
+            translations.update(fetched)
+            try:
+                await save_translations(text, fetched)
+            except DatabaseOperationError:
+                pass
+
+    return [translations.get(lang, "") for lang in source_languages]
+
+
+async def prewarm_translations(
+    titles: Iterable[str], concurrency: int = PREWARM_CONCURRENCY
+) -> int:
+    """
+    预先翻译并缓存一批标题，已缓存的标题不会重复请求。
+
+    Returns:
+        int: 处理的标题数。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def prewarm(title: str) -> None:
+        async with semaphore:
+            await translate_title(title, timeout=http_client.timeout)
+
+    titles = set(titles)
+    await asyncio.gather(*(prewarm(title) for title in titles))
+    return len(titles)
+
+
+async def _prewarm_catalog() -> None:
+    await http_client.start()
+    try:
+        catalog = await song_catalog.load()
+        count = await prewarm_translations(song["title"] for song in catalog.songs())
+        logger.info(f"[GUESS] 已预热 {count} 个标题的翻译")
+    finally:
+        await http_client.close()
+        await shutdown_session()
+
+
+if __name__ == "__main__":
+    # 离线预热全部曲目的翻译：python -m src.plugins.guess.tools
+    asyncio.run(_prewarm_catalog())
@@ -42,6 +42,12 @@ COMMANDS = {
 
 DEFAULT_HANDLER = handle_what_song
 
+# 指令的调度选项，见 CommandDispatcher
+COMMAND_OPTIONS = {
+    "查歌": {"max_queue": 20, "per_user": True},
+    "单曲成绩": {"max_queue": 20, "per_user": True},
+}
+
 
 # 默认大写的插件名
 COMMAND_NAME = "SONG_INFO"
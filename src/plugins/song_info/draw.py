@@ -1,22 +1,23 @@
-from typing import List
-from PIL import Image, ImageDraw, ImageFont
+from typing import Dict, List, Tuple
+from PIL import Image, ImageDraw
 
 from botpy import logger
 
-from src.libraries.assets import assets, AssetType, JSONType
+from src.libraries.assets import assets, AssetType
 from src.libraries.common.images import (
     draw_truncated_text,
     draw_centered_text,
     draw_centered_truncated_text,
-    resize_image,
+    get_font,
+    sprite_cache,
 )
 
 from src.libraries.common.game.maimai import Song, SongType, UserInfo
+from src.libraries.common.render import render_executor
 from src.libraries.common.game.maimai.maimai import MaimaiHelper
 
 from config import FontPaths, BOT_NAME, DEBUG, VERSION
 
-
 COVER_ADDR_MAP = {
     "maimai": "info-maimai.png",
     "POPSアニメ": "info-anime.png",
@@ -70,19 +71,69 @@ VERSION_NAME_MAP = {
 }
 
 
-async def get_song_info_id_list_from_alias(alias: str) -> List[int]:
-    alias = alias.lower().replace(" ", "")
-    alias_data = await assets.get_json(JSONType.ALIAS)
-    return [
-        int(song_id)
-        for song_id, aliases in alias_data.items()
-        if alias in [a.lower().replace(" ", "") for a in aliases]
+AssetPaths = Dict[Tuple[AssetType, str], str]
+
+
+def _version_image_name(song: Song) -> str:
+    return VERSION_IMAGE_MAP.get(int(song.version / 100), "maimai")
+
+
+def selected_song_assets(song_data_list: List[Song]) -> List[Tuple[AssetType, str]]:
+    """
+    列出绘制曲目选择图需要的资产
+    """
+    items = []
+    for song in song_data_list:
+        items.append((AssetType.COVER, str(song.id)))
+        items.append((AssetType.SONGINFO, f"{song.song_type.value}.png"))
+    return items
+
+
+def song_info_assets(song: Song) -> List[Tuple[AssetType, str]]:
+    """
+    列出绘制曲目信息图需要的资产
+    """
+    items = [
+        (AssetType.SONGINFO, "songinfo_bg.png"),
+        (AssetType.COVER, str(song.id)),
+        (AssetType.SONGINFO, COVER_ADDR_MAP.get(song.genre, "info-default.png")),
+        (AssetType.SONGINFO, f"{_version_image_name(song)}.png"),
+    ]
+    if song.song_type != SongType.UTAGE:
+        items.append((AssetType.SONGINFO, f"{song.song_type.value}.png"))
+    items += [
+        (AssetType.SONGINFO, f"d-{level_index}.png")
+        for level_index in range(len(song.difficulties))
+    ]
+    return items
+
+
+def song_score_assets(song: Song) -> List[Tuple[AssetType, str]]:
+    """
+    列出绘制单曲成绩图需要的资产
+    """
+    items = [
+        (AssetType.IMAGES, "info_bg.png"),
+        (AssetType.COVER, str(song.id)),
+        (AssetType.SONGINFO, COVER_ADDR_MAP.get(song.genre, "info-default.png")),
     ]
+    for index, difficulty in enumerate(song.difficulties):
+        items.append((AssetType.SONGINFO, f"d-{index}.png"))
+        if difficulty.user_score:
+            items.append((AssetType.RANK, f"{difficulty.user_score.rate.value}"))
+            items.append((AssetType.IMAGES, "fcfs.png"))
+            if difficulty.user_score.fc.value:
+                items.append((AssetType.BADGE, f"{difficulty.user_score.fc.value}"))
+            if difficulty.user_score.fs.value:
+                items.append((AssetType.BADGE, f"{difficulty.user_score.fs.value}"))
+    return items
 
 
-async def create_selected_song_image(song_data_list: List[Song]) -> Image.Image:
-    font_id = ImageFont.truetype(FontPaths.TORUS_BOLD, 40)
-    font_title = ImageFont.truetype(FontPaths.HANYI, 25)
+def draw_selected_song_image(
+    song_data_list: List[Song], paths: AssetPaths
+) -> Image.Image:
+    font_id = get_font(FontPaths.TORUS_BOLD, 40)
+    font_title = get_font(FontPaths.HANYI, 25)
     image_height_per_entry = 120
 
     total_height = image_height_per_entry * len(song_data_list)
@@ -91,21 +142,12 @@ async def create_selected_song_image(song_data_list: List[Song]) -> Image.Image:
 
     for index, song in enumerate(song_data_list):
 
-        cover_url = await assets.get_async(AssetType.COVER, song.id)
-        cover_image = Image.open(cover_url).resize((100, 100)).convert("RGBA")
-
-        type_badge_target_height = 20
+        cover_url = paths[AssetType.COVER, str(song.id)]
+        cover_image = sprite_cache.get(cover_url, size=(100, 100), copy=True)
 
-        type_badge = Image.open(
-            await assets.get_async(AssetType.SONGINFO, f"{song.song_type.value}.png")
-        ).convert("RGBA")
-
-        type_badge_width, type_badge_height = type_badge.size
-        type_badge_target_width = int(
-            (type_badge_target_height / type_badge_height) * type_badge_width
-        )
-        type_badge = type_badge.resize(
-            (type_badge_target_width, type_badge_target_height)
+        type_badge = sprite_cache.get(
+            paths[AssetType.SONGINFO, f"{song.song_type.value}.png"],
+            size=(None, 20),
         )
 
         cover_image.paste(type_badge, (2, 2), type_badge)
@@ -136,27 +178,21 @@ async def create_selected_song_image(song_data_list: List[Song]) -> Image.Image:
     return result_image
 
 
-async def create_song_info_image(song: Song) -> Image.Image:
+def draw_song_info_image(song: Song, paths: AssetPaths) -> Image.Image:
     logger.info(f"[SONGINFO] Creating image for {song.id}...")
 
     # 加载背景图像
-    bg = Image.open(
-        await assets.get_async(AssetType.SONGINFO, "songinfo_bg.png")
-    ).convert("RGBA")
+    bg = sprite_cache.get(paths[AssetType.SONGINFO, "songinfo_bg.png"], copy=True)
 
     draw = ImageDraw.Draw(bg)
 
     # 准备封面与类别图像
-    cover = Image.open(await assets.get_async(AssetType.COVER, song.id)).resize(
-        (360, 360)
-    )
+    cover = sprite_cache.get(paths[AssetType.COVER, str(song.id)], size=(360, 360))
 
     cover_addr_path = COVER_ADDR_MAP.get(song.genre, "info-default.png")
 
-    cover_addr = (
-        Image.open(await assets.get_async(AssetType.SONGINFO, cover_addr_path))
-        .convert("RGBA")
-        .resize((400, 400))
+    cover_addr = sprite_cache.get(
+        paths[AssetType.SONGINFO, cover_addr_path], size=(400, 400)
     )
 
     # 将透明图片粘贴到背景上
@@ -168,7 +204,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
         draw,
         (633, 328),
         song.title,
-        ImageFont.truetype(FontPaths.HANYI, 56),
+        get_font(FontPaths.HANYI, 56),
         895,
         (0, 0, 0),
     )
@@ -178,7 +214,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
         draw,
         (633, 428),
         song.artist,
-        ImageFont.truetype(FontPaths.HANYI, 40),
+        get_font(FontPaths.HANYI, 40),
         895,
         (0, 0, 0),
     )
@@ -192,19 +228,21 @@ async def create_song_info_image(song: Song) -> Image.Image:
         draw,
         (633, 575),
         text,
-        ImageFont.truetype(FontPaths.HANYI, 40),
+        get_font(FontPaths.HANYI, 40),
         900,
         (0, 0, 0),
     )
     # 获取歌曲版本
     version_key = int(song.version / 100)
-    version_image_name = VERSION_IMAGE_MAP.get(version_key, "maimai")
+    version_image_name = _version_image_name(song)
     version_name_chinese = VERSION_NAME_MAP.get(version_key, "")
 
     # 加载对应版本的图片
-    version_image = Image.open(
-        await assets.get_async(AssetType.SONGINFO, f"{version_image_name}.png")
-    ).convert("RGBA")
+    # 高度固定为 200，保持原比例
+    version_image = sprite_cache.get(
+        paths[AssetType.SONGINFO, f"{version_image_name}.png"],
+        size=(None, 200),
+    )
 
     # 绘制BPM
     color = (0, 0, 0)
@@ -213,7 +251,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
     draw.text(
         (700, 494),
         f"{song.bpm}",
-        font=ImageFont.truetype(FontPaths.TORUS_BOLD, 45),
+        font=get_font(FontPaths.TORUS_BOLD, 45),
         fill=color,
     )
 
@@ -221,37 +259,27 @@ async def create_song_info_image(song: Song) -> Image.Image:
     draw.text(
         (850, 505),
         f"牌子: {version_name_chinese}",
-        font=ImageFont.truetype(FontPaths.HANYI, 35),
+        font=get_font(FontPaths.HANYI, 35),
         fill=(0, 0, 0),
     )
 
-    # 计算新的高度，保持原比例
-    height = 200
-    original_width, original_height = version_image.size
-    width = int((height / original_height) * original_width)
-
-    # 缩放图片
-    version_image = version_image.resize((width, height))
-
     # 在背景图上粘贴版本图片
     bg.paste(version_image, (100, 45), version_image)
 
     # 绘制类型
     if song.song_type != SongType.UTAGE:
-        type_badge = Image.open(
-            await assets.get_async(AssetType.SONGINFO, f"{song.song_type.value}.png")
-        ).convert("RGBA")
+        type_badge = sprite_cache.get(
+            paths[AssetType.SONGINFO, f"{song.song_type.value}.png"]
+        )
         bg.paste(type_badge, (420, 640), type_badge)
 
     # 绘制难度
     for level_index, difficulty in enumerate(song.difficulties):
         # 打开并处理背景图像
-        level_bg = (
-            Image.open(
-                await assets.get_async(AssetType.SONGINFO, f"d-{level_index}.png")
-            )
-            .convert("RGBA")
-            .resize((120, 48))
+        level_bg = sprite_cache.get(
+            paths[AssetType.SONGINFO, f"d-{level_index}.png"],
+            size=(120, 48),
+            copy=True,
         )
 
         # 创建一个绘制对象
@@ -262,7 +290,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
             level_bg_draw,
             (60, 2),
             difficulty.level_lable,
-            ImageFont.truetype(FontPaths.HANYI, 40),
+            get_font(FontPaths.HANYI, 40),
             (255, 255, 255),
         )
         # 将处理后的图像粘贴到背景图上
@@ -276,7 +304,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
             draw,
             (column_x - 168, column_y + level_index * 110 + 28),
             difficulty.level_lable,
-            ImageFont.truetype(FontPaths.HANYI, 36),
+            get_font(FontPaths.HANYI, 36),
             (255, 255, 255),
         )
 
@@ -284,7 +312,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
             draw,
             (column_x + 30, column_y + level_index * 110 - 10),
             f"{difficulty.level}",
-            ImageFont.truetype(FontPaths.TORUS_BOLD, 60),
+            get_font(FontPaths.TORUS_BOLD, 60),
             (0, 0, 0),
         )
 
@@ -293,7 +321,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
                 draw,
                 (column_x + 90, column_y + level_index * 75 + 500),
                 difficulty.note_designer,
-                ImageFont.truetype(FontPaths.SIYUAN, 35),
+                get_font(FontPaths.SIYUAN, 35),
                 300,
                 (0, 0, 0),
             )
@@ -315,7 +343,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
                     draw,
                     (column_x + 324 + j * 155, column_y + level_index * 75 + 500),
                     f"{rating}",
-                    ImageFont.truetype(FontPaths.TORUS_BOLD, 40),
+                    get_font(FontPaths.TORUS_BOLD, 40),
                     color,
                 )
 
@@ -327,7 +355,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
                 draw,
                 (x, y),
                 f"{value}",
-                ImageFont.truetype(FontPaths.TORUS_BOLD, 50),
+                get_font(FontPaths.TORUS_BOLD, 50),
                 (0, 0, 0),
             )
 
@@ -335,7 +363,7 @@ async def create_song_info_image(song: Song) -> Image.Image:
         draw.text(
             (525, 1880),
             f"Generated by {BOT_NAME}",
-            font=ImageFont.truetype(FontPaths.HANYI, 35),
+            font=get_font(FontPaths.HANYI, 35),
             fill=(0, 0, 0),
         )
 
@@ -343,29 +371,29 @@ async def create_song_info_image(song: Song) -> Image.Image:
         draw.text(
             (1150, 1880),
             f"({VERSION})",
-            font=ImageFont.truetype(FontPaths.TORUS_BOLD, 30),
+            font=get_font(FontPaths.TORUS_BOLD, 30),
             fill=(0, 0, 0),
         )
     return bg
 
 
-async def create_song_score_image(
-    song: Song, user_info: UserInfo = None
+def draw_song_score_image(
+    song: Song, paths: AssetPaths, user_info: UserInfo = None
 ) -> Image.Image:
 
     font_color_basic = (18, 55, 139)
 
-    bg = await assets.get_async(AssetType.IMAGES, "info_bg.png")
-    cover = await assets.get_async(AssetType.COVER, song.id)
+    bg = paths[AssetType.IMAGES, "info_bg.png"]
+    cover = paths[AssetType.COVER, str(song.id)]
 
     bg_img = Image.open(bg)
 
-    cover_img = Image.open(cover).resize((450, 450)).convert("RGBA")
+    cover_img = sprite_cache.get(cover, size=(450, 450))
     cover_addr_path = COVER_ADDR_MAP.get(song.genre, "info-default.png")
-    cover_addr = (
-        Image.open(await assets.get_async(AssetType.SONGINFO, cover_addr_path))
-        .resize((500, 500))
-        .convert("RGBA")
+    cover_addr = sprite_cache.get(
+        paths[AssetType.SONGINFO, cover_addr_path],
+        size=(500, 500),
+        copy=True,
     )
 
     cover_addr.paste(cover_img, (5, 10), cover_img)
@@ -379,7 +407,7 @@ async def create_song_score_image(
         draw,
         (390, 900),
         song.title,
-        ImageFont.truetype(FontPaths.HANYI, 50),
+        get_font(FontPaths.HANYI, 50),
         600,
         font_color_basic,
     )
@@ -389,7 +417,7 @@ async def create_song_score_image(
         draw,
         (240, 1030),
         f"{song.id}",
-        ImageFont.truetype(FontPaths.TORUS_BOLD, 40),
+        get_font(FontPaths.TORUS_BOLD, 40),
         font_color_basic,
     )
 
@@ -398,15 +426,15 @@ async def create_song_score_image(
         draw,
         (490, 1030),
         f"{song.bpm}",
-        ImageFont.truetype(FontPaths.TORUS_BOLD, 40),
+        get_font(FontPaths.TORUS_BOLD, 40),
         font_color_basic,
     )
 
     for index, difficulty in enumerate(song.difficulties):
-        level_bg_img = (
-            Image.open(await assets.get_async(AssetType.SONGINFO, f"d-{index}.png"))
-            .convert("RGBA")
-            .resize((120, 48))
+        level_bg_img = sprite_cache.get(
+            paths[AssetType.SONGINFO, f"d-{index}.png"],
+            size=(120, 48),
+            copy=True,
         )
         level_bg_img_draw = ImageDraw.Draw(level_bg_img)
         # 保留一位小数
@@ -414,7 +442,7 @@ async def create_song_score_image(
             level_bg_img_draw,
             (60, 2),
             f"{difficulty.level:.1f}",
-            ImageFont.truetype(FontPaths.HANYI, 40),
+            get_font(FontPaths.HANYI, 40),
             (255, 255, 255),
         )
         # 如果有user_score则绘制
@@ -423,42 +451,37 @@ async def create_song_score_image(
             draw.text(
                 (750, 415 + index * 150),
                 f"{difficulty.user_score.achievements:.4f}%",
-                font=ImageFont.truetype(FontPaths.TORUS_BOLD, 50),
+                font=get_font(FontPaths.TORUS_BOLD, 50),
                 fill=font_color_basic,
             )
 
             # 绘制rate
 
-            rate_img = Image.open(
-                await assets.get_async(
-                    AssetType.RANK, f"{difficulty.user_score.rate.value}"
-                )
-            ).convert("RGBA")
-            rate_img = resize_image(rate_img, height=70)
+            rate_img = sprite_cache.get(
+                paths[AssetType.RANK, f"{difficulty.user_score.rate.value}"],
+                size=(None, 70),
+            )
             bg_img.paste(rate_img, (1030, 410 + index * 150), rate_img)
 
             # 绘制fsfc
-            fcfs_img = Image.open(
-                await assets.get_async(AssetType.IMAGES, "fcfs.png")
-            ).convert("RGBA")
-            fcfs_img = resize_image(fcfs_img, height=110)
+            fcfs_img = sprite_cache.get(
+                paths[AssetType.IMAGES, "fcfs.png"],
+                size=(None, 110),
+                copy=True,
+            )
 
             if difficulty.user_score.fc.value:
-                fc_img = Image.open(
-                    await assets.get_async(
-                        AssetType.BADGE, f"{difficulty.user_score.fc.value}"
-                    )
-                ).convert("RGBA")
-                fc_img = resize_image(fc_img, height=80)
+                fc_img = sprite_cache.get(
+                    paths[AssetType.BADGE, f"{difficulty.user_score.fc.value}"],
+                    size=(None, 80),
+                )
                 fcfs_img.paste(fc_img, (13, 13), fc_img)
 
             if difficulty.user_score.fs.value:
-                fs_img = Image.open(
-                    await assets.get_async(
-                        AssetType.BADGE, f"{difficulty.user_score.fs.value}"
-                    )
-                ).convert("RGBA")
-                fs_img = resize_image(fs_img, height=80)
+                fs_img = sprite_cache.get(
+                    paths[AssetType.BADGE, f"{difficulty.user_score.fs.value}"],
+                    size=(None, 80),
+                )
                 fcfs_img.paste(fs_img, (91, 13), fs_img)
 
             bg_img.paste(fcfs_img, (1220, 385 + index * 150), fcfs_img)
@@ -467,7 +490,21 @@ async def create_song_score_image(
     draw.text(
         (550, 1245),
         f"Generated by {BOT_NAME} [{VERSION}]",
-        font=ImageFont.truetype(FontPaths.HANYI, 30),
+        font=get_font(FontPaths.HANYI, 30),
         fill=font_color_basic,
     )
     return bg_img
+
+
+def warmup() -> None:
+    """
+    渲染进程启动时预加载曲目信息图的静态精灵图
+    """
+    sprite_cache.get(assets.get(AssetType.SONGINFO, "songinfo_bg.png"))
+    for level_index in range(5):
+        sprite_cache.get(
+            assets.get(AssetType.SONGINFO, f"d-{level_index}.png"), size=(120, 48)
+        )
+
+
+render_executor.add_warmup(warmup)
@@ -1,30 +1,72 @@
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 
 
 from src.libraries.common.message.message import MixMessage
-from src.libraries.assets import assets, JSONType
+from src.libraries.assets import assets
 
-from src.libraries.common.file.temp import TempFileManager
 
-from src.libraries.common.game.maimai import Song, MaimaiUser
+from src.libraries.common.game.maimai import (
+    Song,
+    MaimaiUser,
+    alias_index,
+    song_search,
+)
 
 from src.libraries.database.crud import get_user_by_id
+from src.libraries.common.render import render_executor
 from .draw import (
-    create_selected_song_image,
-    create_song_info_image,
-    create_song_score_image,
+    draw_selected_song_image,
+    draw_song_info_image,
+    draw_song_score_image,
+    selected_song_assets,
+    song_info_assets,
+    song_score_assets,
 )
 
+# 模糊搜索时最多给出的候选乐曲数
+FUZZY_SEARCH_LIMIT = 5
+
 
 async def get_song_info_id_list_from_alias(alias: str) -> List[int]:
-    alias = alias.lower().replace(" ", "")
-    alias_data = await assets.get_json(JSONType.ALIAS)
-    return [
-        int(song_id)
-        for song_id, aliases in alias_data.items()
-        if alias in [a.lower().replace(" ", "") for a in aliases]
-    ]
+    index = await alias_index.load()
+    return sorted(index.exact(alias))
+
+
+async def load_songs(song_ids: List[int]) -> List[Song]:
+    """
+    获取乐曲信息，跳过不存在的乐曲
+    """
+    song_data_list: List[Song] = []
+    for song_id in song_ids:
+        song_data = Song(song_id)
+        if not await song_data.enrich():
+            continue
+        song_data_list.append(song_data)
+    return song_data_list
+
+
+async def render_selected_songs(song_data_list: List[Song]) -> bytes:
+    """
+    绘制多首乐曲的选择图
+    """
+    paths = await assets.get_paths(selected_song_assets(song_data_list))
+    return await render_executor.render(draw_selected_song_image, song_data_list, paths)
+
+
+async def get_similar_songs_image(alias: str) -> Optional[bytes]:
+    """
+    模糊搜索与别名相似的乐曲，绘制候选乐曲的选择图
+
+    Returns:
+        Optional[bytes]: 选择图，没有相似的乐曲时返回 None。
+    """
+    search = await song_search.load()
+    candidates = search.search(alias, k=FUZZY_SEARCH_LIMIT)
+    song_data_list = await load_songs([song_id for song_id, _ in candidates])
+    if not song_data_list:
+        return None
+    return await render_selected_songs(song_data_list)
 
 
 async def get_song_info_images(
@@ -39,12 +81,7 @@ async def get_song_info_images(
         return False, None
 
     # 保存匹配的曲目信息并分裂曲目
-    song_data_list: List[Song] = []
-    for song_id in matching_songs_id_list:
-        song_data = Song(song_id)
-        if not await song_data.enrich():
-            continue
-        song_data_list.append(song_data)
+    song_data_list = await load_songs(matching_songs_id_list)
 
     # 没有找到匹配的曲目
     if len(song_data_list) == 0:
@@ -52,19 +89,23 @@ async def get_song_info_images(
 
     # 存在多首匹配的曲目
     if len(song_data_list) > 1:
-        selected_image = await create_selected_song_image(song_data_list)
-        return False, selected_image
+        return False, await render_selected_songs(song_data_list)
 
     # 开始绘图
     song_info = song_data_list[0]
     if is_score:
-        name, platform_id, score, _ = get_user_by_id(user_id)
+        name, platform_id, score, _ = await get_user_by_id(user_id)
         user = MaimaiUser(name, platform_id)
         song_score_info = await user.append_user_score(song_info)
-        info_image = await create_song_score_image(song_score_info)
+        paths = await assets.get_paths(song_score_assets(song_score_info))
+        info_image = await render_executor.render(
+            draw_song_score_image, song_score_info, paths, quality=60
+        )
     else:
-
-        info_image = await create_song_info_image(song_info)
+        paths = await assets.get_paths(song_info_assets(song_info))
+        info_image = await render_executor.render(
+            draw_song_info_image, song_info, paths, quality=60
+        )
 
     return True, info_image
 
@@ -93,12 +134,8 @@ async def search_by_args(args: str, mix_message: MixMessage, is_score=False):
         flag, image = await get_song_info_images(
             songid=song_id, is_score=is_score, user_id=mix_message.user_id
         )
-        temp_file_manager = TempFileManager()
         if flag:
-            path, name = temp_file_manager.create_temp_image_file(
-                image=image, suffix=".jpg", quality=60
-            )
-            await mix_message.reply(file_image=path)
+            await mix_message.reply(file_image=image)
         else:
             await mix_message.reply(content=f"😢没有找到ID=[{song_id}]的乐曲")
 
@@ -107,20 +144,23 @@ async def search_by_args(args: str, mix_message: MixMessage, is_score=False):
         flag, image = await get_song_info_images(
             alias=alias, is_score=is_score, user_id=mix_message.user_id
         )
-        temp_file_manager = TempFileManager()
         if flag:
-            path, name = temp_file_manager.create_temp_image_file(
-                image=image, suffix=".jpg", quality=60
-            )
-            await mix_message.reply(file_image=path)
+            await mix_message.reply(file_image=image)
         else:
             if image:
-                path, name = temp_file_manager.create_temp_image_file(
-                    image=image, suffix=".jpg"
-                )
                 await mix_message.reply(
                     content=f"找到了多个被称为[{alias}]的乐曲, 使用ID查看详细信息",
-                    file_image=path,
+                    file_image=image,
                 )
             else:
-                await mix_message.reply(content=f"😢没有找到被称作为[{alias}]的乐曲")
+                # 没有完全一致的别名时给出相似的乐曲
+                image = await get_similar_songs_image(alias)
+                if image:
+                    await mix_message.reply(
+                        content=f"😢没有找到被称作为[{alias}]的乐曲, 你要找的是不是这些乐曲?",
+                        file_image=image,
+                    )
+                else:
+                    await mix_message.reply(
+                        content=f"😢没有找到被称作为[{alias}]的乐曲"
+                    )
@@ -0,0 +1,51 @@
+"""
+长别名下猜歌答案匹配的性能对比，不属于测试用例。
+
+在仓库根目录运行：python -m tests.benchmark_guess_matcher
+"""
+
+import random
+import time
+
+from src.plugins.guess.matcher import AnswerMatcher
+
+from tests.test_guess_matcher import brute_force_match_length
+
+
+def main(alias_length: int = 200, aliases: int = 10, rounds: int = 20) -> None:
+    rng = random.Random(1)
+    answers = [
+        "".join(rng.choice("abcdefghij") for _ in range(alias_length))
+        for _ in range(aliases)
+    ]
+    guesses = [
+        "".join(rng.choice("abcdefghij") for _ in range(50)) for _ in range(rounds)
+    ]
+
+    start = time.perf_counter()
+    expected = [
+        max(brute_force_match_length(guess, a) / len(a) for a in answers)
+        for guess in guesses
+    ]
+    brute_force_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = AnswerMatcher(answers)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ratios = [matcher.best_ratio(guess) for guess in guesses]
+    matcher_time = time.perf_counter() - start
+
+    assert ratios == expected
+    print(f"{aliases} 个 {alias_length} 字符的别名，{rounds} 次猜测")
+    print(f"暴力匹配: {brute_force_time * 1000 / rounds:.3f} ms/次")
+    print(
+        f"后缀自动机: {matcher_time * 1000 / rounds:.3f} ms/次"
+        f"（构建 {build_time * 1000:.3f} ms）"
+    )
+    print(f"加速比: {brute_force_time / matcher_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+拉丁字母别名下模糊搜索的性能测试，不属于测试用例。
+
+在仓库根目录运行：python -m tests.benchmark_song_search
+"""
+
+import random
+import time
+
+from src.libraries.common.game.maimai.alias import AliasIndex
+from src.libraries.common.game.maimai.catalog import SongCatalog
+from src.libraries.common.game.maimai.search import SongSearch
+
+WORDS = (
+    "love song star night dream heart world light magic fire blue sky "
+    "rain snow party dance music time future paradise destiny galaxy "
+    "burning crazy dark ever forever garden happy infinity journey "
+    "king lady midnight moon never ocean princess queen rainbow "
+    "scramble sweet thunder universe venus wonder xenon youth zero "
+    "oshama pandora paradoxxx fauna sakura tokyo neko miku hatsune "
+    "electric rock beat rhythm symphony fantasy legend memory origin"
+).split()
+
+
+def _typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1 :]
+
+
+def make_search(songs: int = 1600, seed: int = 0):
+    """
+    生成与真实数据规模相近的曲目与拉丁字母别名，约 13k 个别名
+    """
+    rng = random.Random(seed)
+    titles = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title()
+        + rng.choice(["", "!", " feat. miku", " (remix)", ""])
+        for _ in range(songs)
+    ]
+    catalog = SongCatalog()
+    catalog._build(
+        {
+            "songs": [
+                {"id": i, "title": title, "difficulties": {"standard": [{}]}}
+                for i, title in enumerate(titles, 1)
+            ]
+        }
+    )
+
+    aliases = {}
+    for i, title in enumerate(titles, 1):
+        words = title.lower().split()
+        names = {
+            title.lower(),
+            "".join(word[0] for word in words),
+            words[0],
+            " ".join(words[:2]),
+            _typo(rng, title.lower()),
+            _typo(rng, words[-1]),
+        }
+        names |= {rng.choice(WORDS) + " " + rng.choice(words) for _ in range(2)}
+        aliases[str(i)] = sorted(names)
+    alias_index = AliasIndex()
+    alias_index._build(aliases)
+
+    search = SongSearch(catalog, alias_index)
+    search._build()
+    queries = [_typo(rng, rng.choice(titles).lower()) for _ in range(200)]
+    queries += [" ".join(rng.sample(WORDS, 2)) for _ in range(200)]
+    queries += [rng.choice(WORDS)[:4] for _ in range(100)]
+    return search, queries, sum(len(names) for names in aliases.values())
+
+
+def main() -> None:
+    search, queries, alias_count = make_search()
+
+    start = time.perf_counter()
+    for query in queries:
+        search.search(query)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(search._names)} 个名称（{alias_count} 个别名），{len(queries)} 次查询")
+    print(f"平均: {elapsed * 1000 / len(queries):.3f} ms/次")
+
+
+if __name__ == "__main__":
+    main()
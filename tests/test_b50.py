@@ -21,7 +21,6 @@ async def test_create_song_info_image_show():
     maimai_player = MaimaiUser(id=username, user_platform=platform_id)
     await player.enrich(maimai_player)
 
-    drawBest = DrawBest(player)
-    draw = await drawBest.draw()
+    draw = render_best(*await prepare_best(player))
     draw.show()
     assert True
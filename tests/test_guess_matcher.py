@@ -0,0 +1,51 @@
+import random
+
+from src.plugins.guess.matcher import AnswerMatcher, SuffixAutomaton
+
+
+def brute_force_match_length(guess, answer):
+    # 原先 GuessSongHandler.get_max_match_length 的实现
+    max_length = 0
+    for i in range(len(answer)):
+        for j in range(i + 1, len(answer) + 1):
+            if guess.find(answer[i:j]) != -1:
+                max_length = max(max_length, j - i)
+    return max_length
+
+
+def test_longest_common_substring_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(500):
+        answer = "".join(rng.choice("abcあい") for _ in range(rng.randint(1, 20)))
+        guess = "".join(rng.choice("abcあい") for _ in range(rng.randint(0, 20)))
+        assert SuffixAutomaton(answer).longest_common_substring(
+            guess
+        ) == brute_force_match_length(guess, answer)
+
+
+def test_answer_matcher():
+    matcher = AnswerMatcher(["Oshama Scramble!", "", None, "大鸡腿"])
+    assert matcher.answers == ["oshamascramble!", "大鸡腿"]
+    assert matcher.match("oshama")
+    assert matcher.match("是大鸡腿吗")
+    assert not matcher.match("maimai")
+    assert not matcher.match("")
+    assert not AnswerMatcher(["", " "]).match("anything")
+
+
+def test_answer_matcher_normalizes_case_and_whitespace():
+    # 答案与猜测都会转为小写并去除空白
+    matcher = AnswerMatcher(["PANDORA PARADOXXX"])
+    assert matcher.answers == ["pandoraparadoxxx"]
+    assert matcher.match("pandoraparadox")
+    assert matcher.match("P A N D O R A")
+    assert matcher.best_ratio("Pandora\tParadoxxx") == 1.0
+
+
+def test_long_alias_matches_brute_force():
+    rng = random.Random(1)
+    answers = ["".join(rng.choice("abcdefghij") for _ in range(200)) for _ in range(10)]
+    guess = "".join(rng.choice("abcdefghij") for _ in range(50))
+
+    expected = max(brute_force_match_length(guess, a) / len(a) for a in answers)
+    assert AnswerMatcher(answers).best_ratio(guess) == expected
@@ -0,0 +1,107 @@
+import asyncio
+import uuid
+
+import botpy
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.bot import MyClient
+from src.libraries.database import (
+    add_or_update_user,
+    crud,
+    get_user_by_id,
+    score_writer,
+    shutdown_session,
+    update_user_favorite,
+    user_cache,
+)
+from src.libraries.database.crud import _session
+from src.libraries.database.models import User
+
+
+@pytest.fixture
+def temp_database(tmp_path, monkeypatch):
+    # 使用临时数据库，不向 DATABASE_PATH 写入测试数据
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(crud, "engine", engine)
+    monkeypatch.setattr(
+        crud, "SessionLocal", async_sessionmaker(engine, expire_on_commit=False)
+    )
+    monkeypatch.setattr(crud, "_initialized", False)
+
+
+async def _load_score(user_id):
+    async with _session() as session:
+        result = await session.execute(
+            select(User.score, User.score_update_count).where(User.user_id == user_id)
+        )
+        return result.one()
+
+
+def test_shutdown_flushes_buffered_scores(temp_database):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        client = MyClient(intents=botpy.Intents.none())
+        user_id = str(uuid.uuid4())
+        loop.run_until_complete(add_or_update_user(user_id, "writer", 0))
+
+        async def submit():
+            score_writer.submit(user_id, 100)
+            score_writer.submit(user_id, 200)
+
+        loop.run_until_complete(submit())
+        # 与 main.py 相同的退出路径，分数此时仍在缓冲中
+        client.shutdown()
+
+        assert loop.run_until_complete(_load_score(user_id)) == (200, 2)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def test_shutdown_flushes_scores_when_a_close_step_fails(temp_database):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        client = MyClient(intents=botpy.Intents.none())
+
+        async def failing_close_handler():
+            raise RuntimeError("close handler failed")
+
+        client.close_handlers.insert(0, failing_close_handler)
+        user_id = str(uuid.uuid4())
+        loop.run_until_complete(add_or_update_user(user_id, "writer", 0))
+
+        async def submit():
+            score_writer.submit(user_id, 300)
+
+        loop.run_until_complete(submit())
+        client.shutdown()
+
+        assert loop.run_until_complete(_load_score(user_id)) == (300, 1)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def test_cached_user_keeps_buffered_score(temp_database):
+    async def run():
+        user_id = str(uuid.uuid4())
+        await add_or_update_user(user_id, "writer", 0)
+        score_writer.submit(user_id, 100)
+        # 分数仍在缓冲中，数据库里的旧分数不能进入缓存
+        await update_user_favorite(user_id, 3)
+        row = await get_user_by_id(user_id)
+        assert row == ("writer", 0, 100, 3)
+        assert user_cache.get(user_id) == row
+        await score_writer.close()
+        assert await _load_score(user_id) == (100, 1)
+        await shutdown_session()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
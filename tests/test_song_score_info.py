@@ -3,7 +3,14 @@ import sys
 print(sys.path)
 
 # test module
-from src.plugins.song_info.draw import create_song_info_image, create_song_score_image
+from src.plugins.song_info.draw import (
+    draw_song_info_image,
+    draw_song_score_image,
+    song_info_assets,
+    song_score_assets,
+)
+
+from src.libraries.assets import assets
 
 from src.libraries.common.game.maimai import MaimaiUser, Song
 
@@ -18,9 +25,11 @@ async def test_create_song_info_image_show():
         assert False
 
     print(song)
-    # 调用异步函数生成图片
-    image2 = await create_song_score_image(song)
-    image = await create_song_info_image(song)
+    # 预取资产后生成图片
+    image2 = draw_song_score_image(
+        song, await assets.get_paths(song_score_assets(song))
+    )
+    image = draw_song_info_image(song, await assets.get_paths(song_info_assets(song)))
 
     # 显示生成的图片，让你肉眼检查
     image.show()
@@ -0,0 +1,73 @@
+from src.libraries.common.game.maimai.alias import AliasIndex
+from src.libraries.common.game.maimai.catalog import SongCatalog
+from src.libraries.common.game.maimai.search import SongSearch, edit_distance
+
+SONGS = {
+    "songs": [
+        {"id": 834, "title": "Oshama Scramble!", "difficulties": {"standard": [{}]}},
+        {"id": 1363, "title": "Scars of FAUNA", "difficulties": {"dx": [{}]}},
+        {"id": 1421, "title": "系ぎて", "difficulties": {"dx": [{}]}},
+        {"id": 1102, "title": "PANDORA PARADOXXX", "difficulties": {"dx": [{}]}},
+    ]
+}
+
+# fanyu 的别名数据以 DX 乐曲ID为键
+ALIASES = {
+    "834": ["大鸡腿", "oshama"],
+    "11102": ["潘多拉"],
+}
+
+
+def make_search() -> SongSearch:
+    catalog = SongCatalog()
+    catalog._build(SONGS)
+    aliases = AliasIndex()
+    aliases._build(ALIASES)
+    search = SongSearch(catalog, aliases)
+    search._build()
+    return search
+
+
+def test_exact_title_ranks_first():
+    results = make_search().search("Oshama Scramble!")
+    assert results[0] == (834, 1.0)
+
+
+def test_exact_alias():
+    search = make_search()
+    assert search.search("大鸡腿")[0] == (834, 1.0)
+    assert search.search("潘多拉")[0] == (11102, 1.0)
+
+
+def test_fuzzy_title():
+    # 拼写错误与缺字仍能找到
+    assert make_search().search("oshama scramblr")[0][0] == 834
+    assert make_search().search("pandora paradox")[0][0] == 11102
+
+
+def test_alias_ranks_above_partial_title():
+    # "oshama" 是别名，完全一致；同时也是标题的一部分
+    results = make_search().search("oshama")
+    assert results[0] == (834, 1.0)
+    assert make_search().search("fauna")[0][0] == 11363
+
+
+def test_single_character_query():
+    results = make_search().search("系")
+    assert results[0][0] == 11421
+    assert make_search().search("鸡")[0][0] == 834
+
+
+def test_unrelated_query():
+    assert make_search().search("zzzz") == []
+    assert make_search().search("") == []
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == 3
+    assert edit_distance("系ぎて", "系ぎ") == 1
+    # 超过上限时返回上限加一
+    assert edit_distance("kitten", "sitting", 2) == 3
+    assert edit_distance("oshama", "pandoraparadoxxx", 3) == 4
+    assert edit_distance("kitten", "sitting", 3) == 3